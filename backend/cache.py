@@ -0,0 +1,123 @@
+# file: backend/cache.py
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterable, Hashable
+
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+QUERY_CACHE_RECENT_TTL = int(os.getenv("QUERY_CACHE_RECENT_TTL", "3600"))  # seconds
+QUERY_CACHE_HISTORICAL_TTL = int(os.getenv("QUERY_CACHE_HISTORICAL_TTL", str(30 * 24 * 3600)))  # seconds
+# GIOŚ keeps revising measurements for a few days, so only older windows count as historical
+QUERY_CACHE_SETTLE_NS = int(os.getenv("QUERY_CACHE_SETTLE_DAYS", "3")) * 24 * 3600 * 1_000_000_000
+
+
+def estimate_size(rows: List[Dict[str, Any]]) -> int:
+    """Approximate memory footprint of a query result in bytes."""
+    return sys.getsizeof(rows) + sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+        for row in rows
+    )
+
+
+@dataclass
+class CacheEntry:
+    value: List[Dict[str, Any]]
+    size: int
+    stations: frozenset | None  # None means "all stations"
+    start_ns: int
+    stop_ns: int
+    expires_at: float
+
+
+class QueryCache:
+    """Thread-safe LRU cache of query results, bounded in bytes and invalidated by overlapping writes."""
+
+    def __init__(self, max_bytes: int = QUERY_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> List[Dict[str, Any]] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: List[Dict[str, Any]], stations: Iterable[str] | None,
+            start_ns: int, stop_ns: int, generation: int) -> None:
+        """Store a result unless a write invalidated the cache since `generation` was read."""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        historical = stop_ns < time.time_ns() - QUERY_CACHE_SETTLE_NS
+        ttl = QUERY_CACHE_HISTORICAL_TTL if historical else QUERY_CACHE_RECENT_TTL
+        entry = CacheEntry(value, size, frozenset(stations) if stations else None, start_ns, stop_ns,
+                           time.monotonic() + ttl)
+        with self._lock:
+            if generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, stations: Iterable[str], start_ns: int, stop_ns: int) -> int:
+        """Drop entries whose stations and time window overlap freshly written data."""
+        stations = set(stations)
+        with self._lock:
+            self.generation += 1
+            stale = [
+                key for key, entry in self._entries.items()
+                if entry.start_ns <= stop_ns and start_ns <= entry.stop_ns
+                and (entry.stations is None or not entry.stations.isdisjoint(stations))
+            ]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+
+
+air_quality_cache = QueryCache()
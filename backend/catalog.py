@@ -0,0 +1,60 @@
+# file: backend/catalog.py
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import List, Dict, Any
+
+from backend.crawler import Crawler, CrawlError
+from backend.gios_common import CATALOG_FILE, read_catalog
+
+
+def write_catalog(catalog: Dict[str, Any], path: str = CATALOG_FILE) -> None:
+    """Persist the catalog atomically so readers never see a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(catalog, f)
+    os.replace(tmp_path, path)
+
+
+async def fetch_sensors(crawler: Crawler, station_id: str) -> List[Dict[str, Any]] | None:
+    """Fetch the sensor list of one station; None when it could not be fetched."""
+    try:
+        return await crawler.get_json(f"/station/sensors/{station_id}")
+    except CrawlError as e:
+        logging.warning(f"Skipping station {station_id}: {e}")
+        crawler.report.failed_stations[station_id] = str(e)
+        return None
+
+
+async def load_catalog(crawler: Crawler, force_refresh: bool = False, path: str = CATALOG_FILE) -> Dict[str, Any]:
+    """Return the GIOŚ stations and sensors, from the disk cache while fresh or from the API otherwise."""
+    if not force_refresh:
+        catalog = read_catalog(path)
+        if catalog:
+            return catalog
+
+    stale = read_catalog(path, ttl=None) or {"stations": [], "sensors": {}}
+    try:
+        stations = await crawler.get_json("/station/findAll")
+    except CrawlError as e:
+        if stale["stations"]:
+            logging.warning(f"Failed to refresh GIOŚ stations ({e}), using cached catalog")
+            return stale
+        raise
+
+    station_ids = [str(station["id"]) for station in stations]
+    results = await asyncio.gather(*(fetch_sensors(crawler, station_id) for station_id in station_ids))
+    sensors = {}
+    for station_id, station_sensors in zip(station_ids, results):
+        # Keep the previously known sensors of stations that failed this time
+        sensors[station_id] = station_sensors if station_sensors is not None else stale["sensors"].get(station_id, [])
+
+    catalog = {"fetched_at": time.time(), "stations": stations, "sensors": sensors}
+    if stations:
+        write_catalog(catalog, path)
+        logging.info(f"Refreshed GIOŚ catalog: {len(stations)} stations, "
+                     f"{sum(len(s) for s in sensors.values())} sensors")
+    return catalog
@@ -0,0 +1,151 @@
+# file: backend/crawler.py
+
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+import aiohttp
+
+from backend.gios_common import create_ssl_context
+from backend.metrics import GIOS_REQUEST_SECONDS, GIOS_REQUEST_ERRORS, gios_endpoint
+
+GIOS_URL = os.getenv("GIOS_URL", "https://api.gios.gov.pl/pjp-api/rest")
+GIOS_CONCURRENCY = int(os.getenv("GIOS_CONCURRENCY", "16"))
+GIOS_RATE_LIMIT = float(os.getenv("GIOS_RATE_LIMIT", "20"))  # requests per second
+GIOS_RATE_BURST = int(os.getenv("GIOS_RATE_BURST", "20"))
+GIOS_MAX_RETRIES = int(os.getenv("GIOS_MAX_RETRIES", "4"))
+GIOS_BACKOFF_BASE = float(os.getenv("GIOS_BACKOFF_BASE", "0.5"))  # seconds
+GIOS_BACKOFF_MAX = float(os.getenv("GIOS_BACKOFF_MAX", "30"))  # seconds
+GIOS_REQUEST_TIMEOUT = float(os.getenv("GIOS_REQUEST_TIMEOUT", "30"))  # seconds
+
+# Statuses worth retrying: rate limiting and temporary server-side failures
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CrawlError(Exception):
+    """Raised when a GIOŚ request fails permanently or runs out of retries."""
+
+
+@dataclass
+class CrawlReport:
+    """Per-run statistics of the GIOŚ crawl, including everything that could not be fetched."""
+    started_at: float = field(default_factory=time.time)
+    duration: float = 0.0
+    requests: int = 0
+    retries: int = 0
+    failed_stations: Dict[str, str] = field(default_factory=dict)
+    failed_sensors: Dict[str, str] = field(default_factory=dict)
+    sensors_total: int = 0
+    sensors_done: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "duration": round(self.duration, 3),
+            "requests": self.requests,
+            "retries": self.retries,
+            "failed_stations": dict(self.failed_stations),
+            "failed_sensors": dict(self.failed_sensors),
+            "sensors_total": self.sensors_total,
+            "sensors_done": self.sensors_done,
+        }
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: `rate` tokens per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def create_session(concurrency: int = GIOS_CONCURRENCY) -> aiohttp.ClientSession:
+    """Create an HTTP session whose connection pool matches the crawler concurrency."""
+    connector = aiohttp.TCPConnector(ssl=create_ssl_context(), limit=concurrency, ttl_dns_cache=300)
+    return aiohttp.ClientSession(connector=connector,
+                                 timeout=aiohttp.ClientTimeout(total=GIOS_REQUEST_TIMEOUT))
+
+
+def _retry_after(response: aiohttp.ClientResponse) -> float | None:
+    """Parse a numeric Retry-After header, if the server sent one."""
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class Crawler:
+    """Bounded-concurrency, rate-limited GIOŚ client with retries, exponential backoff and jitter."""
+
+    def __init__(self, session: aiohttp.ClientSession,
+                 concurrency: int = GIOS_CONCURRENCY,
+                 rate: float = GIOS_RATE_LIMIT,
+                 burst: int = GIOS_RATE_BURST,
+                 max_retries: int = GIOS_MAX_RETRIES,
+                 base_url: str = GIOS_URL):
+        self.session = session
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.report = CrawlReport()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._bucket = TokenBucket(rate, burst)
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: float | None) -> float:
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+        delay = random.uniform(0, min(GIOS_BACKOFF_MAX, GIOS_BACKOFF_BASE * 2 ** attempt))
+        return max(delay, retry_after or 0)
+
+    async def get_json(self, path: str) -> Any:
+        """GET a GIOŚ endpoint, retrying transient errors; raise CrawlError when it cannot be fetched."""
+        url = f"{self.base_url}{path}"
+        endpoint = gios_endpoint(path)
+        error = "unknown error"
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            await self._bucket.acquire()
+            async with self._semaphore:
+                self.report.requests += 1
+                started = time.perf_counter()
+                try:
+                    async with self.session.get(url) as response:
+                        if response.status == 200:
+                            data = await response.json()
+                            GIOS_REQUEST_SECONDS.labels(endpoint=endpoint).observe(time.perf_counter() - started)
+                            return data
+                        GIOS_REQUEST_SECONDS.labels(endpoint=endpoint).observe(time.perf_counter() - started)
+                        GIOS_REQUEST_ERRORS.labels(endpoint=endpoint, reason=str(response.status)).inc()
+                        error = f"HTTP {response.status}"
+                        if response.status not in TRANSIENT_STATUSES:
+                            raise CrawlError(error)
+                        retry_after = _retry_after(response)
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    # ValueError: a 200 with a truncated or malformed JSON body, worth another try
+                    GIOS_REQUEST_ERRORS.labels(endpoint=endpoint, reason=type(e).__name__).inc()
+                    error = f"{type(e).__name__}: {e}"
+            if attempt == self.max_retries:
+                break
+            self.report.retries += 1
+            delay = self._backoff(attempt, retry_after)
+            logging.debug(f"Retrying {path} in {delay:.2f}s after {error}")
+            await asyncio.sleep(delay)
+        raise CrawlError(f"{error} after {self.max_retries + 1} attempts")
@@ -1,12 +1,30 @@
 # file: backend/database.py
 
 import os
+import asyncio
 import logging
+import threading
+import time
+import aiohttp
 from fastapi import HTTPException
-from influxdb_client import InfluxDBClient, Point, WriteOptions
+from influxdb_client import InfluxDBClient, WritePrecision
+from influxdb_client.client.write_api import SYNCHRONOUS
+from influxdb_client.client.flux_table import TableList
+from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync
 from dotenv import load_dotenv
-from datetime import datetime
-from typing import List, Dict, Any
+from datetime import datetime, date
+from typing import List, Dict, Any, Tuple, AsyncIterator
+
+from backend.cache import air_quality_cache
+from backend.metrics import observe_query
+from backend.profiling import QueryProfile, current_profile, profile_phase, profiler_query_options, decode_flux_csv, \
+    with_flux_profilers
+from backend.metadata import get_metadata_index
+from backend.spatial import station_locator
+from backend.line_protocol import get_serializer, datetime_to_ns, timestamp_ns
+from backend.spool import Spool, SPOOL_DIR
+from backend.rollups import ROLLUP_MEASUREMENT, ROLLUP_PERIODS, ROLLUP_STATS, get_rollup_tracker, choose_rollup, \
+    parse_duration, split_range, combine_rollup_rows, align_down, align_up, ns_to_iso
 
 load_dotenv()
 
@@ -14,130 +32,505 @@ INFLUXDB_URL = os.getenv("INFLUXDB_URL")
 INFLUXDB_TOKEN = os.getenv("INFLUXDB_TOKEN")
 INFLUXDB_ORG = os.getenv("INFLUXDB_ORG")
 INFLUXDB_BUCKET = os.getenv("INFLUXDB_BUCKET")
+INFLUXDB_QUERY_TIMEOUT = float(os.getenv("INFLUXDB_QUERY_TIMEOUT", "30"))  # seconds per API query
+INFLUXDB_POOL_SIZE = int(os.getenv("INFLUXDB_POOL_SIZE", "20"))  # pooled connections of the async client
 
-export_file = "exported_data.line"
+ROLLUP_CHUNK_NS = 90 * 24 * 3600 * 1_000_000_000  # raw range aggregated per rollup query
+ROLLUP_STATION_FILTER_LIMIT = 50
+_LAST_SECOND_OF_DAY_NS = (24 * 3600 - 1) * 1_000_000_000
 
 # Validate environment variables
 if not all([INFLUXDB_URL, INFLUXDB_TOKEN, INFLUXDB_ORG, INFLUXDB_BUCKET]) :
     raise ValueError("Missing required InfluxDB environment variables")
 
-client = InfluxDBClient(url = INFLUXDB_URL, token = INFLUXDB_TOKEN, org = INFLUXDB_ORG)
-query_api = client.query_api()
-#write_api = client.write_api()
-write_api = client.write_api(write_options=WriteOptions(batch_size=500, flush_interval=10_000, jitter_interval=2_000))
+# Clients and the spool are created on first use, so importing this module (and starting the API) does no I/O
+_client: InfluxDBClient | None = None
+_query_api = None
+_write_api = None
+_client_lock = threading.Lock()
+_spool: Spool | None = None
+_spool_lock = threading.Lock()
+
+
+def get_client() -> InfluxDBClient:
+    """Return the shared synchronous InfluxDB client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = InfluxDBClient(url = INFLUXDB_URL, token = INFLUXDB_TOKEN, org = INFLUXDB_ORG)
+        return _client
+
+
+def get_query_api():
+    global _query_api
+    if _query_api is None:
+        _query_api = get_client().query_api()
+    return _query_api
+
+
+def get_write_api():
+    global _write_api
+    if _write_api is None:
+        # Writes are synchronous so failures surface to the spool, which owns batching and retries
+        _write_api = get_client().write_api(write_options=SYNCHRONOUS)
+    return _write_api
+
+
+def close_client() -> None:
+    global _client, _query_api, _write_api
+    with _client_lock:
+        if _write_api is not None:
+            _write_api.close()
+        if _client is not None:
+            _client.close()
+        _client = _query_api = _write_api = None
+
+
+def write_line_protocol(body: str) -> None:
+    """Write a block of line protocol straight to InfluxDB, raising on failure."""
+    get_write_api().write(bucket=INFLUXDB_BUCKET, record=body, write_precision=WritePrecision.NS)
+
+
+def _after_replay(metas: List[Dict[str, Any]]) -> None:
+    """Once spooled air quality data is in InfluxDB, drop overlapping cached results, mark rollups dirty
+    and update the metadata index."""
+    rollup_tracker, metadata_index = get_rollup_tracker(), get_metadata_index()
+    for meta in metas:
+        if "stations" in meta:
+            air_quality_cache.invalidate(meta["stations"], meta["start"], meta["stop"])
+            rollup_tracker.mark_dirty(meta["stations"], meta["start"], meta["stop"])
+        for source, span in meta.get("sources", {}).items():
+            metadata_index.observe(source, span["start"], span["stop"], span["stations"])
+    if any("stations" in meta for meta in metas):
+        # Persisted before the segment is acknowledged, so a restart cannot lose the dirty ranges
+        rollup_tracker.save()
+    metadata_index.save(force = False)
+
+
+def get_spool() -> Spool:
+    """Return the write-ahead spool every ingest write goes through, opening SPOOL_DIR on first use.
+
+    Nothing is lost while InfluxDB is unavailable; the replay thread starts with the first append.
+    """
+    global _spool
+    with _spool_lock:
+        if _spool is None:
+            _spool = Spool(SPOOL_DIR, writer = write_line_protocol, on_replayed = _after_replay)
+        return _spool
+
+# The async client owns an aiohttp session bound to the running event loop, so it is created on first use
+_async_client: InfluxDBClientAsync | None = None
+
+
+def get_async_client() -> InfluxDBClientAsync:
+    """Return the shared async InfluxDB client with a pooled HTTP connection."""
+    global _async_client
+    if _async_client is None:
+        # No total timeout: streamed exports may run long; idle reads are bounded instead
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=INFLUXDB_QUERY_TIMEOUT)
+        _async_client = InfluxDBClientAsync(url = INFLUXDB_URL, token = INFLUXDB_TOKEN, org = INFLUXDB_ORG,
+                                            timeout = timeout, connection_pool_maxsize = INFLUXDB_POOL_SIZE)
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+async def ping_influxdb() -> None:
+    """Raise unless InfluxDB answers its ping; also opens the pooled async connection."""
+    if not await asyncio.wait_for(get_async_client().ping(), timeout = INFLUXDB_QUERY_TIMEOUT):
+        raise ConnectionError(f"InfluxDB at {INFLUXDB_URL} is not reachable")
+
+
+def _count_records(tables: TableList) -> int:
+    return sum(len(table.records) for table in tables)
+
+
+async def query_async(query: str, name: str = "other", timeout: float = INFLUXDB_QUERY_TIMEOUT) -> TableList:
+    """Run a Flux query without blocking the event loop, bounded by a per-query timeout.
+
+    `name` labels the query's duration and row count in the metrics. While the request is profiled, the
+    query runs with the Flux profilers enabled instead.
+    """
+    profile = current_profile()
+    if profile is not None:
+        return await _profiled_query(query, name, profile, timeout)
+    started = time.perf_counter()
+    try:
+        tables = await asyncio.wait_for(get_async_client().query_api().query(query), timeout = timeout)
+    except Exception:
+        observe_query(name, started, None)
+        raise
+    observe_query(name, started, _count_records(tables))
+    return tables
+
+
+async def _profiled_query(query: str, name: str, profile: QueryProfile, timeout: float) -> TableList:
+    """Run a query with the Flux profilers on, timing server round trip and CSV decoding separately."""
+    records: List[Dict[str, Any]] = []
+    options = profiler_query_options(records)
+    started = time.perf_counter()
+    try:
+        body = await asyncio.wait_for(get_async_client().query_api().query_raw(with_flux_profilers(query)),
+                                      timeout = timeout)
+    except Exception:
+        observe_query(name, started, None)
+        raise
+    server = time.perf_counter() - started
+    decode_started = time.perf_counter()
+    tables = await asyncio.to_thread(decode_flux_csv, body, options)
+    decode = time.perf_counter() - decode_started
+    rows = _count_records(tables)
+    observe_query(name, started, rows)
+    profile.add_query(name, query, server, decode, rows, records)
+    return tables
+
+
+def query_sync(query: str, name: str = "other") -> TableList:
+    """Run a Flux query on the shared synchronous client, recording its duration and row count."""
+    started = time.perf_counter()
+    try:
+        tables = get_query_api().query(query)
+    except Exception:
+        observe_query(name, started, None)
+        raise
+    observe_query(name, started, _count_records(tables))
+    return tables
 
 def save_to_influxdb(data: List[Dict[str, Any]]) -> None:
-    """Save air quality data to InfluxDB with source tag asynchronously."""
+    """Save air quality data to InfluxDB with source tag, through the write-ahead spool."""
     if not data:
         logging.warning("No data to save to InfluxDB")
         return
 
-    points = [
-        Point("air_quality")
-        .tag("station_id", entry["station_id"])
-        .tag("source", entry.get("source", "gios"))
-        .time(entry["timestamp"])
-        .field(field, float(entry[field]))
-        for entry in data
-        for field in ["pm25", "pm10", "no2", "so2", "o3", "co", "c6h6"]
-        if field in entry and entry[field] is not None
-    ]
-
-    if points:
-        if write_api is None:
-            logging.error("write_api is None, cannot proceed with write")
-            raise ValueError("write_api is not initialized")
+    serializer = get_serializer()
+    serializer.add_entries(data)
+
+    if serializer.lines:
+        sources: Dict[str, Dict[str, Any]] = {}
+        for entry in data:
+            ts = timestamp_ns(entry["timestamp"])
+            span = sources.setdefault(entry.get("source") or "gios", {"start": ts, "stop": ts, "stations": {}})
+            span["start"], span["stop"] = min(span["start"], ts), max(span["stop"], ts)
+            station_id = str(entry["station_id"])
+            span["stations"][station_id] = max(span["stations"].get(station_id, 0), ts)
+        meta = {"stations": sorted({station for span in sources.values() for station in span["stations"]}),
+                "start": min(span["start"] for span in sources.values()),
+                "stop": max(span["stop"] for span in sources.values()),
+                "sources": sources}
         try:
-            result = write_api.write(bucket=INFLUXDB_BUCKET, record=points)
+            get_spool().append(serializer.getvalue(), meta)
         except Exception as e:
             logging.error(f"Error saving air quality data to InfluxDB: {e}")
             raise
 
-def save_user_station(station_data: Dict[str, Any]) -> None:
-    """Save or update user station metadata (lat, lon) in InfluxDB synchronously."""
-    lat_value = float(station_data.get("lat", 0))
-    lon_value = float(station_data.get("lon", 0))
-    point = Point("user_stations").tag("station_id", station_data["station_id"]) \
-        .field("lat", lat_value).field("lon", lon_value).time(datetime.utcnow().isoformat())
+def save_user_station(station_data: Dict[str, Any]) -> bool:
+    """Save or update user station metadata (lat, lon) in InfluxDB, through the write-ahead spool.
+
+    Returns False without writing when the station is already known at the same location.
+    """
+    metadata_index = get_metadata_index()
+    lat_value = float(station_data.get("lat") or 0)
+    lon_value = float(station_data.get("lon") or 0)
+    if metadata_index.user_location(station_data["station_id"]) == (lat_value, lon_value):
+        return False
+    now_ns = datetime_to_ns(datetime.utcnow())
+    serializer = get_serializer()
+    serializer.add_point({"station_id": station_data["station_id"]}, {"lat": lat_value, "lon": lon_value},
+                         now_ns, measurement="user_stations")
 
-    if write_api is None:
-        logging.error("write_api is None, cannot proceed with write")
-        raise ValueError("write_api is not initialized")
     try:
-        result = write_api.write(bucket=INFLUXDB_BUCKET, record=[point])
+        get_spool().append(serializer.getvalue())
     except Exception as e:
         logging.error(f"Error saving user station data: {e}")
         raise
+    # The point is durable in the spool, so the index can serve the new location right away
+    metadata_index.observe_location(station_data["station_id"], lat_value, lon_value, now_ns)
+    station_locator.update_user_station(station_data["station_id"], lat_value, lon_value)
+    metadata_index.save(force = False)
+    return True
 
-def get_air_quality(station_ids: List[str] | None = None,
+async def get_air_quality(station_ids: List[str] | None = None,
                    start_date: str | None = None,
                    end_date: str | None = None,
                    aggregation: str = "1h",
                    source: str | None = None) -> List[Dict[str, Any]]:
     """Fetch air quality data with optional filters and aggregation."""
+    start, end = _parse_date_range(start_date, end_date)
+    cache_key = ("air_quality", tuple(sorted(set(station_ids or []))), start, end, aggregation, source)
+    profiled = current_profile() is not None  # Profiled requests always go to InfluxDB
+    cached = None if profiled else air_quality_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = air_quality_cache.generation
+
+    start_ns, stop_ns = _range_ns(start, end)
+    try :
+        result = await _fetch_air_quality(station_ids, source, aggregation, start_ns, stop_ns)
+    except Exception as e :
+        logging.error(f"Error fetching air quality failed: {e}")
+        return []
+    if not profiled:
+        air_quality_cache.put(cache_key, result, station_ids, start_ns, stop_ns, generation)
+    return result
+
+
+def stream_air_quality(station_ids: List[str] | None = None,
+                       start_date: str | None = None,
+                       end_date: str | None = None,
+                       aggregation: str = "1h",
+                       source: str | None = None) -> AsyncIterator[Dict[str, Any]]:
+    """Yield aggregated air quality rows as InfluxDB streams them, without materializing the result.
+
+    Streaming always reads the raw measurement and bypasses the result cache, so memory stays constant
+    for exports of any size.
+    """
+    start_ns, stop_ns = _range_ns(*_parse_date_range(start_date, end_date))
+    query = _raw_air_quality_query(station_ids, source, aggregation, start_ns, stop_ns)
+
+    async def rows() -> AsyncIterator[Dict[str, Any]]:
+        started, count = time.perf_counter(), 0
+        try:
+            async for record in await get_async_client().query_api().query_stream(query):
+                count += 1
+                yield _air_quality_row(record)
+        except Exception:
+            observe_query("air_quality_stream", started, None)
+            raise
+        observe_query("air_quality_stream", started, count)
+
+    return rows()
+
+
+def _parse_date_range(start_date: str | None, end_date: str | None) -> Tuple[date, date]:
     try :
         start = datetime.strptime(start_date or "2025-01-01", "%Y-%m-%d").date()
         end = datetime.strptime(end_date or datetime.utcnow().strftime("%Y-%m-%d"), "%Y-%m-%d").date()
-        if start > end :
-            raise HTTPException(status_code = 400, detail = "Invalid date range: start_date must be ≤ end_date")
     except ValueError as e:
         raise HTTPException(status_code = 400, detail = "Invalid date format. Expected YYYY-MM-DD")
+    if start > end :
+        raise HTTPException(status_code = 400, detail = "Invalid date range: start_date must be ≤ end_date")
+    return start, end
 
-    station_filter = ""
-    if station_ids :
-        conditions = " or ".join([f'r["station_id"] == "{station}"' for station in station_ids])
-        station_filter = f"|> filter(fn: (r) => {conditions})"
-    source_filter = f'|> filter(fn: (r) => r["source"] == "{source}")' if source else ""
-    query = f'''
+
+def _range_ns(start: date, end: date) -> Tuple[int, int]:
+    """Query window from start 00:00:00Z to end 23:59:59Z, in nanoseconds."""
+    start_ns = datetime_to_ns(datetime.combine(start, datetime.min.time()))
+    return start_ns, datetime_to_ns(datetime.combine(end, datetime.min.time())) + _LAST_SECOND_OF_DAY_NS
+
+
+def _station_filter(station_ids: List[str] | None) -> str:
+    if not station_ids:
+        return ""
+    conditions = " or ".join([f'r["station_id"] == "{station}"' for station in station_ids])
+    return f"|> filter(fn: (r) => {conditions})"
+
+
+def _source_filter(source: str | None) -> str:
+    return f'|> filter(fn: (r) => r["source"] == "{source}")' if source else ""
+
+
+async def _fetch_air_quality(station_ids: List[str] | None, source: str | None, aggregation: str,
+                       start_ns: int, stop_ns: int) -> List[Dict[str, Any]]:
+    """Aggregate [start, stop) from rollups where they cover whole windows, and from raw data elsewhere."""
+    period = choose_rollup(aggregation)
+    full_windows = split_range(start_ns, stop_ns, parse_duration(aggregation)) if period else None
+    if not full_windows or not get_rollup_tracker().is_clean(period, station_ids, *full_windows):
+        return await _query_raw_air_quality(station_ids, source, aggregation, start_ns, stop_ns)
+
+    first, last = full_windows
+    result = []
+    if start_ns < first:
+        result += await _query_raw_air_quality(station_ids, source, aggregation, start_ns, first)
+    records = await _query_rollup_records(station_ids, source, period, first, last)
+    with profile_phase("transform"):
+        result += combine_rollup_rows(records, parse_duration(aggregation))
+    if last < stop_ns:
+        result += await _query_raw_air_quality(station_ids, source, aggregation, last, stop_ns)
+    result.sort(key=lambda row: (row["station_id"], row["source"] or "", row["timestamp"]))
+    return result
+
+
+def _raw_air_quality_query(station_ids: List[str] | None, source: str | None, aggregation: str,
+                           start_ns: int, stop_ns: int) -> str:
+    return f'''
             from(bucket: "{INFLUXDB_BUCKET}")
-            |> range(start: {start}T00:00:00Z, stop: {end}T23:59:59Z)
+            |> range(start: time(v: {start_ns}), stop: time(v: {stop_ns}))
             |> filter(fn: (r) => r._measurement == "air_quality")
-            {station_filter}
-            {source_filter}
+            {_station_filter(station_ids)}
+            {_source_filter(source)}
             |> aggregateWindow(every: {aggregation}, fn: mean, createEmpty: false)
             |> pivot(rowKey:["_time"], columnKey:["_field"], valueColumn:"_value")
             |> yield(name: "mean")
         '''
-    try :
-        tables = query_api.query(query)
+
+
+def _air_quality_row(record) -> Dict[str, Any]:
+    return {
+        "station_id" : record.values["station_id"],
+        "source" : record.values.get("source", "gios"),
+        "timestamp" : record.get_time().isoformat(),
+        **{k: v for k, v in record.values.items() if k not in ["result", "table", "_start", "_stop", "_time", "_measurement", "station_id"]}
+    }
+
+
+async def _query_raw_air_quality(station_ids: List[str] | None, source: str | None, aggregation: str,
+                                 start_ns: int, stop_ns: int) -> List[Dict[str, Any]]:
+    with profile_phase("build"):
+        query = _raw_air_quality_query(station_ids, source, aggregation, start_ns, stop_ns)
+    tables = await query_async(query, "air_quality_raw")
+    with profile_phase("transform"):
+        return [_air_quality_row(record) for table in tables for record in table.records]
+
+
+async def _query_rollup_records(station_ids: List[str] | None, source: str | None, period: str,
+                                start_ns: int, stop_ns: int) -> List[Tuple[str, str, str, int, str, float]]:
+    """Fetch mean/count rollup records of windows ending in (start, stop]."""
+    with profile_phase("build"):
+        query = f'''
+            from(bucket: "{INFLUXDB_BUCKET}")
+            |> range(start: time(v: {start_ns + 1}), stop: time(v: {stop_ns + 1}))
+            |> filter(fn: (r) => r._measurement == "{ROLLUP_MEASUREMENT}" and r["period"] == "{period}")
+            |> filter(fn: (r) => r["stat"] == "mean" or r["stat"] == "count")
+            {_station_filter(station_ids)}
+            {_source_filter(source)}
+            |> keep(columns: ["_time", "_field", "_value", "station_id", "source", "stat"])
+        '''
+    tables = await query_async(query, "air_quality_rollup")
+    with profile_phase("transform"):
         return [
-            {
-                "station_id" : record.values["station_id"],
-                "source" : record.values.get("source", "gios"),
-                "timestamp" : record.get_time().isoformat(),
-                **{k: v for k, v in record.values.items() if k not in ["result", "table", "_start", "_stop", "_time", "_measurement", "station_id"]}
-            }
+            (record.values["station_id"], record.values.get("source", "gios"), record.get_field(),
+             datetime_to_ns(record.get_time()), record.values["stat"], record.get_value())
             for table in tables
             for record in table.records
         ]
-    except Exception as e :
-        logging.error(f"Error fetching air quality failed: {e}")
-        return []
+
+
+def _write_rollups(period: str, start_ns: int, stop_ns: int, station_ids: List[str] | None = None) -> None:
+    """Recompute rollups of one period for [start, stop) server-side, in chunks, with Flux to()."""
+    every = ROLLUP_PERIODS[period]
+    chunk = align_up(ROLLUP_CHUNK_NS, every)
+    for chunk_start in range(start_ns, stop_ns, chunk):
+        chunk_stop = min(chunk_start + chunk, stop_ns)
+        stats = ",\n".join(
+            f'data |> aggregateWindow(every: {period}, fn: {stat}, createEmpty: false) |> toFloat() '
+            f'|> set(key: "stat", value: "{stat}")'
+            for stat in ROLLUP_STATS
+        )
+        query = f'''
+            data = from(bucket: "{INFLUXDB_BUCKET}")
+                |> range(start: time(v: {chunk_start}), stop: time(v: {chunk_stop}))
+                |> filter(fn: (r) => r._measurement == "air_quality")
+                {_station_filter(station_ids)}
+            union(tables: [
+                {stats}
+            ])
+                |> set(key: "_measurement", value: "{ROLLUP_MEASUREMENT}")
+                |> set(key: "period", value: "{period}")
+                |> to(bucket: "{INFLUXDB_BUCKET}", org: "{INFLUXDB_ORG}",
+                      tagColumns: ["station_id", "source", "period", "stat"])
+                |> group()
+                |> count()
+        '''
+        query_sync(query, f"write_rollups_{period}")
+
+
+def refresh_rollups() -> int:
+    """Bring rollups up to date for everything written since the last refresh; returns ranges refreshed."""
+    rollup_tracker = get_rollup_tracker()
+    pending, upto = rollup_tracker.pending()
+    for stations, start_ns, stop_ns in pending:
+        # A handful of stations (user data) is refreshed selectively, a whole crawl for all stations
+        station_ids = sorted(stations) if len(stations) <= ROLLUP_STATION_FILTER_LIMIT else None
+        for period, every in ROLLUP_PERIODS.items():
+            window_start, window_stop = align_down(start_ns, every), align_up(stop_ns + 1, every)
+            covered = rollup_tracker.covered(period)
+            if covered and window_start < covered[1]:
+                _write_rollups(period, window_start, min(window_stop, covered[1]), station_ids)
+            if not covered or window_stop > covered[1]:
+                # Anything past the covered range is rebuilt for all stations so coverage stays exact
+                tail_start = covered[1] if covered else window_start
+                _write_rollups(period, tail_start, window_stop)
+                rollup_tracker.extend_coverage(period, tail_start, window_stop)
+    if pending:
+        rollup_tracker.clear_refreshed(pending, upto)
+        rollup_tracker.save()
+    return len(pending)
+
+
+def backfill_rollups(start_date: str, stop_date: str | None = None) -> None:
+    """Rebuild all rollups between two dates from raw data and mark them as covered."""
+    start_ns = datetime_to_ns(datetime.strptime(start_date, "%Y-%m-%d"))
+    stop_ns = datetime_to_ns(datetime.strptime(stop_date, "%Y-%m-%d") if stop_date else datetime.utcnow())
+    rollup_tracker = get_rollup_tracker()
+    for period, every in ROLLUP_PERIODS.items():
+        window_start, window_stop = align_down(start_ns, every), align_up(stop_ns, every)
+        _write_rollups(period, window_start, window_stop)
+        rollup_tracker.extend_coverage(period, window_start, window_stop)
+        rollup_tracker.save()
+        logging.info(f"Backfilled {period} rollups from {ns_to_iso(window_start)} to {ns_to_iso(window_stop)}")
 
 
 def get_stations(source: str | None = None) -> List[str] :
-    """Fetch unique station IDs from InfluxDB for the last 48 hours."""
-    source_filter = f'|> filter(fn: (r) => r["source"] == "{source}")' if source else ""
+    """Station IDs with data in the last 48 hours, served from the metadata index."""
+    return get_metadata_index().active_stations(source)
+
+def get_user_stations() -> List[Dict[str, Any]]:
+    """Latest location of every user station, served from the metadata index."""
+    return get_metadata_index().user_stations()
+
+def get_latest_timestamps(source: str = "gios", lookback: str = "-30d") -> Dict[Tuple[str, str], datetime]:
+    """Fetch the latest stored timestamp per (station_id, pollutant) for a source."""
     query = f'''
         from(bucket: "{INFLUXDB_BUCKET}")
-        |> range(start: -48h)
+        |> range(start: {lookback})
         |> filter(fn: (r) => r._measurement == "air_quality")
-        {source_filter}
-        |> group(columns: ["station_id"])
-        |> distinct(column: "station_id")
+        |> filter(fn: (r) => r["source"] == "{source}")
+        |> group(columns: ["station_id", "_field"])
+        |> last()
+        |> keep(columns: ["station_id", "_field", "_time"])
     '''
-    try :
-        tables = query_api.query(query)
-        return [record["_value"] for table in tables for record in table.records]
-    except Exception as e :
-        logging.error(f"Error fetching stations from InfluxDB: {e}")
-        return []
+    try:
+        tables = query_sync(query, "latest_timestamps")
+        return {
+            (record.values["station_id"], record.get_field()): record.get_time()
+            for table in tables
+            for record in table.records
+        }
+    except Exception as e:
+        logging.error(f"Error fetching latest timestamps: {e}")
+        return {}
 
-async def get_user_stations() -> List[Dict[str, Any]]:
-    """Fetch metadata for all user stations from InfluxDB."""
-    query = f'''
+def get_time_range(source: str | None = None) -> tuple[str, str] | None:
+    """Earliest and latest timestamps stored for a source (or all sources), served from the metadata index."""
+    return get_metadata_index().time_range(source)
+
+
+def rebuild_metadata_index() -> None:
+    """Recompute the metadata index from InfluxDB, e.g. after an import or when the index file is missing."""
+    station_query = f'''
+        from(bucket: "{INFLUXDB_BUCKET}")
+        |> range(start: 0)
+        |> filter(fn: (r) => r._measurement == "air_quality")
+        |> keep(columns: ["_time", "source", "station_id"])
+        |> group(columns: ["source", "station_id"])
+        |> max(column: "_time")
+    '''
+    first_query = f'''
+        from(bucket: "{INFLUXDB_BUCKET}")
+        |> range(start: 0)
+        |> filter(fn: (r) => r._measurement == "air_quality")
+        |> keep(columns: ["_time", "source"])
+        |> group(columns: ["source"])
+        |> min(column: "_time")
+    '''
+    location_query = f'''
         from(bucket: "{INFLUXDB_BUCKET}")
-        |> range(start: -10y)
+        |> range(start: 0)
         |> filter(fn: (r) => r._measurement == "user_stations")
         |> group(columns: ["station_id", "_time"])
         |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
@@ -145,90 +538,48 @@ async def get_user_stations() -> List[Dict[str, Any]]:
         |> group(columns: ["station_id"])
         |> sort(columns: ["_time"], desc: true)
         |> limit(n: 1)
-        |> keep(columns: ["station_id", "lat", "lon"])
     '''
+    metadata_index = get_metadata_index()
+    metadata_index.begin_rebuild()
     try:
-        tables = query_api.query(query)
-        result = [
-            {
-                "station_id": record.values["station_id"],
-                "lat": float(record.values.get("lat", 0)),
-                "lon": float(record.values.get("lon", 0))
-            }
-            for table in tables
+        last_seen: Dict[str, Dict[str, int]] = {}
+        for table in query_sync(station_query, "metadata_last_seen"):
+            for record in table.records:
+                source = record.values.get("source") or "unknown"
+                last_seen.setdefault(source, {})[record.values["station_id"]] = datetime_to_ns(record.get_time())
+        time_ranges: Dict[str, List[int]] = {}
+        for table in query_sync(first_query, "metadata_first_seen"):
+            for record in table.records:
+                source = record.values.get("source") or "unknown"
+                if last_seen.get(source):
+                    time_ranges[source] = [datetime_to_ns(record.get_time()), max(last_seen[source].values())]
+        user_locations = {
+            record.values["station_id"]: {"lat": float(record.values["lat"]), "lon": float(record.values["lon"]),
+                                          "updated": datetime_to_ns(record.get_time())}
+            for table in query_sync(location_query, "metadata_user_locations")
             for record in table.records
-        ]
-        return result
-    except Exception as e:
-        logging.error(f"Error fetching user stations: {e}")
-        return []
-
-def get_time_range(source: str | None = None) -> tuple[str, str] | None:
-    """Fetch the earliest and latest timestamps available in InfluxDB."""
-
-    def get_time(desc: str = "false") -> str | None :
-        source_filter = f'|> filter(fn: (r) => r["source"] == "{source}")' if source else ""
-        query = f'''
-        from(bucket: "{INFLUXDB_BUCKET}")
-        |> range(start: -30d)
-        |> filter(fn: (r) => r._measurement == "air_quality")
-        {source_filter}
-        |> keep(columns: ["_time"])
-        |> group(columns: [])
-        |> sort(columns: ["_time"], desc: {desc})
-        |> limit(n: 1)
-        '''
-        tables = query_api.query(query)
-        timestamps = [record["_time"] for table in tables for record in table.records]
-        return timestamps[0] if timestamps else None
-
-    try :
-        min_time = get_time(desc = "false")
-        max_time = get_time(desc = "true")
-        return (str(min_time), str(max_time)) if min_time and max_time else None
-
-    except Exception as e :
-        logging.error(f"Error fetching time range failed: {e}")
-        return None
-
-
-def export_to_file() :
-    query = f'''
-    from(bucket: "{INFLUXDB_BUCKET}")
-      |> range(start: 0)
-      |> filter(fn: (r) => r._measurement == "air_quality")
-    '''
-    result = query_api.query(query = query)
-
-    # Save data to Line Protocol file
-    with open(export_file, "w") as f :
-        for table in result :
-            for record in table.records :
-                # Define the measurement
-                measurement = record["_measurement"]
-
-                # Only include relevant tags (station_id and source)
-                tags = ",".join(f"{k}={v}" for k, v in record.values.items() if k in ["station_id", "source"])
-                if tags :
-                    tags = "," + tags
-
-                # Define the field
-                field = f"{record['_field']}={record['_value']}"
-
-                # Convert timestamp to nanoseconds
-                timestamp = int(record["_time"].timestamp() * 1_000_000_000)
+        }
+    except BaseException:
+        metadata_index.abort_rebuild()
+        raise
+    metadata_index.replace(time_ranges, last_seen, user_locations)
+    station_locator.update_user_stations(dict(metadata_index.user_locations))
+    logging.info(f"Rebuilt metadata index: {metadata_index.stats()}")
 
-                # Construct the Line Protocol line
-                line = f"{measurement}{tags} {field} {timestamp}"
-                f.write(line + "\n")
 
-    print(f"Wyeksportowano dane do pliku: {export_file}")
+def export_to_file(output_dir: str | None = None, **kwargs) -> Dict[str, Any]:
+    """Export the bucket to time-partitioned line-protocol files; see backend.export for the options."""
+    from backend.export import export_line_protocol, EXPORT_DIR
+    report = export_line_protocol(output_dir or EXPORT_DIR, **kwargs)
+    print(f"Wyeksportowano dane do katalogu: {report['output_dir']} ({report['lines']} linii, "
+          f"{report['lines_per_second']} linii/s)")
+    return report
 
 
 def clear_database(measurement: str = "air_quality") -> None :
     """Clear all data for a specific measurement from the InfluxDB bucket."""
     try :
-        delete_api = client.delete_api()
+        delete_api = get_client().delete_api()
         start = "1970-01-01T00:00:00Z"  # Start of Unix epoch
         stop = datetime.utcnow().isoformat() + "Z"  # Current time in UTC with Z suffix
 
@@ -241,26 +592,32 @@ def clear_database(measurement: str = "air_quality") -> None :
         logging.error(f"Error clearing database: {e}")
         raise
 
-def import_from_file(clear_db: bool = False) -> None:
-    """Import data from a Line Protocol file into InfluxDB."""
+def import_from_file(clear_db: bool = False, path: str | None = None, **kwargs) -> Dict[str, Any]:
+    """Import line-protocol export files into InfluxDB, writing directly rather than through the spool.
+
+    See backend.importer for batch size and parallelism; the shared client stays open afterwards.
+    """
+    from backend.export import default_import_path, export_files
+    from backend.importer import import_line_protocol
+    path = path or default_import_path()
+    # Fail on a missing or empty input before anything is deleted
+    if not export_files(path):
+        raise FileNotFoundError(f"No line-protocol files to import in {path}")
     if clear_db:
         clear_database()
+        clear_database(ROLLUP_MEASUREMENT)
+    # Imported lines bypass dirty tracking, so rollups must be backfilled afterwards
+    rollup_tracker = get_rollup_tracker()
+    rollup_tracker.reset_coverage()
+    rollup_tracker.save()
+    air_quality_cache.clear()
 
     try:
-        with open(export_file, "r") as f:
-            lines = f.readlines()
-            # Write data synchronously or ensure completion
-            write_api.write(bucket=INFLUXDB_BUCKET, record=lines)
-
-        # Flush any remaining batched data
-        write_api.flush()
-
-        print(f"Zaimportowano dane do bucketa: {INFLUXDB_BUCKET}")
-
+        report = import_line_protocol(path, **kwargs)
+        rebuild_metadata_index()
+        print(f"Zaimportowano dane do bucketa: {INFLUXDB_BUCKET} ({report['points']} punktów, "
+              f"{report['points_per_second']} punktów/s)")
+        return report
     except Exception as e:
         logging.error(f"Error during import: {e}")
         raise
-    finally:
-        # Ensure resources are cleaned up
-        write_api.close()
-        client.close()
@@ -3,22 +3,28 @@
 import json
 import os
 import logging
-from influxdb_client import InfluxDBClient, Point
-from dotenv import load_dotenv
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Dict, Any
 
-load_dotenv()
+from backend.database import INFLUXDB_BUCKET, get_query_api
+from backend.export import measurement_bounds
+from backend.line_protocol import datetime_to_ns
+from backend.models import POLLUTANT_FIELDS
+from backend.utils import parse_timestamp
 
-INFLUXDB_URL = os.getenv("INFLUXDB_URL")
-INFLUXDB_TOKEN = os.getenv("INFLUXDB_TOKEN")
-INFLUXDB_ORG = os.getenv("INFLUXDB_ORG")
-INFLUXDB_BUCKET = os.getenv("INFLUXDB_BUCKET")
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional; the JSON export works without pyarrow
+    pa = None
 
-# Validate environment variables
-if not all([INFLUXDB_URL, INFLUXDB_TOKEN, INFLUXDB_ORG, INFLUXDB_BUCKET]) :
-    raise ValueError("Missing required InfluxDB environment variables")
-
-client = InfluxDBClient(url = INFLUXDB_URL, token = INFLUXDB_TOKEN, org = INFLUXDB_ORG)
-query_api = client.query_api()
+PARQUET_DIR = os.getenv("PARQUET_DIR", "parquet")
+PARQUET_BATCH_ROWS = int(os.getenv("PARQUET_BATCH_ROWS", "50000"))  # rows per Parquet row group
+PARQUET_CONCURRENCY = int(os.getenv("PARQUET_CONCURRENCY", "4"))  # months queried in parallel
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
 
 
 def export_to_json(output_file: str = "air_quality_export.json") :
@@ -32,12 +38,13 @@ def export_to_json(output_file: str = "air_quality_export.json") :
         |> sort(columns: ["_time", "station_id"], desc: false)
     '''
     try :
-        tables = query_api.query(query)
+        tables = get_query_api().query(query)
         data = []
 
         for table in tables :
             for record in table.records :
-                entry = {"station_id" : record.values["station_id"], "timestamp" : record.get_time().isoformat(),
+                entry = {"station_id" : record.values["station_id"], "source" : record.values.get("source"),
+                    "timestamp" : record.get_time().isoformat(),
                     "pm25" : record.values.get("pm25"), "pm10" : record.values.get("pm10"),
                     "no2" : record.values.get("no2"), "so2" : record.values.get("so2"), "o3" : record.values.get("o3"),
                     "co" : record.values.get("co"), "c6h6" : record.values.get("c6h6")}
@@ -51,6 +58,173 @@ def export_to_json(output_file: str = "air_quality_export.json") :
         logging.error(f"Error exporting data: {e}")
         raise
 
+
+def parquet_schema() -> "pa.Schema":
+    """Columns stored in each Parquet file; month and source come from the partition directories."""
+    return pa.schema([
+        ("station_id", pa.string()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        *[(field, pa.float64()) for field in POLLUTANT_FIELDS],
+    ])
+
+
+def month_starts(start_ns: int, stop_ns: int) -> List[datetime]:
+    """First instant of every calendar month overlapping [start, stop], plus the month after the last one."""
+    first = datetime.fromtimestamp(start_ns / 1e9, timezone.utc)
+    last = datetime.fromtimestamp(stop_ns / 1e9, timezone.utc)
+    months = [datetime(first.year, first.month, 1, tzinfo=timezone.utc)]
+    while months[-1] <= last:
+        year, month = divmod(months[-1].month, 12)
+        months.append(datetime(months[-1].year + year, month + 1, 1, tzinfo=timezone.utc))
+    return months
+
+
+class _PartitionWriter:
+    """Buffers rows of one month/source partition and flushes them to Parquet as row groups."""
+
+    def __init__(self, path: str, schema: "pa.Schema"):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.schema = schema
+        self.rows = 0
+        self._columns: Dict[str, List[Any]] = {name: [] for name in schema.names}
+        self._writer = pq.ParquetWriter(f"{path}.tmp", schema, compression=PARQUET_COMPRESSION)
+
+    def add(self, values: Dict[str, Any]) -> None:
+        for name, column in self._columns.items():
+            column.append(values.get(name))
+        if len(self._columns["station_id"]) >= PARQUET_BATCH_ROWS:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._columns["station_id"]:
+            batch = pa.record_batch([pa.array(column, self.schema.field(name).type)
+                                     for name, column in self._columns.items()], schema=self.schema)
+            self._writer.write_batch(batch)
+            self.rows += batch.num_rows
+            for column in self._columns.values():
+                column.clear()
+
+    def close(self) -> None:
+        """Finish the file and publish it under its final name."""
+        self.flush()
+        self._writer.close()
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def abort(self) -> None:
+        """Drop a partition that could not be exported completely, so no partial file is published."""
+        try:
+            self._writer.close()
+        finally:
+            if os.path.exists(f"{self.path}.tmp"):
+                os.remove(f"{self.path}.tmp")
+
+
+def export_month(month_start: datetime, month_stop: datetime, output_dir: str,
+                 start_ns: int | None = None, stop_ns: int | None = None) -> Dict[str, int]:
+    """Stream one month of pivoted air quality rows, cut to [start, stop), into one Parquet file per source.
+
+    Files are only published once the whole month was read; on an error none of them is.
+    """
+    range_start = max(datetime_to_ns(month_start), start_ns) if start_ns is not None else datetime_to_ns(month_start)
+    range_stop = min(datetime_to_ns(month_stop), stop_ns) if stop_ns is not None else datetime_to_ns(month_stop)
+    if range_start >= range_stop:
+        return {}
+    query = f'''
+        from(bucket: "{INFLUXDB_BUCKET}")
+            |> range(start: time(v: {range_start}), stop: time(v: {range_stop}))
+            |> filter(fn: (r) => r._measurement == "air_quality")
+            |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+    '''
+    schema = parquet_schema()
+    writers: Dict[str, _PartitionWriter] = {}
+    try:
+        for record in get_query_api().query_stream(query):
+            values = record.values
+            source = values.get("source") or "unknown"
+            writer = writers.get(source)
+            if writer is None:
+                path = os.path.join(output_dir, f"month={month_start:%Y-%m}", f"source={source}", "part-0.parquet")
+                writer = writers[source] = _PartitionWriter(path, schema)
+            writer.add({**values, "timestamp": values["_time"]})
+    except BaseException:
+        for writer in writers.values():
+            writer.abort()
+        raise
+    for writer in writers.values():
+        writer.close()
+    return {source: writer.rows for source, writer in writers.items()}
+
+
+def export_to_parquet(output_dir: str = PARQUET_DIR, start: str | None = None, stop: str | None = None,
+                      concurrency: int = PARQUET_CONCURRENCY) -> Dict[str, Any]:
+    """Export air quality data to Parquet files partitioned by month and source (hive-style directories)."""
+    if pa is None:
+        raise RuntimeError("pyarrow is required for the Parquet export")
+    bounds = measurement_bounds("air_quality")
+    if bounds is None:
+        return {"output_dir": output_dir, "rows": 0, "partitions": 0, "duration": 0.0}
+    # Like read_parquet, stop is exclusive; without one the last stored row is included
+    start_ns = datetime_to_ns(parse_timestamp(start)) if start else bounds[0]
+    stop_ns = datetime_to_ns(parse_timestamp(stop)) if stop else bounds[1] + 1
+    months = month_starts(start_ns, stop_ns)
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda i: export_month(months[i], months[i + 1], output_dir, start_ns, stop_ns),
+                                    range(len(months) - 1)))
+    duration = time.time() - started
+    rows = sum(sum(result.values()) for result in results)
+    report = {
+        "output_dir": output_dir,
+        "rows": rows,
+        "partitions": sum(len(result) for result in results),
+        "duration": round(duration, 3),
+        "rows_per_second": round(rows / duration) if duration else None,
+    }
+    logging.info(f"Parquet export finished: {report}")
+    return report
+
+
+def read_parquet(directory: str = PARQUET_DIR, start: str | None = None, stop: str | None = None,
+                 sources: List[str] | None = None, station_ids: List[str] | None = None,
+                 columns: List[str] | None = None) -> "pa.Table":
+    """Load exported Parquet data, skipping partitions outside the requested months and sources."""
+    if pa is None:
+        raise RuntimeError("pyarrow is required to read Parquet exports")
+    dataset = ds.dataset(directory, format="parquet", partitioning="hive")
+    condition = None
+
+    def add(expression) -> None:
+        nonlocal condition
+        condition = expression if condition is None else condition & expression
+
+    if start:
+        start_at = parse_timestamp(start)
+        add(ds.field("month") >= f"{start_at:%Y-%m}")
+        add(ds.field("timestamp") >= pa.scalar(start_at, pa.timestamp("us", tz="UTC")))
+    if stop:
+        stop_at = parse_timestamp(stop)
+        add(ds.field("month") <= f"{stop_at:%Y-%m}")
+        add(ds.field("timestamp") < pa.scalar(stop_at, pa.timestamp("us", tz="UTC")))
+    if sources:
+        add(ds.field("source").isin(sources))
+    if station_ids:
+        add(ds.field("station_id").isin(station_ids))
+    return dataset.to_table(columns=columns, filter=condition)
+
+
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export air quality data from InfluxDB to JSON or Parquet.")
+    parser.add_argument("--format", choices=["json", "parquet"], default="json")
+    parser.add_argument("--output", default=None, help="JSON file or Parquet directory")
+    parser.add_argument("--start", default=None)
+    parser.add_argument("--stop", default=None)
+    args = parser.parse_args()
     logging.basicConfig(level=logging.INFO)
-    export_to_json()
\ No newline at end of file
+    if args.format == "parquet":
+        export_to_parquet(args.output or PARQUET_DIR, args.start, args.stop)
+    else:
+        export_to_json(args.output or "air_quality_export.json")
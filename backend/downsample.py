@@ -0,0 +1,82 @@
+# file: backend/downsample.py
+
+from typing import List, Dict, Any
+
+import numpy as np
+import pandas as pd
+
+from backend.models import POLLUTANT_FIELDS
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `n_out` points that keep the visual shape of (x, y).
+
+    One Python step per output bucket; the area computation inside each bucket is vectorized.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        area = np.abs((x[anchor] - avg_x) * (y[start:stop] - y[anchor])
+                      - (x[anchor] - x[start:stop]) * (avg_y - y[anchor]))
+        anchor = start + int(np.argmax(area))
+        selected[i + 1] = anchor
+    return selected
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Keep the minimum and maximum of each of n_out/2 equal-count buckets, plus both end points."""
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    buckets = (n_out - 2) // 2
+    inner = np.arange(1, n - 1)
+    bucket = (inner - 1) * buckets // (n - 2)
+    order = np.lexsort((y[inner], bucket))
+    sorted_bucket = bucket[order]
+    change = sorted_bucket[1:] != sorted_bucket[:-1]
+    ends = np.r_[True, change] | np.r_[change, True]
+    return np.unique(np.r_[0, inner[order[ends]], n - 1])
+
+
+_SELECTORS = {"lttb": lttb_indices, "minmax": minmax_indices}
+
+
+def downsample_rows(rows: List[Dict[str, Any]], max_points: int, method: str = "lttb") -> List[Dict[str, Any]]:
+    """Reduce every (station, source, pollutant) series to about `max_points` points.
+
+    Rows hold all pollutants of one timestamp, so the result is the union of the rows picked for each
+    pollutant; rows keep their original order.
+    """
+    if not rows or len(rows) <= max_points:
+        return rows
+    select = _SELECTORS[method]
+    times = pd.to_datetime([row["timestamp"] for row in rows], utc=True, format="ISO8601").asi8.astype(np.float64)
+    series = np.array([f"{row['station_id']}\0{row.get('source') or ''}" for row in rows], dtype=object)
+    values = {field: np.array([row.get(field) for row in rows], dtype=np.float64) for field in POLLUTANT_FIELDS}
+
+    order = np.lexsort((times, series))
+    sorted_series = series[order]
+    starts = np.flatnonzero(np.r_[True, sorted_series[1:] != sorted_series[:-1]])
+    keep = np.zeros(len(rows), dtype=bool)
+    for segment in np.split(order, starts[1:]):
+        if len(segment) <= max_points:
+            keep[segment] = True
+            continue
+        for y in values.values():
+            present = segment[~np.isnan(y[segment])]
+            if len(present) <= max_points:
+                keep[present] = True
+            else:
+                keep[present[select(times[present], y[present], max_points)]] = True
+    return [rows[i] for i in np.flatnonzero(keep)]
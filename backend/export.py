@@ -0,0 +1,209 @@
+# file: backend/export.py
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Tuple
+
+from backend.database import INFLUXDB_BUCKET, get_query_api
+from backend.line_protocol import LineProtocolSerializer, datetime_to_ns, timestamp_ns
+from backend.rollups import parse_duration, align_down, ns_to_iso
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", "export")
+EXPORT_WINDOW = os.getenv("EXPORT_WINDOW", "30d")  # time span of data per exported file
+EXPORT_CONCURRENCY = int(os.getenv("EXPORT_CONCURRENCY", "4"))  # windows queried in parallel
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "5"))
+EXPORT_MEASUREMENTS = ["air_quality", "user_stations"]
+EXPORT_FLUSH_LINES = 10_000  # lines buffered before they are written to the file
+
+MANIFEST_FILE = "manifest.json"
+LEGACY_EXPORT_FILE = "exported_data.line"  # single-file export written by earlier versions
+_SKIPPED_COLUMNS = {"result", "table"}
+
+
+def default_import_path() -> str:
+    """EXPORT_DIR, or the legacy single export file when only that one exists."""
+    if not os.path.isdir(EXPORT_DIR) and os.path.isfile(LEGACY_EXPORT_FILE):
+        return LEGACY_EXPORT_FILE
+    return EXPORT_DIR
+
+
+def export_files(path: str) -> List[str]:
+    """Line-protocol files making up an export: the file itself, or every .lp/.lp.gz file in a directory.
+
+    Raises FileNotFoundError when the path does not exist.
+    """
+    if os.path.isfile(path):
+        return [path]
+    return sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith((".lp", ".lp.gz")))
+
+
+def open_export_file(path: str, mode: str = "rt"):
+    """Open an export file, transparently handling gzip compression."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8") if "t" in mode else gzip.open(path, mode)
+    return open(path, mode, encoding="utf-8") if "t" in mode else open(path, mode)
+
+
+def measurement_bounds(measurement: str) -> Tuple[int, int] | None:
+    """First and last timestamp (ns) stored for a measurement, or None when it is empty."""
+    bounds = []
+    for fn in ("min", "max"):
+        query = f'''
+            from(bucket: "{INFLUXDB_BUCKET}")
+                |> range(start: 0)
+                |> filter(fn: (r) => r._measurement == "{measurement}")
+                |> keep(columns: ["_time"])
+                |> group()
+                |> {fn}(column: "_time")
+        '''
+        records = [record for table in get_query_api().query(query) for record in table.records]
+        if not records:
+            return None
+        bounds.append(datetime_to_ns(records[0].get_time()))
+    return bounds[0], bounds[1]
+
+
+def _window_records(measurement: str, start_ns: int, stop_ns: int) -> Iterator[Any]:
+    query = f'''
+        from(bucket: "{INFLUXDB_BUCKET}")
+            |> range(start: time(v: {start_ns}), stop: time(v: {stop_ns}))
+            |> filter(fn: (r) => r._measurement == "{measurement}")
+    '''
+    return get_query_api().query_stream(query)
+
+
+def write_window(measurement: str, start_ns: int, stop_ns: int, path: str) -> Dict[str, int]:
+    """Stream one window of a measurement into a line-protocol file, one typed field per line.
+
+    The file is written under a temporary name and renamed when complete, so a partial window never looks done.
+    """
+    serializer = LineProtocolSerializer(measurement)
+    lines = 0
+    tmp_path = f"{path}.tmp"
+    if path.endswith(".gz"):
+        f = gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=EXPORT_GZIP_LEVEL)
+    else:
+        f = open(tmp_path, "w", encoding="utf-8")
+    with f:
+        for record in _window_records(measurement, start_ns, stop_ns):
+            values = record.values
+            tags = {key: value for key, value in values.items()
+                    if not key.startswith("_") and key not in _SKIPPED_COLUMNS}
+            serializer.add_point(tags, {values["_field"]: values["_value"]}, datetime_to_ns(values["_time"]))
+            if serializer.lines >= EXPORT_FLUSH_LINES:
+                lines += serializer.lines
+                f.write(serializer.getvalue())
+                serializer.clear()
+        lines += serializer.lines
+        f.write(serializer.getvalue())
+    os.replace(tmp_path, path)
+    return {"lines": lines, "bytes": os.path.getsize(path)}
+
+
+class ExportManifest:
+    """Per-export record of finished windows, saved after every window so an interrupted export can resume."""
+
+    def __init__(self, directory: str, params: Dict[str, Any], resume: bool = True):
+        self.path = os.path.join(directory, MANIFEST_FILE)
+        self._lock = threading.Lock()
+        self.data = {"params": params, "windows": {}}
+        if resume and os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                existing = json.load(f)
+            if existing.get("params") != params:
+                raise ValueError(f"Export in {directory} was started with different parameters; "
+                                 f"use a new directory or disable resume")
+            self.data = existing
+
+    def done(self, name: str, directory: str) -> bool:
+        entry = self.data["windows"].get(name)
+        return entry is not None and os.path.exists(os.path.join(directory, name))
+
+    def record(self, name: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self.data["windows"][name] = entry
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.data, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def export_line_protocol(output_dir: str = EXPORT_DIR, start: str | None = None, stop: str | None = None,
+                         measurements: List[str] | None = None, window: str = EXPORT_WINDOW,
+                         compress: bool = True, concurrency: int = EXPORT_CONCURRENCY,
+                         resume: bool = True) -> Dict[str, Any]:
+    """Export measurements as time-partitioned line-protocol files, querying windows in parallel."""
+    window_ns = parse_duration(window)
+    if window_ns is None:
+        raise ValueError(f"Export window must be a fixed duration, got {window!r}")
+    measurements = measurements or EXPORT_MEASUREMENTS
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = ExportManifest(output_dir, {"window": window, "compress": compress, "start": start, "stop": stop,
+                                           "measurements": measurements}, resume)
+
+    jobs = []
+    for measurement in measurements:
+        bounds = measurement_bounds(measurement)
+        if bounds is None:
+            continue
+        first = timestamp_ns(start) if start else bounds[0]
+        last = timestamp_ns(stop) if stop else bounds[1] + 1
+        for window_start in range(align_down(first, window_ns), last, window_ns):
+            window_stop = window_start + window_ns
+            name = f"{measurement}-{ns_to_iso(window_start)[:19].replace(':', '')}.lp" + (".gz" if compress else "")
+            if not manifest.done(name, output_dir):
+                jobs.append((measurement, max(window_start, first), min(window_stop, last), name))
+
+    started = time.time()
+    totals = {"lines": 0, "bytes": 0}
+    totals_lock = threading.Lock()
+
+    def run(job: Tuple[str, int, int, str]) -> None:
+        measurement, window_start, window_stop, name = job
+        result = write_window(measurement, window_start, window_stop, os.path.join(output_dir, name))
+        manifest.record(name, {"measurement": measurement, "start": window_start, "stop": window_stop, **result})
+        with totals_lock:
+            totals["lines"] += result["lines"]
+            totals["bytes"] += result["bytes"]
+        elapsed = time.time() - started
+        logging.info(f"Exported {name}: {result['lines']} lines ({totals['lines'] / elapsed:.0f} lines/s overall)")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run, jobs))
+
+    duration = time.time() - started
+    report = {
+        "output_dir": output_dir,
+        "windows_written": len(jobs),
+        "windows_total": len(manifest.data["windows"]),
+        "lines": totals["lines"],
+        "bytes": totals["bytes"],
+        "duration": round(duration, 3),
+        "lines_per_second": round(totals["lines"] / duration) if duration else None,
+        "mb_per_second": round(totals["bytes"] / duration / 1e6, 2) if duration else None,
+    }
+    logging.info(f"Export finished: {report}")
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export InfluxDB data to time-partitioned line-protocol files.")
+    parser.add_argument("--output", default=EXPORT_DIR, help="Directory for the export files and manifest")
+    parser.add_argument("--start", default=None, help="First timestamp to export (default: earliest stored)")
+    parser.add_argument("--stop", default=None, help="Timestamp to stop before (default: latest stored)")
+    parser.add_argument("--measurement", action="append", help="Measurement to export (repeatable)")
+    parser.add_argument("--window", default=EXPORT_WINDOW, help="Time span per file, e.g. 7d or 30d")
+    parser.add_argument("--concurrency", type=int, default=EXPORT_CONCURRENCY)
+    parser.add_argument("--no-gzip", action="store_true", help="Write plain .lp files")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore an existing manifest and start over")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    export_line_protocol(args.output, args.start, args.stop, args.measurement, args.window,
+                         not args.no_gzip, args.concurrency, not args.no_resume)
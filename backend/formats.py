@@ -0,0 +1,134 @@
+# file: backend/formats.py
+
+import io
+import json
+import logging
+from typing import List, Dict, Any, AsyncIterable, AsyncIterator
+
+from fastapi.responses import Response
+
+from backend.models import POLLUTANT_FIELDS
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # Arrow output is optional; clients fall back to columnar JSON
+    pa = None
+    pc = None
+
+JSON_MEDIA_TYPE = "application/json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+COLUMNAR_JSON_MEDIA_TYPE = "application/vnd.airquality.columnar+json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+STREAM_CHUNK_BYTES = 64 * 1024
+STREAM_BATCH_ROWS = 10_000
+
+AIR_QUALITY_COLUMNS = ["station_id", "source", "timestamp", *POLLUTANT_FIELDS]
+
+
+def negotiate(accept: str | None) -> str:
+    """Pick the best supported media type from an Accept header, honouring q-values."""
+    supported = [JSON_MEDIA_TYPE, COLUMNAR_JSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE] + \
+                ([ARROW_MEDIA_TYPE] if pa is not None else [])
+    candidates = []
+    for position, part in enumerate((accept or "").split(",")):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if media_type in supported and quality > 0:
+            candidates.append((-quality, position, media_type))
+    return min(candidates)[2] if candidates else JSON_MEDIA_TYPE
+
+
+def to_columns(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Transpose row dicts into one list per air quality column."""
+    return {column: [row.get(column) for row in rows] for column in AIR_QUALITY_COLUMNS}
+
+
+def columnar_json_response(rows: List[Dict[str, Any]]) -> Response:
+    body = json.dumps({"length": len(rows), "columns": to_columns(rows)}, separators=(",", ":"))
+    return Response(content=body, media_type=COLUMNAR_JSON_MEDIA_TYPE)
+
+
+def arrow_schema() -> "pa.Schema":
+    return pa.schema([
+        ("station_id", pa.string()),
+        ("source", pa.string()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        *[(field, pa.float64()) for field in POLLUTANT_FIELDS],
+    ])
+
+
+def to_arrow_table(rows: List[Dict[str, Any]]) -> "pa.Table":
+    columns = to_columns(rows)
+    schema = arrow_schema()
+    arrays = [
+        pc.cast(pa.array(columns["timestamp"], pa.string()), schema.field("timestamp").type)
+        if column == "timestamp" else pa.array(columns[column], schema.field(column).type)
+        for column in AIR_QUALITY_COLUMNS
+    ]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def arrow_response(rows: List[Dict[str, Any]]) -> Response:
+    """Serialize rows as an Arrow IPC stream."""
+    table = to_arrow_table(rows)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+
+
+async def _log_stream_errors(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Headers are already sent once streaming starts, so a failure can only end the body early."""
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except Exception as e:
+        logging.error(f"Error while streaming air quality data: {e}")
+
+
+def ndjson_stream(rows: AsyncIterable[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Encode rows as newline-delimited JSON, flushed in chunks of about STREAM_CHUNK_BYTES."""
+
+    async def chunks() -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        async for row in rows:
+            buffer.write(json.dumps(row, separators=(",", ":")))
+            buffer.write("\n")
+            if buffer.tell() >= STREAM_CHUNK_BYTES:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    return _log_stream_errors(chunks())
+
+
+def arrow_stream(rows: AsyncIterable[Dict[str, Any]], batch_rows: int = STREAM_BATCH_ROWS) -> AsyncIterator[bytes]:
+    """Encode rows as an Arrow IPC stream, one record batch per `batch_rows` rows."""
+
+    async def chunks() -> AsyncIterator[bytes]:
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, arrow_schema()) as writer:
+            batch = []
+            async for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_rows:
+                    writer.write_table(to_arrow_table(batch))
+                    batch = []
+                    yield sink.getvalue()
+                    sink.seek(0)
+                    sink.truncate()
+            if batch:
+                writer.write_table(to_arrow_table(batch))
+        yield sink.getvalue()  # Remaining batch and end-of-stream marker
+
+    return _log_stream_errors(chunks())
@@ -1,15 +1,21 @@
 # file: backend/gios_api.py
 
-import aiohttp
+import argparse
 import asyncio
+import contextlib
+import os
+import time
 from typing import List, Dict, Any
 import logging
-from tqdm.asyncio import tqdm
-from backend.database import save_to_influxdb
-import certifi
-import ssl
+import aiohttp
+from backend.catalog import load_catalog
+from backend.crawler import Crawler, CrawlError, CrawlReport, create_session
+from backend.database import save_to_influxdb, get_latest_timestamps, refresh_rollups, get_spool
+from backend.metrics import CRAWL_STAGE_SECONDS, timed
+from backend.spatial import station_locator
+from backend.spool import SPOOL_DRAIN_TIMEOUT
+from backend.watermarks import WatermarkStore
 
-GIOS_URL = "https://api.gios.gov.pl/pjp-api/rest"
 PARAM_MAPPING = {
     "pm10": "pm10",
     "pm2.5": "pm25",
@@ -20,99 +26,155 @@ PARAM_MAPPING = {
     "c6h6": "c6h6"
 }
 
+GIOS_QUEUE_SIZE = int(os.getenv("GIOS_QUEUE_SIZE", "64"))  # sensors buffered between crawl and write
+GIOS_WRITE_BATCH = int(os.getenv("GIOS_WRITE_BATCH", "5000"))  # readings per InfluxDB write
+GIOS_PROGRESS_STEPS = int(os.getenv("GIOS_PROGRESS_STEPS", "10"))  # progress log lines per crawl
 
-async def fetch_sensors(session: aiohttp.ClientSession, station_id: str) -> List[Dict[str, Any]]:
-    try:
-        async with session.get(f"{GIOS_URL}/station/sensors/{station_id}") as response:
-            if response.status != 200:
-                logging.warning(f"Skipping station {station_id}: HTTP {response.status}")
-                return []
-            return await response.json()
-    except Exception as e:
-        logging.error(f"Error fetching sensors for station {station_id}: {e}")
-        return []
+_END_OF_CRAWL = None
+
+watermarks = WatermarkStore()
+current_crawl: CrawlReport | None = None  # Report of the crawl in progress (or the last one), for progress reporting
 
 
-async def fetch_sensor_data(session: aiohttp.ClientSession, sensor: Dict[str, Any]) -> List[Dict[str, Any]]:
+async def fetch_sensor_data(crawler: Crawler, sensor: Dict[str, Any]) -> List[Dict[str, Any]]:
     param_code = sensor["param"]["paramCode"].lower()
     if param_code not in PARAM_MAPPING:
         return []
     try:
-        async with session.get(f"{GIOS_URL}/data/getData/{sensor['id']}") as response:
-            if response.status != 200:
-                logging.warning(f"Skipping sensor {sensor['id']}: HTTP {response.status}")
-                return []
-            sensor_data = await response.json()
-            return [
-                {
-                    "station_id": str(sensor["stationId"]),
-                    "timestamp": value["date"],
-                    PARAM_MAPPING[param_code]: value["value"]
-                }
-                for value in sensor_data.get("values", [])
-                if value["value"] is not None
-            ]
-    except Exception as e:
-        logging.error(f"Error fetching data for sensor {sensor['id']}: {e}")
+        sensor_data = await crawler.get_json(f"/data/getData/{sensor['id']}")
+    except CrawlError as e:
+        logging.warning(f"Skipping sensor {sensor['id']}: {e}")
+        crawler.report.failed_sensors[str(sensor["id"])] = str(e)
         return []
-
-
-async def fetch_gios_data() -> List[Dict[str, Any]]:
-    """Fetch air quality data from GIOŚ API using parallel requests with progress bars."""
-    ssl_context = ssl.create_default_context(cafile=certifi.where())
-    ssl_context.set_ciphers("DEFAULT@SECLEVEL=1")  # Lower security level to match older setups
-    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=ssl_context)) as session:
+    return [
+        {
+            "station_id": str(sensor["stationId"]),
+            "timestamp": value["date"],
+            PARAM_MAPPING[param_code]: value["value"]
+        }
+        for value in sensor_data.get("values", [])
+        if value["value"] is not None
+    ]
+
+
+async def fetch_gios_data(crawler: Crawler, queue: asyncio.Queue, refresh_catalog: bool = False) -> None:
+    """Crawl GIOŚ sensors and put each sensor's readings on the queue as soon as they arrive."""
+    try:
+        with timed(CRAWL_STAGE_SECONDS, stage="catalog"):
+            catalog = await load_catalog(crawler, force_refresh=refresh_catalog)
+    except CrawlError as e:
+        logging.error(f"Failed to fetch stations: {e}")
+        raise
+    station_locator.update_catalog(catalog)
+
+    all_sensors = []
+    for station_id, sensors in catalog["sensors"].items():
+        for sensor in sensors:
+            all_sensors.append({**sensor, "stationId": station_id})
+
+    total = crawler.report.sensors_total = len(all_sensors)
+    step = max(1, total // max(1, GIOS_PROGRESS_STEPS))
+    logging.info(f"Fetching sensor data of {total} sensors")
+
+    async def crawl_sensor(sensor: Dict[str, Any]) -> None:
+        readings = await fetch_sensor_data(crawler, sensor)
+        if readings:
+            await queue.put(readings)  # Blocks while the writer is behind
+        crawler.report.sensors_done += 1
+        done = crawler.report.sensors_done
+        if done % step == 0 or done == total:
+            logging.info(f"Fetched sensor data: {done}/{total} sensors, {crawler.report.retries} retries, "
+                         f"{len(crawler.report.failed_sensors)} failed")
+
+    with timed(CRAWL_STAGE_SECONDS, stage="sensors"):
+        await asyncio.gather(*(crawl_sensor(sensor) for sensor in all_sensors))
+
+
+async def write_gios_data(queue: asyncio.Queue, report: Dict[str, Any]) -> None:
+    """Drain sensor readings from the queue and write new values to InfluxDB in batches."""
+
+    write_seconds = 0.0
+
+    async def flush(batch: List[Dict[str, Any]]) -> None:
+        nonlocal write_seconds
+        new_data = batch  # until filtered, every value of the batch counts as unwritten
         try:
-            async with session.get(f"{GIOS_URL}/station/findAll") as response:
-                if response.status != 200:
-                    logging.error(f"Failed to fetch stations: {response.status}")
-                    return []
-                stations = await response.json()
+            new_data, skipped = watermarks.filter_new(batch)
+            report["skipped"] += skipped
+            if not new_data:
+                return
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(save_to_influxdb, new_data)
+            finally:
+                write_seconds += time.perf_counter() - started
         except Exception as e:
-            logging.error(f"Error fetching stations: {e}")
-            return []
-
-        sensor_tasks = [fetch_sensors(session, str(station["id"])) for station in stations]
-        sensors_per_station = []
-        with tqdm(total=len(sensor_tasks), desc="Fetching sensors") as pbar:
-            for future in asyncio.as_completed(sensor_tasks):
-                result = await future
-                sensors_per_station.append(result)
-                pbar.update(1)
-
-        all_sensors = []
-        station_ids = [str(station["id"]) for station in stations]
-        for station_id, sensors in zip(station_ids, sensors_per_station):
-            if isinstance(sensors, list):
-                for sensor in sensors:
-                    sensor["stationId"] = station_id
-                    all_sensors.append(sensor)
-
-        data_tasks = [fetch_sensor_data(session, sensor) for sensor in all_sensors]
-        sensor_data = []
-        with tqdm(total=len(data_tasks), desc="Fetching sensor data") as pbar:
-            for future in asyncio.as_completed(data_tasks):
-                result = await future
-                sensor_data.append(result)
-                pbar.update(1)
-
-        data = []
-        for result in sensor_data:
-            if isinstance(result, list):
-                data.extend(result)
-        return data
-
-
-async def fetch_and_save() -> None:
+            # Keep draining so the crawl never blocks on a full queue; marks stay put for a retry next run
+            logging.error(f"Error writing GIOŚ batch of {len(new_data)} values: {e}")
+            report["write_errors"] += len(new_data)
+            return
+        watermarks.advance(new_data)
+        report["new"] += len(new_data)
+
+    batch = []
+    while (readings := await queue.get()) is not _END_OF_CRAWL:
+        batch.extend(readings)
+        if len(batch) >= GIOS_WRITE_BATCH:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    # Writes overlap the crawl, so this is time spent serializing and spooling, not extra wall time
+    CRAWL_STAGE_SECONDS.labels(stage="write").observe(write_seconds)
+
+
+async def fetch_and_save(refresh_catalog: bool = False, session: aiohttp.ClientSession | None = None) -> Dict[str, Any]:
+    """Stream GIOŚ data to InfluxDB, saving only values newer than the stored high-water marks.
+
+    A long-lived `session` can be passed in to reuse its connections; otherwise one is created for this run.
+    """
+    global current_crawl
+    report = {"new": 0, "skipped": 0, "write_errors": 0}
+    crawl_report = CrawlReport()
+    started = time.perf_counter()
     try:
-        data = await fetch_gios_data()
-        if data:
-            save_to_influxdb(data)
-        else:
-            logging.warning("No data fetched from GIOŚ API")
+        if not watermarks.loaded:
+            with timed(CRAWL_STAGE_SECONDS, stage="watermarks"):
+                await asyncio.to_thread(watermarks.load, get_latest_timestamps)
+        queue = asyncio.Queue(maxsize=GIOS_QUEUE_SIZE)
+        writer = asyncio.create_task(write_gios_data(queue, report))
+        try:
+            async with contextlib.nullcontext(session) if session is not None else create_session() as session:
+                crawler = Crawler(session)
+                crawl_report = current_crawl = crawler.report
+                await fetch_gios_data(crawler, queue, refresh_catalog)
+                crawl_report.duration = time.time() - crawl_report.started_at
+        finally:
+            await queue.put(_END_OF_CRAWL)
+            await writer
+        if crawl_report.failed_stations or crawl_report.failed_sensors:
+            logging.warning(f"GIOŚ crawl incomplete: {len(crawl_report.failed_stations)} stations and "
+                            f"{len(crawl_report.failed_sensors)} sensors failed after retries")
+        if report["new"]:
+            watermarks.save()
+        # Rollups are recomputed from what InfluxDB holds, so give the spool a chance to replay this crawl first
+        with timed(CRAWL_STAGE_SECONDS, stage="spool_drain"):
+            drained = await asyncio.to_thread(get_spool().wait_drained, SPOOL_DRAIN_TIMEOUT)
+        if not drained:
+            logging.warning(f"Spool not drained after {SPOOL_DRAIN_TIMEOUT}s, rollups will catch up on a later run")
+        with timed(CRAWL_STAGE_SECONDS, stage="rollups"):
+            report["rollup_ranges"] = await asyncio.to_thread(refresh_rollups)
+        logging.info(f"GIOŚ ingest finished: {report['new']} new values, {report['skipped']} already stored")
     except Exception as e:
         logging.error(f"Error in fetch_and_save: {e}")
+        report["error"] = str(e)
+    CRAWL_STAGE_SECONDS.labels(stage="total").observe(time.perf_counter() - started)
+    report.update(crawl_report.as_dict())
+    return report
 
 
 if __name__ == "__main__":
-    asyncio.run(fetch_and_save())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fetch GIOŚ data and save it to InfluxDB.")
+    parser.add_argument("--refresh-catalog", action="store_true", help="Ignore the cached station/sensor catalog")
+    args = parser.parse_args()
+    asyncio.run(fetch_and_save(refresh_catalog=args.refresh_catalog))
\ No newline at end of file
@@ -0,0 +1,38 @@
+# file: backend/gios_common.py
+
+import json
+import logging
+import os
+import ssl
+import time
+from functools import lru_cache
+from typing import Dict, Any
+
+import certifi
+
+# Shared with the frontend, so this module must not import anything beyond the standard library and certifi
+CATALOG_FILE = os.getenv("GIOS_CATALOG_FILE", "gios_catalog.json")
+CATALOG_TTL = int(os.getenv("GIOS_CATALOG_TTL", str(7 * 24 * 3600)))  # seconds
+
+
+@lru_cache(maxsize=1)
+def create_ssl_context() -> ssl.SSLContext:
+    """Build the TLS context required by the GIOŚ servers, once per process."""
+    ssl_context = ssl.create_default_context(cafile=certifi.where())
+    ssl_context.set_ciphers("DEFAULT@SECLEVEL=1")  # Lower security level to match older setups
+    return ssl_context
+
+
+def read_catalog(path: str = CATALOG_FILE, ttl: int | None = CATALOG_TTL) -> Dict[str, Any] | None:
+    """Read the cached station/sensor catalog; return None if it is missing or older than ttl (None = any age)."""
+    try:
+        with open(path, "r") as f:
+            catalog = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.error(f"Error reading GIOŚ catalog {path}: {e}")
+        return None
+    if ttl is not None and time.time() - catalog.get("fetched_at", 0) > ttl:
+        return None
+    return catalog
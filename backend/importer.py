@@ -0,0 +1,119 @@
+# file: backend/importer.py
+
+import gzip
+import logging
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from itertools import islice
+from typing import List, Dict, Any, Iterator
+
+from influxdb_client import WritePrecision
+
+from backend.database import INFLUXDB_BUCKET, get_write_api
+from backend.export import export_files
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "10000"))  # lines per write request
+IMPORT_WRITERS = int(os.getenv("IMPORT_WRITERS", "4"))  # write requests in flight at once
+IMPORT_MAX_RETRIES = int(os.getenv("IMPORT_MAX_RETRIES", "3"))
+IMPORT_PROGRESS_INTERVAL = 5.0  # seconds between progress log lines
+
+
+class _Progress:
+    """Bytes read across all input files, measured on the (possibly compressed) files on disk."""
+
+    def __init__(self, paths: List[str]):
+        self.total_bytes = sum(os.path.getsize(path) for path in paths)
+        self.done_bytes = 0
+        self.points = 0
+        self.started = time.time()
+        self._last_log = self.started
+
+    def log(self, position: int, force: bool = False) -> None:
+        now = time.time()
+        if not force and now - self._last_log < IMPORT_PROGRESS_INTERVAL:
+            return
+        self._last_log = now
+        read = self.done_bytes + position
+        percent = 100 * read / self.total_bytes if self.total_bytes else 100
+        logging.info(f"Import: {self.points} points, {percent:.1f}% of input, "
+                     f"{self.points / max(now - self.started, 1e-9):.0f} points/s")
+
+
+def _batches(raw, path: str, batch_size: int) -> Iterator[List[bytes]]:
+    """Yield lists of up to `batch_size` raw lines, reading the file incrementally.
+
+    Export files already hold line protocol written by LineProtocolSerializer, so lines are sent as they are
+    instead of being parsed and serialized again.
+    """
+    f = gzip.GzipFile(fileobj=raw) if path.endswith(".gz") else raw
+    while batch := list(islice(f, batch_size)):
+        yield batch
+
+
+def _write_batch(body: bytes) -> None:
+    for attempt in range(IMPORT_MAX_RETRIES + 1):
+        try:
+            get_write_api().write(bucket=INFLUXDB_BUCKET, record=body, write_precision=WritePrecision.NS)
+            return
+        except Exception as e:
+            if attempt == IMPORT_MAX_RETRIES:
+                raise
+            delay = min(30.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+            logging.warning(f"Import write failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def import_line_protocol(path: str, batch_size: int = IMPORT_BATCH_SIZE,
+                         writers: int = IMPORT_WRITERS) -> Dict[str, Any]:
+    """Stream line-protocol files (plain or gzipped, a file or a directory of them) into InfluxDB.
+
+    Memory stays bounded: at most twice `writers` batches are read ahead of the writes in flight.
+    The shared write API is left open for the rest of the process.
+    """
+    paths = export_files(path)
+    progress = _Progress(paths)
+    in_flight: deque[Future] = deque()
+
+    with ThreadPoolExecutor(max_workers=writers, thread_name_prefix="import") as executor:
+        try:
+            for file_path in paths:
+                with open(file_path, "rb") as raw:
+                    for batch in _batches(raw, file_path, batch_size):
+                        while len(in_flight) >= writers * 2:
+                            in_flight.popleft().result()
+                        in_flight.append(executor.submit(_write_batch, b"".join(batch)))
+                        progress.points += len(batch)
+                        progress.log(raw.tell())
+                progress.done_bytes += os.path.getsize(file_path)
+            while in_flight:
+                in_flight.popleft().result()
+        except BaseException:
+            for future in in_flight:
+                future.cancel()
+            raise
+
+    duration = time.time() - progress.started
+    progress.log(0, force=True)
+    return {
+        "files": len(paths),
+        "points": progress.points,
+        "bytes": progress.total_bytes,
+        "duration": round(duration, 3),
+        "points_per_second": round(progress.points / duration) if duration else None,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from backend.export import default_import_path
+
+    parser = argparse.ArgumentParser(description="Import line-protocol files (.lp or .lp.gz) into InfluxDB.")
+    parser.add_argument("path", nargs="?", default=default_import_path(), help="File or directory of export files")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="Lines per write request")
+    parser.add_argument("--writers", type=int, default=IMPORT_WRITERS, help="Parallel write requests")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(import_line_protocol(args.path, args.batch_size, args.writers))
@@ -0,0 +1,102 @@
+# file: backend/ingest_queue.py
+
+import asyncio
+import logging
+import os
+from typing import List, Dict, Any
+
+from backend.database import save_to_influxdb, save_user_station
+
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "100000"))  # records waiting to be written
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "5000"))  # records per InfluxDB write
+INGEST_RETRY_AFTER = int(os.getenv("INGEST_RETRY_AFTER", "2"))  # seconds suggested to throttled clients
+
+
+class QueueFullError(Exception):
+    """Raised when a batch does not fit into the ingest queue."""
+
+
+def write_user_records(records: List[Dict[str, Any]]) -> None:
+    """Write user measurements and the latest location of every station in the batch."""
+    save_to_influxdb(records)
+    locations = {}
+    for record in records:
+        if record.get("lat") is not None or record.get("lon") is not None:
+            locations[record["station_id"]] = {"station_id": record["station_id"], "lat": record.get("lat"),
+                                               "lon": record.get("lon")}
+    for station_data in locations.values():
+        save_user_station(station_data)
+
+
+class IngestQueue:
+    """Bounded queue of user records drained by a background writer in batches."""
+
+    def __init__(self, maxsize: int = INGEST_QUEUE_SIZE, batch_size: int = INGEST_BATCH_SIZE):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._task: asyncio.Task | None = None
+
+    def submit(self, records: List[Dict[str, Any]]) -> None:
+        """Enqueue all records or none of them; raise QueueFullError when there is no room."""
+        if self.maxsize - self._queue.qsize() < len(records):
+            self.rejected += len(records)
+            raise QueueFullError(f"Ingest queue full ({self._queue.qsize()}/{self.maxsize} records)")
+        for record in records:
+            self._queue.put_nowait(record)
+        self.accepted += len(records)
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._write(batch)
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            await asyncio.to_thread(write_user_records, batch)
+            self.written += len(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                logging.error(f"Error writing queued user record for station {batch[0].get('station_id')!r}: {e}")
+                self.failed += 1
+                return
+            # Write the records one by one, so a bad record only drops itself and not the whole batch
+            logging.warning(f"Error writing {len(batch)} queued user records, retrying them one by one: {e}")
+            for record in batch:
+                await self._write([record])
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the writer and flush whatever is still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while not self._queue.empty():
+            batch = [self._queue.get_nowait() for _ in range(min(self.batch_size, self._queue.qsize()))]
+            await self._write(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self._queue.qsize(),
+            "capacity": self.maxsize,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+
+ingest_queue = IngestQueue()
@@ -0,0 +1,122 @@
+# file: backend/line_protocol.py
+
+import io
+import math
+import threading
+from datetime import datetime, timezone, timedelta
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple
+
+from backend.models import POLLUTANT_FIELDS
+from backend.utils import parse_timestamp
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MEASUREMENT_ESCAPES = str.maketrans({",": r"\,", " ": r"\ "})
+_TAG_ESCAPES = str.maketrans({",": r"\,", "=": r"\=", " ": r"\ "})
+_STRING_FIELD_ESCAPES = str.maketrans({'"': r'\"', "\\": r"\\"})
+
+
+def escape_measurement(value: str) -> str:
+    return value.translate(_MEASUREMENT_ESCAPES)
+
+
+@lru_cache(maxsize=65536)
+def escape_tag(value: str) -> str:
+    """Escape a tag key or value; line protocol cannot carry newlines in either."""
+    if "\n" in value:
+        raise ValueError(f"Newline in tag value: {value!r}")
+    return value.translate(_TAG_ESCAPES)
+
+
+def format_field_value(value: Any) -> str | None:
+    """Format a field value preserving its line-protocol type; None for values InfluxDB cannot store."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return f"{value}i"
+    if isinstance(value, float):
+        return repr(value) if math.isfinite(value) else None
+    if isinstance(value, str):
+        return f'"{value.translate(_STRING_FIELD_ESCAPES)}"'
+    return None
+
+
+def datetime_to_ns(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // timedelta(microseconds=1) * 1000
+
+
+@lru_cache(maxsize=65536)
+def timestamp_ns(value: str) -> int:
+    """Convert an ISO/GIOŚ timestamp string to nanoseconds since epoch (cached, timestamps repeat a lot)."""
+    return datetime_to_ns(parse_timestamp(value))
+
+
+class LineProtocolSerializer:
+    """Serialize measurements straight into a reusable line-protocol buffer."""
+
+    def __init__(self, measurement: str = "air_quality"):
+        self.measurement = escape_measurement(measurement)
+        self.lines = 0
+        self._buffer = io.StringIO()
+
+    def add_entries(self, data: List[Dict[str, Any]], default_source: str = "gios") -> None:
+        """Add air quality entries, merging all fields of one (station_id, source, timestamp) into one line."""
+        merged: Dict[Tuple[str, str, int], Dict[str, float]] = {}
+        for entry in data:
+            key = (entry["station_id"], entry.get("source") or default_source, timestamp_ns(entry["timestamp"]))
+            fields = merged.setdefault(key, {})
+            for field in POLLUTANT_FIELDS:
+                value = entry.get(field)
+                if value is not None:
+                    fields[field] = float(value)
+
+        write = self._buffer.write
+        prefix = self.measurement
+        for (station_id, source, timestamp), fields in merged.items():
+            field_set = ",".join(f"{field}={value!r}" for field, value in fields.items() if math.isfinite(value))
+            if field_set:
+                write(f"{prefix},source={escape_tag(source)},station_id={escape_tag(str(station_id))} "
+                      f"{field_set} {timestamp}\n")
+                self.lines += 1
+
+    def add_point(self, tags: Dict[str, str], fields: Dict[str, Any], timestamp: int,
+                  measurement: str | None = None) -> None:
+        """Add a single point with arbitrary tags and typed fields; timestamp is in nanoseconds."""
+        field_set = ",".join(
+            f"{escape_tag(key)}={formatted}"
+            for key, value in fields.items()
+            if (formatted := format_field_value(value)) is not None
+        )
+        if not field_set:
+            return
+        tag_set = "".join(f",{escape_tag(key)}={escape_tag(str(value))}"
+                          for key, value in sorted(tags.items()) if value not in (None, ""))
+        name = escape_measurement(measurement) if measurement else self.measurement
+        self._buffer.write(f"{name}{tag_set} {field_set} {timestamp}\n")
+        self.lines += 1
+
+    def getvalue(self) -> str:
+        return self._buffer.getvalue()
+
+    def clear(self) -> None:
+        """Reset the buffer for reuse without reallocating it."""
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self.lines = 0
+
+    def __len__(self) -> int:
+        return self.lines
+
+
+_local = threading.local()
+
+
+def get_serializer() -> LineProtocolSerializer:
+    """Return this thread's reusable serializer, cleared and ready for a new batch."""
+    serializer = getattr(_local, "serializer", None)
+    if serializer is None:
+        serializer = _local.serializer = LineProtocolSerializer()
+    serializer.clear()
+    return serializer
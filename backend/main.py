@@ -1,27 +1,75 @@
-# file : /backend/scheduler.py
+# file: backend/main.py
 
+import asyncio
+import json
 import logging
+import time
 import uvicorn
-from fastapi import FastAPI, Query, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Query, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse, Response
+from pydantic import TypeAdapter, ValidationError
 from contextlib import asynccontextmanager
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 
-from backend.gios_api import fetch_and_save
-from backend.scheduler import run_schedule
+from backend import gios_api
+from backend.scheduler import scheduler
+from backend.warmup import warmup, WarmUpStep
+from backend.cache import air_quality_cache
+from backend.ingest_queue import ingest_queue, write_user_records, QueueFullError, INGEST_RETRY_AFTER
+from backend.formats import negotiate, arrow_response, columnar_json_response, ndjson_stream, arrow_stream, \
+    ARROW_MEDIA_TYPE, COLUMNAR_JSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE, JSON_MEDIA_TYPE
+from backend.downsample import downsample_rows
 from backend.models import AirQualityData, UserAirQualityData
-from backend.database import get_air_quality, get_stations, get_time_range, save_to_influxdb, save_user_station, \
-    get_user_stations
+from backend.database import get_air_quality, stream_air_quality, get_stations, get_time_range, \
+    get_user_stations, close_async_client, ping_influxdb, rebuild_metadata_index, get_spool
+from backend.metadata import get_metadata_index
+from backend.metrics import HTTP_REQUEST_SECONDS, render as render_metrics
+from backend.profiling import QueryProfile, QUERY_PROFILING, profiles, profiling
+from backend.spatial import station_locator
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+async def initial_crawl() -> None:
+    run = await scheduler.run_now("gios")
+    if run is not None and run["status"] != "ok":
+        raise RuntimeError(f"initial GIOŚ crawl {run['status']}: {run.get('error', '')}")
+
+
+async def load_metadata_index() -> None:
+    metadata_index = await asyncio.to_thread(get_metadata_index)
+    if not metadata_index.loaded:
+        await asyncio.to_thread(rebuild_metadata_index)
+
+
+async def load_spatial_index() -> None:
+    await asyncio.to_thread(station_locator.load, dict(get_metadata_index().user_locations))
+
+
+def crawl_progress() -> Dict[str, Any] | None:
+    crawl = gios_api.current_crawl
+    return {"sensors_total": crawl.sensors_total, "sensors_done": crawl.sensors_done} if crawl else None
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) :
-    """Initialize scheduler and fetch initial data on startup."""
-    run_schedule()
-    await fetch_and_save()
+    """Start background workers and the scheduler; initial data is fetched by a warm-up task after startup."""
+    get_spool().start()
+    ingest_queue.start()
+    scheduler.start()
+    warmup.start([
+        WarmUpStep("influxdb", ping_influxdb),
+        WarmUpStep("metadata", load_metadata_index),
+        WarmUpStep("spatial_index", load_spatial_index),
+        WarmUpStep("gios_crawl", initial_crawl, crawl_progress),
+    ])
     yield
+    await warmup.stop()
+    await scheduler.stop()
+    await ingest_queue.stop()
+    await close_async_client()
+    get_metadata_index().save()
 
 
 app = FastAPI(
@@ -32,12 +80,52 @@ app = FastAPI(
 )
 
 
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """Record request latency per route template, so IDs and query strings do not multiply the series."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(method=request.method, route=route.path if route else "unmatched",
+                                    status=str(status)).observe(time.perf_counter() - started)
+
+
 @app.get("/stations", response_model=List[str])
 async def stations(source: Optional[str] = Query(None, description="Filter stations by source (e.g., 'gios', 'user')")):
     """Fetch unique station IDs from the database."""
     logging.info(f"Fetching stations with source filter: {source}")
     return get_stations(source)
 
+@app.get("/stations/nearby", response_model=List[Dict[str, Any]])
+async def stations_nearby(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the query point"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the query point"),
+    radius_km: float = Query(25, gt=0, le=1000, description="Search radius in kilometres"),
+    k: int = Query(10, ge=1, le=1000, description="Maximum number of stations returned"),
+    source: Optional[str] = Query(None, description="Only stations of this source ('gios' or 'user')")
+):
+    """GIOŚ and user stations within radius_km of a point, nearest first, with their distance in km."""
+    return station_locator.nearby(lat, lon, radius_km, k, source)
+
+@app.get("/stations/bbox", response_model=List[Dict[str, Any]])
+async def stations_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    source: Optional[str] = Query(None, description="Only stations of this source ('gios' or 'user')"),
+    limit: int = Query(5000, ge=1, le=100_000, description="Maximum number of stations returned")
+):
+    """GIOŚ and user stations inside a bounding box, e.g. the visible part of the map."""
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="Invalid bounding box: min values must be ≤ max values")
+    return station_locator.within(min_lat, min_lon, max_lat, max_lon, source, limit)
+
 @app.get("/time_range", response_model=tuple[str, str] | None)
 async def time_range(source: Optional[str] = Query(None, description="Filter time range by source (e.g., 'gios', 'user')")):
     """Fetch the earliest and latest timestamps available in the database."""
@@ -45,37 +133,173 @@ async def time_range(source: Optional[str] = Query(None, description="Filter tim
     return get_time_range(source)
 
 
-@app.get("/air_quality", response_model=List[AirQualityData])
+@app.get("/air_quality", response_model=List[AirQualityData],
+         responses={200: {"content": {ARROW_MEDIA_TYPE: {}, COLUMNAR_JSON_MEDIA_TYPE: {}, NDJSON_MEDIA_TYPE: {}}}})
 async def air_quality(
+    request: Request,
     station_id: Optional[List[str]] = Query(None, description="List of station IDs to filter by"),
     start_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format"),
     end_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format"),
     aggregation: str = Query("1h", description="Aggregation interval (e.g., 1h, 1d)"),
-    source: Optional[str] = Query(None, description="Filter by source (e.g., 'gios', 'user')")
+    source: Optional[str] = Query(None, description="Filter by source (e.g., 'gios', 'user')"),
+    stream: bool = Query(False, description="Stream rows as InfluxDB returns them (NDJSON or Arrow batches)"),
+    max_points: Optional[int] = Query(None, ge=4, description="Downsample each station/pollutant series to about this many points (e.g. chart width in pixels)"),
+    downsample: Literal["lttb", "minmax"] = Query("lttb", description="Downsampling method used with max_points"),
+    profile: bool = Query(False, description="Profile this request: Flux profiler on, result cache bypassed, phase timings in the Server-Timing header")
 ):
-    """Fetch air quality data with optional filters and aggregation."""
+    """Fetch air quality data with optional filters and aggregation.
+
+    Send `Accept: application/vnd.apache.arrow.stream` or `application/vnd.airquality.columnar+json`
+    to receive columns instead of a JSON array of rows. With `stream=true` or `Accept: application/x-ndjson`
+    the response is streamed with constant memory, as NDJSON rows or Arrow record batches.
+    With `max_points` every series is downsampled (LTTB or min/max buckets); this needs whole series,
+    so such requests are not streamed.
+    With `profile=true` the response carries a `Server-Timing` header (query build, Flux server round trip
+    and its queue/compile/plan/execute split, CSV decode, row transform, validation, serialization) and an
+    `X-Profile-Id` whose full report, including the Flux profiler tables, is at `/profiles/{id}`.
+    Profiled requests are never streamed or served from the cache.
+    """
+    media_type = negotiate(request.headers.get("accept"))
+    if profile:
+        if not QUERY_PROFILING:
+            raise HTTPException(status_code=403, detail="Query profiling is disabled")
+        query_profile = QueryProfile("/air_quality", dict(request.query_params.multi_items()))
+        with profiling(query_profile):
+            rows = await get_air_quality(station_id, start_date, end_date, aggregation, source)
+            if max_points is not None:
+                with query_profile.phase("downsample"):
+                    rows = await asyncio.to_thread(downsample_rows, rows, max_points, downsample)
+        return profiled_response(query_profile, rows, media_type)
+
+    if (stream or media_type == NDJSON_MEDIA_TYPE) and max_points is None:
+        rows = stream_air_quality(station_id, start_date, end_date, aggregation, source)
+        if media_type == ARROW_MEDIA_TYPE:
+            return StreamingResponse(arrow_stream(rows), media_type=ARROW_MEDIA_TYPE)
+        return StreamingResponse(ndjson_stream(rows), media_type=NDJSON_MEDIA_TYPE)
+
+    rows = await get_air_quality(station_id, start_date, end_date, aggregation, source)
+    if max_points is not None:
+        rows = await asyncio.to_thread(downsample_rows, rows, max_points, downsample)
+    return air_quality_response(rows, media_type)
 
-    return get_air_quality(station_id, start_date, end_date, aggregation, source)
+
+def air_quality_response(rows: List[Dict[str, Any]], media_type: str):
+    """Encode rows in the negotiated format; plain JSON rows are returned for FastAPI to validate and encode."""
+    if media_type == ARROW_MEDIA_TYPE:
+        return arrow_response(rows)
+    if media_type == COLUMNAR_JSON_MEDIA_TYPE:
+        return columnar_json_response(rows)
+    if media_type == NDJSON_MEDIA_TYPE:
+        return Response(content="".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows),
+                        media_type=NDJSON_MEDIA_TYPE)
+    return rows
+
+
+air_quality_adapter = TypeAdapter(List[AirQualityData])
+
+
+def profiled_response(query_profile: QueryProfile, rows: List[Dict[str, Any]], media_type: str) -> Response:
+    """Encode rows as the endpoint would, timing the response-model validation and serialization too."""
+    if media_type == JSON_MEDIA_TYPE:
+        with query_profile.phase("validate"):
+            validated = air_quality_adapter.validate_python(rows)
+        with query_profile.phase("serialize"):
+            response = JSONResponse(content=jsonable_encoder(validated))
+    else:
+        with query_profile.phase("serialize"):
+            response = air_quality_response(rows, media_type)
+    response.headers["Server-Timing"] = query_profile.server_timing()
+    response.headers["X-Profile-Id"] = query_profile.id
+    profiles.put(query_profile)
+    return response
+
+@app.get("/profiles/{profile_id}", response_model=Dict[str, Any])
+async def get_profile(profile_id: str):
+    """Full report of a recent profiled request: phase timings, Flux queries and Flux profiler output."""
+    if not QUERY_PROFILING:
+        raise HTTPException(status_code=403, detail="Query profiling is disabled")
+    report = profiles.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired")
+    return JSONResponse(content=jsonable_encoder(report))
 
 @app.post("/addUserData", response_model=UserAirQualityData)
 async def add_user_data(data: UserAirQualityData):
     """Add air quality data from a user-defined station and update station metadata if provided."""
     try:
-        data_dict = data.model_dump()
-        save_to_influxdb([data_dict])
-        # Save or update station metadata if lat/lon provided
-        if data.lat is not None or data.lon is not None :
-            station_data = {"station_id" : data.station_id, "lat" : data.lat, "lon" : data.lon}
-            save_user_station(station_data)
+        # Measurements and station metadata (if lat/lon provided) are fsynced to the spool, off the event loop
+        await asyncio.to_thread(write_user_records, [data.model_dump()])
         return data
     except Exception as e:
         logging.error(f"Error saving user data: {e}")
         raise HTTPException(status_code=500, detail="Failed to save user data")
 
+user_batch_adapter = TypeAdapter(List[UserAirQualityData])
+
+@app.post("/addUserData/batch", status_code=202, response_model=Dict[str, Any],
+          responses={429: {"description": "Ingest queue full, retry after the Retry-After delay"}})
+async def add_user_data_batch(request: Request):
+    """Queue many user records at once, sent as a JSON array or as NDJSON (`Content-Type: application/x-ndjson`)."""
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+            payload = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            payload = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed request body: {e}")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON records")
+    try:
+        records = user_batch_adapter.validate_python(payload)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=json.loads(e.json(include_url=False)))
+
+    try:
+        ingest_queue.submit([record.model_dump() for record in records])
+    except QueueFullError as e:
+        return JSONResponse(status_code=429, content={"detail": str(e)},
+                            headers={"Retry-After": str(INGEST_RETRY_AFTER)})
+    return {"accepted": len(records), "queue_depth": ingest_queue.stats()["depth"]}
+
+@app.get("/addUserData/stats", response_model=Dict[str, Any])
+async def add_user_data_stats():
+    """Report depth and throughput counters of the user ingest queue."""
+    return ingest_queue.stats()
+
 @app.get("/user_stations", response_model=List[Dict[str, Any]])
 async def user_stations():
     """Fetch metadata for all user stations."""
-    return await get_user_stations()
+    return get_user_stations()
+
+@app.get("/cache/stats", response_model=Dict[str, Any])
+async def cache_stats():
+    """Report hit/miss counters and memory use of the /air_quality result cache."""
+    return air_quality_cache.stats()
+
+@app.get("/ready", response_model=Dict[str, Any])
+async def ready(warm: bool = Query(False, description="Answer 503 until the warm-up (initial crawl) has finished")):
+    """Readiness probe reporting warm-up progress; the API serves queries before warm-up completes."""
+    status = warmup.status()
+    if warm and status["state"] not in ("ready", "degraded"):
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+@app.get("/scheduler/stats", response_model=Dict[str, Any])
+async def scheduler_stats():
+    """Report next run time and recent run history (duration, points, failures) of scheduled jobs."""
+    return scheduler.stats()
+
+@app.get("/spool/stats", response_model=Dict[str, Any])
+async def spool_stats():
+    """Report depth and replay progress of the InfluxDB write-ahead spool."""
+    return get_spool().stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: request, Flux query, GIOŚ crawl and InfluxDB write timings."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 @app.get("/favicon.ico")
 async def favicon():
@@ -0,0 +1,182 @@
+# file: backend/metadata.py
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Any, Tuple
+
+METADATA_FILE = os.getenv("METADATA_FILE", "metadata_index.json")
+METADATA_SAVE_INTERVAL = float(os.getenv("METADATA_SAVE_INTERVAL", "10"))  # seconds between saves to disk
+STATION_ACTIVE_HOURS = int(os.getenv("STATION_ACTIVE_HOURS", "48"))  # stations seen this recently are listed
+
+_NS = 1_000_000_000
+
+
+def ns_to_datetime(ns: int) -> datetime:
+    return datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(microseconds=ns // 1000)
+
+
+class MetadataIndex:
+    """Per-source time range, station last-seen times and user station locations, kept up to date by ingest.
+
+    Serves /time_range, /stations and /user_stations without querying InfluxDB; rebuild it from the
+    database after bulk imports or deletes, which bypass ingest.
+    """
+
+    def __init__(self, path: str = METADATA_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.time_ranges: Dict[str, List[int]] = {}
+        self.last_seen: Dict[str, Dict[str, int]] = {}
+        self.user_locations: Dict[str, Dict[str, Any]] = {}
+        self.loaded = False
+        self._dirty = False
+        self._saved_at = 0.0
+        # Ingest recorded while a rebuild scans InfluxDB, re-applied on top of the rebuilt state
+        self._journal: List[Tuple[str, tuple]] | None = None
+        try:
+            with open(path, "r") as f:
+                state = json.load(f)
+            self.time_ranges = state.get("time_ranges", {})
+            self.last_seen = state.get("last_seen", {})
+            self.user_locations = state.get("user_locations", {})
+            self.loaded = True
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reading metadata index {path}: {e}")
+
+    def observe(self, source: str, start_ns: int, stop_ns: int, stations: Dict[str, int]) -> None:
+        """Record data written for a source: its time span and the latest timestamp per station."""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(("observe", (source, start_ns, stop_ns, dict(stations))))
+            self._observe(source, start_ns, stop_ns, stations)
+
+    def observe_location(self, station_id: str, lat: float, lon: float, timestamp_ns: int) -> bool:
+        """Record a user station location; False when the station is already known at that location."""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(("location", (station_id, lat, lon, timestamp_ns)))
+            return self._observe_location(station_id, lat, lon, timestamp_ns)
+
+    def _observe(self, source: str, start_ns: int, stop_ns: int, stations: Dict[str, int]) -> None:
+        span = self.time_ranges.get(source)
+        self.time_ranges[source] = [min(span[0], start_ns), max(span[1], stop_ns)] if span else [start_ns, stop_ns]
+        seen = self.last_seen.setdefault(source, {})
+        for station_id, last_ns in stations.items():
+            if last_ns > seen.get(station_id, 0):
+                seen[station_id] = last_ns
+        self._dirty = True
+
+    def _observe_location(self, station_id: str, lat: float, lon: float, timestamp_ns: int) -> bool:
+        current = self.user_locations.get(station_id)
+        if current is not None and (current["lat"], current["lon"]) == (lat, lon):
+            return False
+        self.user_locations[station_id] = {"lat": lat, "lon": lon, "updated": timestamp_ns}
+        self._dirty = True
+        return True
+
+    def user_location(self, station_id: str) -> Tuple[float, float] | None:
+        location = self.user_locations.get(station_id)
+        return (location["lat"], location["lon"]) if location else None
+
+    def time_range(self, source: str | None = None) -> Tuple[str, str] | None:
+        """Earliest and latest timestamp for a source (or all sources), formatted like InfluxDB datetimes."""
+        spans = [self.time_ranges[source]] if source in self.time_ranges else \
+            list(self.time_ranges.values()) if source is None else []
+        if not spans:
+            return None
+        return str(ns_to_datetime(min(s[0] for s in spans))), str(ns_to_datetime(max(s[1] for s in spans)))
+
+    def active_stations(self, source: str | None = None, hours: int = STATION_ACTIVE_HOURS) -> List[str]:
+        """Stations with data in the last `hours` hours, like the former 48-hour distinct scan."""
+        cutoff = (time.time_ns() - hours * 3600 * _NS)
+        sources = [source] if source else list(self.last_seen)
+        stations = {station_id for name in sources for station_id, last_ns in self.last_seen.get(name, {}).items()
+                    if last_ns >= cutoff}
+        return sorted(stations)
+
+    def user_stations(self) -> List[Dict[str, Any]]:
+        return [{"station_id": station_id, "lat": location["lat"], "lon": location["lon"]}
+                for station_id, location in self.user_locations.items()]
+
+    def begin_rebuild(self) -> None:
+        """Start recording ingest, so replace() keeps what is written while the database is being scanned."""
+        with self._lock:
+            self._journal = []
+
+    def abort_rebuild(self) -> None:
+        with self._lock:
+            self._journal = None
+
+    def replace(self, time_ranges: Dict[str, List[int]], last_seen: Dict[str, Dict[str, int]],
+                user_locations: Dict[str, Dict[str, Any]]) -> None:
+        """Swap in state rebuilt from InfluxDB, then re-apply ingest recorded since begin_rebuild().
+
+        Replacing rather than merging lets a rebuild forget data removed by a delete.
+        """
+        with self._lock:
+            self.time_ranges = time_ranges
+            self.last_seen = last_seen
+            self.user_locations = user_locations
+            for kind, args in self._journal or []:
+                if kind == "observe":
+                    self._observe(*args)
+                else:
+                    self._observe_location(*args)
+            self._journal = None
+            self.loaded = True
+            self._dirty = True
+        self.save()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "sources": sorted(self.time_ranges),
+            "stations": sum(len(stations) for stations in self.last_seen.values()),
+            "user_stations": len(self.user_locations),
+        }
+
+    def save(self, force: bool = True) -> None:
+        """Persist the index; with force=False only when it changed and the last save is old enough."""
+        with self._lock:
+            if not force and (not self._dirty or time.monotonic() - self._saved_at < METADATA_SAVE_INTERVAL):
+                return
+            state = {"time_ranges": self.time_ranges, "last_seen": self.last_seen,
+                     "user_locations": self.user_locations}
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logging.error(f"Error saving metadata index {self.path}: {e}")
+                return
+            self._dirty = False
+            self._saved_at = time.monotonic()
+
+
+# Created on first use, so importing this module does not read the index file
+_metadata_index: MetadataIndex | None = None
+_metadata_index_lock = threading.Lock()
+
+
+def get_metadata_index() -> MetadataIndex:
+    """Return the process-wide metadata index, loading it from disk on first use."""
+    global _metadata_index
+    with _metadata_index_lock:
+        if _metadata_index is None:
+            _metadata_index = MetadataIndex()
+        return _metadata_index
+
+
+if __name__ == "__main__":
+    from backend.database import rebuild_metadata_index
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    rebuild_metadata_index()
+    print(get_metadata_index().stats())
@@ -0,0 +1,70 @@
+# file: backend/metrics.py
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+# Latency buckets (seconds) shared by HTTP, Flux and GIOŚ timings: 5 ms .. 60 s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+STAGE_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "API request latency until the response headers are sent",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS)
+
+FLUX_QUERY_SECONDS = Histogram(
+    "flux_query_duration_seconds", "Duration of Flux queries issued by backend.database",
+    ["query"], buckets=LATENCY_BUCKETS)
+FLUX_QUERY_ROWS = Histogram(
+    "flux_query_rows", "Records returned per Flux query", ["query"], buckets=COUNT_BUCKETS)
+FLUX_QUERY_FAILURES = Counter(
+    "flux_query_failures_total", "Flux queries that raised", ["query"])
+
+GIOS_REQUEST_SECONDS = Histogram(
+    "gios_request_duration_seconds", "Latency of single GIOŚ API requests, retries counted separately",
+    ["endpoint"], buckets=LATENCY_BUCKETS)
+GIOS_REQUEST_ERRORS = Counter(
+    "gios_request_errors_total", "Failed GIOŚ API requests", ["endpoint", "reason"])
+CRAWL_STAGE_SECONDS = Histogram(
+    "gios_crawl_stage_duration_seconds", "Wall time of each stage of a GIOŚ crawl", ["stage"],
+    buckets=STAGE_BUCKETS)
+
+WRITE_BATCH_LINES = Histogram(
+    "influxdb_write_batch_lines", "Line-protocol lines per InfluxDB write", buckets=COUNT_BUCKETS)
+WRITE_SECONDS = Histogram(
+    "influxdb_write_duration_seconds", "Latency of InfluxDB writes (spool segment flushes)",
+    buckets=LATENCY_BUCKETS)
+WRITE_FAILURES = Counter(
+    "influxdb_write_failures_total", "InfluxDB writes that failed", ["status"])
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """Observe the wall time of the block, also when it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histogram.labels(**labels) if labels else histogram).observe(time.perf_counter() - started)
+
+
+def observe_query(name: str, started: float, rows: int | None) -> None:
+    """Record one Flux query; rows=None marks a failed query."""
+    FLUX_QUERY_SECONDS.labels(query=name).observe(time.perf_counter() - started)
+    if rows is None:
+        FLUX_QUERY_FAILURES.labels(query=name).inc()
+    else:
+        FLUX_QUERY_ROWS.labels(query=name).observe(rows)
+
+
+def gios_endpoint(path: str) -> str:
+    """Collapse IDs out of a GIOŚ path, e.g. /data/getData/123 -> /data/getData."""
+    return "/".join(part for part in path.split("/") if not part.isdigit()) or "/"
+
+
+def render() -> tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
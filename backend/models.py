@@ -1,8 +1,22 @@
 #file: backend/models.py
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional
 
+from backend.utils import parse_timestamp
+
+POLLUTANT_FIELDS = ["pm25", "pm10", "no2", "so2", "o3", "co", "c6h6"]
+
+def check_tag_value(value: str) -> str:
+    """Reject values that cannot be stored as an InfluxDB tag (empty, line breaks, trailing backslash)."""
+    if not value:
+        raise ValueError("must not be empty")
+    if "\n" in value or "\r" in value:
+        raise ValueError("must not contain line breaks")
+    if value.endswith("\\"):
+        raise ValueError("must not end with a backslash")
+    return value
+
 class AirQualityData(BaseModel):
     station_id: str = Field(..., description="Unique identifier of the station")
     timestamp: str = Field(..., description="Timestamp in ISO format")
@@ -15,6 +29,19 @@ class AirQualityData(BaseModel):
     co: Optional[float] = Field(None, ge=0, description="CO concentration (mg/m³)")
     c6h6: Optional[float] = Field(None, ge=0, description="C6H6 concentration (µg/m³)")
 
+    @field_validator("station_id", "source")
+    @classmethod
+    def check_tags(cls, value: str) -> str:
+        """Station ID and source become InfluxDB tags; bad values are rejected at request time, not by the writer."""
+        return check_tag_value(value)
+
+    @field_validator("timestamp")
+    @classmethod
+    def check_timestamp(cls, value: str) -> str:
+        """Reject timestamps InfluxDB cannot store, so one bad record never fails a whole write batch."""
+        parse_timestamp(value)
+        return value
+
 class UserAirQualityData(AirQualityData):
     """Model for user-submitted air quality data."""
     station_id: str = Field(..., description="User-defined station ID")
@@ -0,0 +1,155 @@
+# file: backend/profiling.py
+
+import io
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Dict, Any, Iterator
+
+from influxdb_client.client.flux_csv_parser import FluxCsvParser, FluxSerializationMode
+from influxdb_client.client.flux_table import TableList
+from influxdb_client.client.query_api import QueryOptions
+
+QUERY_PROFILING = os.getenv("QUERY_PROFILING", "false").lower() == "true"  # allow ?profile=true on query endpoints
+QUERY_PROFILE_HISTORY = int(os.getenv("QUERY_PROFILE_HISTORY", "50"))  # profiles kept for /profiles/{id}
+
+FLUX_PROFILERS = ["query", "operator"]
+# Durations reported by the Flux query profiler, in nanoseconds, exposed as Server-Timing entries
+FLUX_QUERY_PHASES = {"QueueDuration": "flux_queue", "CompileDuration": "flux_compile",
+                     "PlanDuration": "flux_plan", "ExecuteDuration": "flux_execute"}
+
+_current: ContextVar["QueryProfile | None"] = ContextVar("query_profile", default=None)
+
+
+class QueryProfile:
+    """Phase timings and Flux profiler output of one profiled request."""
+
+    def __init__(self, endpoint: str, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.endpoint = endpoint
+        self.params = params
+        self.created_at = time.time()
+        self.phases: Dict[str, float] = {}  # seconds, summed over every query of the request
+        self.queries: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - started)
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add_query(self, name: str, query: str, server: float, decode: float, rows: int,
+                  profiler: List[Dict[str, Any]]) -> None:
+        self.add_phase("flux_server", server)
+        self.add_phase("decode", decode)
+        for record in profiler:
+            if record.get("_measurement") == "profiler/query":
+                for field, phase in FLUX_QUERY_PHASES.items():
+                    if isinstance(record.get(field), int):
+                        self.add_phase(phase, record[field] / 1e9)
+        with self._lock:
+            self.queries.append({"name": name, "query": query, "server_ms": round(server * 1000, 3),
+                                 "decode_ms": round(decode * 1000, 3), "rows": rows, "profiler": profiler})
+
+    def total(self) -> float:
+        return time.perf_counter() - self._started
+
+    def server_timing(self) -> str:
+        """Phases as a Server-Timing header value (milliseconds)."""
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        return ", ".join(entries + [f"total;dur={self.total() * 1000:.2f}"])
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "endpoint": self.endpoint,
+            "params": self.params,
+            "created_at": self.created_at,
+            "total_ms": round(self.total() * 1000, 3),
+            "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            "queries": self.queries,
+        }
+
+
+class ProfileStore:
+    """The most recent profiles, for the /profiles/{id} sidecar."""
+
+    def __init__(self, capacity: int = QUERY_PROFILE_HISTORY):
+        self.capacity = capacity
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, profile: QueryProfile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile.as_dict()
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Dict[str, Any] | None:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+profiles = ProfileStore()
+
+
+def current_profile() -> QueryProfile | None:
+    return _current.get()
+
+
+@contextmanager
+def profiling(profile: QueryProfile | None) -> Iterator[QueryProfile | None]:
+    """Make `profile` the active profile of the current request (a no-op for None)."""
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def profile_phase(name: str) -> Iterator[None]:
+    """Time a block into the active profile, if the request is being profiled."""
+    profile = _current.get()
+    if profile is None:
+        yield
+    else:
+        with profile.phase(name):
+            yield
+
+
+def with_flux_profilers(query: str) -> str:
+    """Enable the Flux profilers in the query text itself.
+
+    (Passing profilers in QueryOptions would make influxdb_client print every query to stdout.)
+    """
+    enabled = ", ".join(f'"{name}"' for name in FLUX_PROFILERS)
+    return f'import "profiler"\noption profiler.enabledProfilers = [{enabled}]\n{query}'
+
+
+def profiler_query_options(records: List[Dict[str, Any]]) -> QueryOptions:
+    """Decoding options that split the profiler tables off the result; their records go into `records`."""
+    def collect(record) -> None:
+        records.append({key: value for key, value in record.values.items() if key not in ("result", "table")})
+    return QueryOptions(profilers=FLUX_PROFILERS, profiler_callback=collect)
+
+
+def decode_flux_csv(body: str, query_options: QueryOptions) -> TableList:
+    """Parse an annotated-CSV body already read from InfluxDB, so decoding can be timed apart from transfer."""
+    parser = FluxCsvParser(response=io.BytesIO(body.encode("utf-8")), serialization_mode=FluxSerializationMode.tables,
+                           query_options=query_options)
+    for _ in parser.generator():
+        pass
+    return parser.table_list()
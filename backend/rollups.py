@@ -0,0 +1,214 @@
+# file: backend/rollups.py
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Any, Iterable, Tuple
+
+ROLLUP_MEASUREMENT = "air_quality_rollup"
+ROLLUP_STATE_FILE = os.getenv("ROLLUP_STATE_FILE", "rollup_state.json")
+ROLLUP_STATS = ["mean", "min", "max", "count"]
+
+_NS = 1_000_000_000
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+_DURATION_PART = re.compile(r"(\d+)([smhdw])")
+
+# Rollup periods, coarsest first; fixed durations so windows align to the epoch like aggregateWindow does
+ROLLUP_PERIODS = {"30d": 30 * 86400 * _NS, "7d": 7 * 86400 * _NS, "1d": 86400 * _NS}
+
+
+def parse_duration(value: str) -> int | None:
+    """Convert a simple Flux duration (e.g. 1h, 7d, 1d12h) to nanoseconds; None if it is not fixed-length."""
+    parts = _DURATION_PART.findall(value)
+    if not parts or "".join(f"{n}{u}" for n, u in parts) != value:
+        return None
+    return sum(int(n) * _DURATION_UNITS[u] for n, u in parts) * _NS
+
+
+def choose_rollup(aggregation: str) -> str | None:
+    """Pick the coarsest rollup period whose windows tile the requested aggregation windows."""
+    every = parse_duration(aggregation)
+    if every is None:
+        return None
+    for period, length in ROLLUP_PERIODS.items():
+        if every >= length and every % length == 0:
+            return period
+    return None
+
+
+def align_down(ns: int, every: int) -> int:
+    return ns // every * every
+
+
+def align_up(ns: int, every: int) -> int:
+    return -(-ns // every) * every
+
+
+def ns_to_iso(ns: int) -> str:
+    """Format nanoseconds the same way record.get_time().isoformat() does on the raw path."""
+    return (datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(microseconds=ns // 1000)).isoformat()
+
+
+def split_range(start_ns: int, stop_ns: int, every: int) -> Tuple[int, int] | None:
+    """Return the full aggregation windows [first, last) inside [start, stop), or None if there are none."""
+    first, last = align_up(start_ns, every), align_down(stop_ns, every)
+    return (first, last) if first < last else None
+
+
+def combine_rollup_rows(records: Iterable[Tuple[str, str, str, int, str, float]], every: int) -> List[Dict[str, Any]]:
+    """Merge (station_id, source, field, time_ns, stat, value) rollup records into aggregation rows.
+
+    Means are weighted by counts, so several rollup windows combine into exactly the raw-path mean.
+    """
+    pairs: Dict[Tuple[str, str, str, int], Dict[str, float]] = defaultdict(dict)
+    for station_id, source, field, time_ns, stat, value in records:
+        pairs[(station_id, source, field, time_ns)][stat] = value
+
+    totals: Dict[Tuple[str, str, int], Dict[str, List[float]]] = defaultdict(dict)
+    for (station_id, source, field, time_ns), stats in pairs.items():
+        if "mean" not in stats or not stats.get("count"):
+            continue
+        # Rollup points are stamped with their window stop, which is also inside the enclosing window's stop
+        bucket = totals[(station_id, source, align_up(time_ns, every))].setdefault(field, [0.0, 0.0])
+        bucket[0] += stats["mean"] * stats["count"]
+        bucket[1] += stats["count"]
+
+    return [
+        {
+            "station_id": station_id,
+            "source": source,
+            "timestamp": ns_to_iso(stop_ns),
+            **{field: total / count for field, (total, count) in fields.items()},
+        }
+        for (station_id, source, stop_ns), fields in sorted(totals.items())
+    ]
+
+
+class RollupTracker:
+    """Tracks which time ranges have rollups (coverage) and which were written since the last refresh (dirty).
+
+    Both are persisted, so ranges replayed into InfluxDB but not yet refreshed stay dirty across restarts.
+    """
+
+    def __init__(self, path: str = ROLLUP_STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        # (sequence number, stations, start, stop); the sequence tells entries of a pending() snapshot from later ones
+        self._dirty: List[Tuple[int, frozenset, int, int]] = []
+        self._next_seq = 0
+        self.coverage: Dict[str, List[int]] = {}
+        try:
+            with open(path, "r") as f:
+                state = json.load(f)
+            self.coverage = state.get("coverage", {})
+            for stations, start, stop in state.get("dirty", []):
+                self.mark_dirty(stations, start, stop)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            logging.error(f"Error reading rollup state {path}: {e}")
+
+    def mark_dirty(self, stations: Iterable[str], start_ns: int, stop_ns: int) -> None:
+        with self._lock:
+            self._dirty.append((self._next_seq, frozenset(stations), start_ns, stop_ns))
+            self._next_seq += 1
+
+    def pending(self) -> Tuple[List[Tuple[frozenset, int, int]], int]:
+        """Snapshot of dirty ranges, coalesced where they overlap, and the sequence number it ends before."""
+        with self._lock:
+            ranges = sorted(self._dirty, key=lambda r: r[2])
+            upto = self._next_seq
+        merged: List[Tuple[frozenset, int, int]] = []
+        for _, stations, start, stop in ranges:
+            if merged and start <= merged[-1][2]:
+                last_stations, last_start, last_stop = merged[-1]
+                merged[-1] = (last_stations | stations, last_start, max(last_stop, stop))
+            else:
+                merged.append((stations, start, stop))
+        return merged, upto
+
+    def clear_refreshed(self, refreshed: List[Tuple[frozenset, int, int]], upto: int) -> None:
+        """Forget dirty ranges of the pending() snapshot ending before `upto` that were just refreshed.
+
+        Ranges marked while the refresh ran stay dirty even when they fall inside it: the refresh may have
+        read InfluxDB before their data arrived.
+        """
+        with self._lock:
+            self._dirty = [
+                (seq, dirty_stations, dirty_start, dirty_stop) for seq, dirty_stations, dirty_start, dirty_stop in self._dirty
+                if seq >= upto or not any(dirty_stations <= stations and start <= dirty_start and dirty_stop <= stop
+                                          for stations, start, stop in refreshed)
+            ]
+
+    def covered(self, period: str) -> List[int] | None:
+        with self._lock:
+            covered = self.coverage.get(period)
+            return list(covered) if covered else None
+
+    def is_clean(self, period: str, station_ids: List[str] | None, start_ns: int, stop_ns: int) -> bool:
+        """True when rollups of `period` exist for [start, stop) and no pending write overlaps it."""
+        wanted = set(station_ids) if station_ids else None
+        with self._lock:
+            covered = self.coverage.get(period)
+            if not covered or start_ns < covered[0] or stop_ns > covered[1]:
+                return False
+            return not any(
+                start <= stop_ns and start_ns <= stop and (wanted is None or not wanted.isdisjoint(stations))
+                for _, stations, start, stop in self._dirty
+            )
+
+    def extend_coverage(self, period: str, start_ns: int, stop_ns: int) -> None:
+        """Record that [start, stop) was recomputed; coverage only grows while it stays contiguous."""
+        with self._lock:
+            covered = self.coverage.get(period)
+            if not covered or stop_ns < covered[0] or start_ns > covered[1]:
+                if not covered or stop_ns - start_ns > covered[1] - covered[0]:
+                    self.coverage[period] = [start_ns, stop_ns]
+            else:
+                self.coverage[period] = [min(covered[0], start_ns), max(covered[1], stop_ns)]
+
+    def reset_coverage(self) -> None:
+        """Forget all coverage, e.g. after an import that bypassed dirty tracking."""
+        with self._lock:
+            self.coverage.clear()
+
+    def save(self) -> None:
+        with self._lock:
+            state = {
+                "coverage": self.coverage,
+                "dirty": [[sorted(stations), start, stop] for _, stations, start, stop in self._dirty],
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+
+
+# Created on first use, so importing this module does not read the state file
+_rollup_tracker: RollupTracker | None = None
+_rollup_tracker_lock = threading.Lock()
+
+
+def get_rollup_tracker() -> RollupTracker:
+    """Return the process-wide rollup tracker, loading its state on first use."""
+    global _rollup_tracker
+    with _rollup_tracker_lock:
+        if _rollup_tracker is None:
+            _rollup_tracker = RollupTracker()
+        return _rollup_tracker
+
+
+if __name__ == "__main__":
+    import argparse
+    from backend.database import backfill_rollups
+
+    parser = argparse.ArgumentParser(description="Backfill air quality rollup measurements from raw data.")
+    parser.add_argument("--start", default="2025-01-01", help="First day to backfill (YYYY-MM-DD)")
+    parser.add_argument("--stop", default=None, help="Day after the last one to backfill (default: now)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    backfill_rollups(args.start, args.stop)
@@ -1,27 +1,160 @@
+# file: backend/scheduler.py
+
 import asyncio
-import threading
-import schedule
 import logging
+import os
+import random
 import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Callable, Awaitable
+
+import aiohttp
+
+from backend.crawler import create_session
 from backend.gios_api import fetch_and_save
 
+# GIOŚ publishes hourly averages with a delay, so crawl a while after the full hour rather than on it
+GIOS_SCHEDULE_MINUTES = [int(m) for m in os.getenv("GIOS_SCHEDULE_MINUTES", "25").split(",")]
+GIOS_SCHEDULE_JITTER = float(os.getenv("GIOS_SCHEDULE_JITTER", "120"))  # seconds added at random to each run
+GIOS_JOB_TIMEOUT = float(os.getenv("GIOS_JOB_TIMEOUT", "3000"))  # seconds before a crawl is cancelled
+SCHEDULER_HISTORY = int(os.getenv("SCHEDULER_HISTORY", "48"))  # runs kept per job
+
+
+def next_run_time(now: datetime, minutes: List[int]) -> datetime:
+    """Next time strictly after `now` whose minute is one of `minutes` (cron-style `M * * * *`)."""
+    base = now.replace(second=0, microsecond=0)
+    for hour_offset in (0, 1):
+        hour = base.replace(minute=0) + timedelta(hours=hour_offset)
+        for minute in sorted(minutes):
+            candidate = hour + timedelta(minutes=minute)
+            if candidate > now:
+                return candidate
+    raise ValueError(f"Invalid schedule minutes: {minutes}")
+
+
+class Job:
+    """A periodic coroutine with a single-flight guard, a timeout and a bounded run history."""
+
+    def __init__(self, name: str, func: Callable[[], Awaitable[Dict[str, Any]]], minutes: List[int],
+                 jitter: float, timeout: float):
+        self.name = name
+        self.func = func
+        self.minutes = minutes
+        self.jitter = jitter
+        self.timeout = timeout
+        self.history: deque = deque(maxlen=SCHEDULER_HISTORY)
+        self.next_run: datetime | None = None
+        self.overlaps = 0
+        self._lock = asyncio.Lock()
+        self._run_task: asyncio.Task | None = None
+
+    async def run(self) -> Dict[str, Any] | None:
+        """Run the job now unless a previous run is still in flight; returns the run record."""
+        if self._lock.locked():
+            self.overlaps += 1
+            logging.warning(f"Job {self.name} still running, skipping this run")
+            return None
+        async with self._lock:
+            started = time.time()
+            entry: Dict[str, Any] = {"started_at": datetime.fromtimestamp(started, timezone.utc).isoformat()}
+            try:
+                result = await asyncio.wait_for(self.func(), timeout=self.timeout)
+                entry["status"] = "failed" if result.get("error") else "ok"
+                entry["points"] = result.get("new", 0)
+                entry["skipped"] = result.get("skipped", 0)
+                entry["failures"] = result.get("write_errors", 0) + len(result.get("failed_sensors", [])) + \
+                    len(result.get("failed_stations", []))
+                if result.get("error"):
+                    entry["error"] = result["error"]
+            except asyncio.TimeoutError:
+                entry["status"] = "timeout"
+                logging.error(f"Job {self.name} timed out after {self.timeout}s")
+            except Exception as e:
+                entry["status"] = "failed"
+                entry["error"] = str(e)
+                logging.error(f"Scheduled job {self.name} failed: {e}")
+            entry["duration"] = round(time.time() - started, 3)
+            self.history.append(entry)
+            return entry
+
+    async def run_forever(self) -> None:
+        while True:
+            self.next_run = next_run_time(datetime.now(timezone.utc), self.minutes) + \
+                timedelta(seconds=random.uniform(0, self.jitter))
+            await asyncio.sleep((self.next_run - datetime.now(timezone.utc)).total_seconds())
+            # Runs as its own task so a long crawl cannot delay the next slot; the lock skips overlaps
+            self._run_task = asyncio.create_task(self.run())
+
+    def cancel(self) -> None:
+        if self._run_task is not None:
+            self._run_task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        runs = list(self.history)
+        finished = [run for run in runs if run["status"] == "ok"]
+        return {
+            "running": self._lock.locked(),
+            "next_run": self.next_run.isoformat() if self.next_run else None,
+            "schedule_minutes": self.minutes,
+            "jitter": self.jitter,
+            "timeout": self.timeout,
+            "runs": len(runs),
+            "succeeded": len(finished),
+            "overlaps_skipped": self.overlaps,
+            "mean_duration": round(sum(run["duration"] for run in finished) / len(finished), 3) if finished else None,
+            "history": runs,
+        }
+
+
+class Scheduler:
+    """Runs jobs on the application's event loop."""
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, job: Job) -> None:
+        self.jobs[job.name] = job
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(job.run_forever()) for job in self.jobs.values()]
+            logging.info(f"Scheduler started with jobs: {', '.join(self.jobs)}")
+
+    async def run_now(self, name: str) -> Dict[str, Any] | None:
+        return await self.jobs[name].run()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for job in self.jobs.values():
+            job.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await close_gios_session()
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: job.stats() for name, job in self.jobs.items()}
+
+
+_gios_session: aiohttp.ClientSession | None = None
+
 
-def run_schedule() -> None :
-    """Schedule periodic fetching of GIOŚ data every hour."""
+async def fetch_gios() -> Dict[str, Any]:
+    """Crawl GIOŚ through one long-lived session, so connections and TLS setup carry over between runs."""
+    global _gios_session
+    if _gios_session is None or _gios_session.closed:
+        _gios_session = create_session()
+    return await fetch_and_save(session=_gios_session)
 
-    def job() :
-        try :
-            asyncio.run(fetch_and_save())
-        except Exception as e :
-            logging.error(f"Scheduled job failed: {e}")
 
-    schedule.every(1).hours.do(job)
+async def close_gios_session() -> None:
+    global _gios_session
+    if _gios_session is not None:
+        await _gios_session.close()
+        _gios_session = None
 
-    def run_continuously() :
-        while True :
-            schedule.run_pending()
-            time.sleep(60)  # Use time.sleep for synchronous thread
 
-    thread = threading.Thread(target = run_continuously, daemon = True)
-    thread.start()
-    logging.info("Scheduler started in background thread")
\ No newline at end of file
+scheduler = Scheduler()
+scheduler.add_job(Job("gios", fetch_gios, GIOS_SCHEDULE_MINUTES, GIOS_SCHEDULE_JITTER, GIOS_JOB_TIMEOUT))
@@ -0,0 +1,214 @@
+# file: backend/spatial.py
+
+import heapq
+import logging
+import math
+import os
+import threading
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+
+from backend.gios_common import read_catalog
+
+SPATIAL_CELL_DEG = float(os.getenv("SPATIAL_CELL_DEG", "0.1"))  # grid cell size in degrees (~11 km of latitude)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+Cell = Tuple[int, int]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + \
+        math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def circle_boxes(lat: float, lon: float, radius_km: float) -> List[Tuple[float, float, float, float]]:
+    """Lat/lon boxes (min_lat, min_lon, max_lat, max_lon) that together cover a circle on the sphere.
+
+    The longitude span is the exact one of a spherical cap, so it widens with 1/cos(lat); a circle crossing
+    the antimeridian is split in two boxes and one reaching over a pole covers every longitude.
+    """
+    dlat = radius_km / KM_PER_DEG_LAT
+    min_lat, max_lat = lat - dlat, lat + dlat
+    ratio = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat)) if abs(lat) < 90 else 2.0
+    if min_lat <= -90 or max_lat >= 90 or radius_km >= math.pi * EARTH_RADIUS_KM / 2 or ratio >= 1:
+        return [(max(-90.0, min_lat), -180.0, min(90.0, max_lat), 180.0)]
+    dlon = math.degrees(math.asin(ratio))
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180:
+        return [(min_lat, min_lon + 360, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+    if max_lon > 180:
+        return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon - 360)]
+    return [(min_lat, min_lon, max_lat, max_lon)]
+
+
+class GridIndex:
+    """Stations bucketed into fixed lat/lon cells (a geohash-like grid) for radius and bounding-box lookups.
+
+    Lookups only visit the cells overlapping the query box, so their cost depends on how many stations are
+    near the query point, not on how many are indexed.
+    """
+
+    def __init__(self, cell_deg: float = SPATIAL_CELL_DEG):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Cell, Dict[Tuple[str, str], Dict[str, Any]]] = {}
+        self._locations: Dict[Tuple[str, str], Cell] = {}
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    @property
+    def cell_count(self) -> int:
+        return len(self._cells)
+
+    def cell(self, lat: float, lon: float) -> Cell:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def insert(self, entry: Dict[str, Any]) -> None:
+        """Add or move a station; entries are keyed by (source, station_id)."""
+        key = (entry["source"], entry["station_id"])
+        self.remove(key)
+        cell = self.cell(entry["lat"], entry["lon"])
+        self._cells.setdefault(cell, {})[key] = entry
+        self._locations[key] = cell
+
+    def remove(self, key: Tuple[str, str]) -> None:
+        cell = self._locations.pop(key, None)
+        if cell is not None:
+            bucket = self._cells[cell]
+            del bucket[key]
+            if not bucket:
+                del self._cells[cell]
+
+    def remove_source(self, source: str) -> None:
+        for key in [key for key in self._locations if key[0] == source]:
+            self.remove(key)
+
+    def candidates(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> Iterator[Dict[str, Any]]:
+        """Entries of every cell overlapping the box (a superset of the stations inside it)."""
+        (y0, x0), (y1, x1) = self.cell(min_lat, min_lon), self.cell(max_lat, max_lon)
+        if (y1 - y0 + 1) * (x1 - x0 + 1) <= len(self._cells):
+            for y in range(y0, y1 + 1):
+                for x in range(x0, x1 + 1):
+                    bucket = self._cells.get((y, x))
+                    if bucket:
+                        yield from bucket.values()
+        else:  # A box larger than the occupied area: scanning occupied cells is cheaper
+            for (y, x), bucket in self._cells.items():
+                if y0 <= y <= y1 and x0 <= x <= x1:
+                    yield from bucket.values()
+
+    def nearby(self, lat: float, lon: float, radius_km: float, k: int,
+               source: str | None = None) -> List[Dict[str, Any]]:
+        """Up to k stations within radius_km of (lat, lon), nearest first, with their distance.
+
+        Only stations inside the bounding box of the search circle are looked at; inclusion and ranking
+        use the exact great-circle distance.
+        """
+        found = []
+        for min_lat, min_lon, max_lat, max_lon in circle_boxes(lat, lon, radius_km):
+            for entry in self.candidates(min_lat, min_lon, max_lat, max_lon):
+                if not (min_lat <= entry["lat"] <= max_lat and min_lon <= entry["lon"] <= max_lon):
+                    continue
+                if source is not None and entry["source"] != source:
+                    continue
+                distance = haversine_km(lat, lon, entry["lat"], entry["lon"])
+                if distance <= radius_km:
+                    found.append((distance, entry["station_id"], entry))
+        nearest = heapq.nsmallest(k, found, key=lambda item: (item[0], item[1]))
+        return [{**entry, "distance_km": round(distance, 3)} for distance, _, entry in nearest]
+
+    def within(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+               source: str | None = None, limit: int | None = None) -> List[Dict[str, Any]]:
+        """Stations inside the bounding box."""
+        found = []
+        for entry in self.candidates(min_lat, min_lon, max_lat, max_lon):
+            if min_lat <= entry["lat"] <= max_lat and min_lon <= entry["lon"] <= max_lon \
+                    and (source is None or entry["source"] == source):
+                found.append(entry)
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+
+def gios_entries(stations: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Index entries for GIOŚ findAll station records; stations without coordinates are skipped."""
+    entries = []
+    for station in stations:
+        try:
+            lat, lon = float(station["gegrLat"]), float(station["gegrLon"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        entries.append({"station_id": str(station["id"]), "source": "gios",
+                        "name": station.get("stationName") or f"Station {station['id']}", "lat": lat, "lon": lon})
+    return entries
+
+
+class StationLocator:
+    """Process-wide spatial index over GIOŚ catalog stations and user stations.
+
+    The GIOŚ part is rebuilt whenever a catalog with a new fetch time is seen; user stations are updated
+    one by one as their locations arrive, or replaced wholesale after a metadata rebuild.
+    """
+
+    def __init__(self, cell_deg: float = SPATIAL_CELL_DEG):
+        self._index = GridIndex(cell_deg)
+        self._lock = threading.Lock()
+        self._catalog_fetched_at: float | None = None
+        self.loaded = False
+
+    def load(self, user_locations: Dict[str, Dict[str, Any]]) -> None:
+        """Initial fill from the cached GIOŚ catalog (any age) and the known user station locations."""
+        catalog = read_catalog(ttl=None)
+        if catalog:
+            self.update_catalog(catalog)
+        self.update_user_stations(user_locations)
+        self.loaded = True
+
+    def update_catalog(self, catalog: Dict[str, Any]) -> bool:
+        """Rebuild the GIOŚ stations if this catalog is newer than the indexed one; True when rebuilt."""
+        fetched_at = catalog.get("fetched_at")
+        if fetched_at is not None and fetched_at == self._catalog_fetched_at:
+            return False
+        entries = gios_entries(catalog.get("stations", []))
+        with self._lock:
+            self._index.remove_source("gios")
+            for entry in entries:
+                self._index.insert(entry)
+            self._catalog_fetched_at = fetched_at
+        logging.info(f"Spatial index: {len(entries)} GIOŚ stations indexed")
+        return True
+
+    def update_user_station(self, station_id: str, lat: float, lon: float) -> None:
+        with self._lock:
+            self._index.insert({"station_id": station_id, "source": "user", "name": station_id,
+                                "lat": lat, "lon": lon})
+
+    def update_user_stations(self, locations: Dict[str, Dict[str, Any]]) -> None:
+        """Replace all user stations, e.g. after the metadata index was rebuilt."""
+        with self._lock:
+            self._index.remove_source("user")
+            for station_id, location in locations.items():
+                self._index.insert({"station_id": station_id, "source": "user", "name": station_id,
+                                    "lat": location["lat"], "lon": location["lon"]})
+
+    def nearby(self, lat: float, lon: float, radius_km: float, k: int,
+               source: str | None = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._index.nearby(lat, lon, radius_km, k, source)
+
+    def within(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+               source: str | None = None, limit: int | None = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._index.within(min_lat, min_lon, max_lat, max_lon, source, limit)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"loaded": self.loaded, "stations": len(self._index), "cells": self._index.cell_count,
+                    "catalog_fetched_at": self._catalog_fetched_at}
+
+
+station_locator = StationLocator()
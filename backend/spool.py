@@ -0,0 +1,265 @@
+# file: backend/spool.py
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Callable, Tuple
+
+from backend.metrics import WRITE_BATCH_LINES, WRITE_SECONDS, WRITE_FAILURES
+
+SPOOL_DIR = os.getenv("SPOOL_DIR", "spool")
+SPOOL_SEGMENT_BYTES = int(os.getenv("SPOOL_SEGMENT_BYTES", str(4 * 1024 * 1024)))  # seal segments at this size
+SPOOL_SEAL_INTERVAL = float(os.getenv("SPOOL_SEAL_INTERVAL", "1"))  # seconds before a partial segment is sealed
+SPOOL_FSYNC = os.getenv("SPOOL_FSYNC", "true").lower() == "true"
+SPOOL_DRAIN_TIMEOUT = float(os.getenv("SPOOL_DRAIN_TIMEOUT", "300"))  # seconds to wait for replay after a crawl
+SPOOL_RETRY_MIN = 1.0  # seconds
+SPOOL_RETRY_MAX = 60.0  # seconds
+
+_META_PREFIX = "#meta "  # line-protocol comment, ignored by InfluxDB
+_REJECTED_STATUSES = {400, 422}  # InfluxDB will never accept these segments, retrying would block the spool
+
+
+class Spool:
+    """Write-ahead spool of line-protocol segment files, replayed in order to InfluxDB by a background thread.
+
+    Every append is on disk before it returns, so data survives InfluxDB outages and process restarts.
+    Replay reads one sealed segment at a time, keeping memory bounded by SPOOL_SEGMENT_BYTES.
+    """
+
+    def __init__(self, directory: str, writer: Callable[[str], None],
+                 on_replayed: Callable[[List[Dict[str, Any]]], None] | None = None,
+                 segment_bytes: int = SPOOL_SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._writer = writer
+        self._on_replayed = on_replayed
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._drained = threading.Condition(self._lock)
+        self._thread: threading.Thread | None = None
+        self._active = None
+        self._active_path: str | None = None
+        self._active_opened = 0.0
+        self._replay_log: deque = deque(maxlen=120)  # (time, lines) of recent replays, for the rate
+        self.appended_lines = 0
+        self.replayed_lines = 0
+        self.replayed_segments = 0
+        self.failures = 0
+        self.rejected_blocks = 0
+        self.consecutive_failures = 0
+        self.last_error: str | None = None
+        self.last_replay_at: float | None = None
+        os.makedirs(directory, exist_ok=True)
+        existing = self._segments(include_active=True)
+        self._next_seq = int(os.path.basename(existing[-1]).split(".")[0]) + 1 if existing else 0
+        # Anything left open by a previous process is complete up to its last fsync; seal it
+        for path in existing:
+            if path.endswith(".open"):
+                os.replace(path, path[:-len(".open")])
+
+    def append(self, lines: str, meta: Dict[str, Any] | None = None) -> None:
+        """Durably append a block of line protocol; meta is handed to on_replayed once it reaches InfluxDB."""
+        if not lines:
+            return
+        count = lines.count("\n") + (not lines.endswith("\n"))
+        header = f"{_META_PREFIX}{json.dumps({**(meta or {}), 'lines': count})}\n"
+        with self._lock:
+            if self._active is None:
+                self._open_segment()
+            self._active.write(header)
+            self._active.write(lines if lines.endswith("\n") else lines + "\n")
+            self._active.flush()
+            if SPOOL_FSYNC:
+                os.fsync(self._active.fileno())
+            self.appended_lines += count
+            if self._active.tell() >= self.segment_bytes:
+                self._seal_segment()
+        self.start()
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """Start the replay thread if it is not running yet."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._replay_forever, name="spool-replay", daemon=True)
+            self._thread.start()
+
+    def wait_drained(self, timeout: float | None = None) -> bool:
+        """Block until everything appended so far has been replayed; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._active is not None or self._segments():
+                self._wakeup.set()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._drained.wait(timeout=0.5 if remaining is None else min(0.5, remaining))
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            segments = self._segments(include_active=True)
+            depth_bytes = sum(os.path.getsize(path) for path in segments if os.path.exists(path))
+            now = time.monotonic()
+            recent = [(at, lines) for at, lines in self._replay_log if now - at <= 60]
+        return {
+            "depth_segments": len(segments),
+            "depth_bytes": depth_bytes,
+            "appended_lines": self.appended_lines,
+            "replayed_lines": self.replayed_lines,
+            "replayed_segments": self.replayed_segments,
+            "replay_lines_per_second": round(sum(lines for _, lines in recent) / 60, 1),
+            "failures": self.failures,
+            "rejected_blocks": self.rejected_blocks,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "last_replay_at": self.last_replay_at,
+        }
+
+    def _segments(self, include_active: bool = False) -> List[str]:
+        names = sorted(
+            name for name in os.listdir(self.directory)
+            if name.endswith(".lp") or (include_active and name.endswith(".lp.open"))
+        )
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _open_segment(self) -> None:
+        self._active_path = os.path.join(self.directory, f"{self._next_seq:012d}.lp.open")
+        self._next_seq += 1
+        self._active = open(self._active_path, "a", encoding="utf-8")
+        self._active_opened = time.monotonic()
+
+    def _seal_segment(self) -> None:
+        self._active.close()
+        os.replace(self._active_path, self._active_path[:-len(".open")])
+        self._active = None
+        self._active_path = None
+
+    def _replay_forever(self) -> None:
+        delay = SPOOL_RETRY_MIN
+        while True:
+            with self._lock:
+                if self._active is not None and time.monotonic() - self._active_opened >= SPOOL_SEAL_INTERVAL:
+                    self._seal_segment()
+                segments = self._segments()
+                if not segments and self._active is None:
+                    self._drained.notify_all()
+            if not segments:
+                self._wakeup.wait(timeout=SPOOL_SEAL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            if self._replay_segment(segments[0]):
+                delay = SPOOL_RETRY_MIN
+            else:
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                delay = min(SPOOL_RETRY_MAX, delay * 2)
+
+    def _replay_segment(self, path: str) -> bool:
+        with open(path, "r", encoding="utf-8") as f:
+            body = f.read()
+        blocks = _split_blocks(body)
+        try:
+            self._write(body, sum(meta.get("lines", 0) for meta, _ in blocks))
+        except Exception as e:
+            if getattr(e, "status", None) not in _REJECTED_STATUSES:
+                self._retry_later(path, e)
+                return False
+            if len(blocks) == 1:
+                self._reject(path, body, e)
+                os.remove(path)
+                return True
+            # One append InfluxDB refuses must not take the others stored in the same segment with it
+            logging.warning(f"InfluxDB rejected spool segment {os.path.basename(path)}, "
+                            f"retrying its {len(blocks)} blocks one by one")
+            return self._replay_blocks(path, blocks)
+        self._acknowledge(path, [meta for meta, _ in blocks])
+        return True
+
+    def _replay_blocks(self, path: str, blocks: List[Tuple[Dict[str, Any], str]]) -> bool:
+        """Write each append of a segment separately; only rejected appends are moved aside."""
+        written, rejected = [], []
+        for i, (meta, block) in enumerate(blocks):
+            try:
+                self._write(block, meta.get("lines", 0))
+                written.append(meta)
+            except Exception as e:
+                if getattr(e, "status", None) in _REJECTED_STATUSES:
+                    rejected.append(block)
+                    self.last_error = f"{type(e).__name__}: {(str(e).splitlines() or [''])[0]}"
+                    continue
+                # Keep only what has not reached InfluxDB (or rejected/) yet for the next attempt
+                if rejected:
+                    self._reject(path, "".join(rejected), e)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write("".join(block for _, block in blocks[i:]))
+                os.replace(tmp_path, path)
+                self._run_hook(written)
+                self._retry_later(path, e)
+                return False
+        if rejected:
+            self._reject(path, "".join(rejected), None)
+        self._acknowledge(path, written)
+        return True
+
+    def _write(self, body: str, lines: int) -> None:
+        started = time.perf_counter()
+        try:
+            self._writer(body)
+        except Exception as e:
+            WRITE_SECONDS.observe(time.perf_counter() - started)
+            WRITE_FAILURES.labels(status=str(getattr(e, "status", None) or type(e).__name__)).inc()
+            self.failures += 1
+            raise
+        WRITE_SECONDS.observe(time.perf_counter() - started)
+        WRITE_BATCH_LINES.observe(lines)
+        self.replayed_lines += lines
+        self._replay_log.append((time.monotonic(), lines))
+
+    def _retry_later(self, path: str, error: Exception) -> None:
+        self.consecutive_failures += 1
+        self.last_error = f"{type(error).__name__}: {(str(error).splitlines() or [''])[0]}"
+        logging.warning(f"Spool replay of {os.path.basename(path)} failed, will retry: {self.last_error}")
+
+    def _reject(self, path: str, body: str, error: Exception | None) -> None:
+        """Move blocks InfluxDB will never accept to rejected/, so they neither block the spool nor vanish."""
+        if error is not None:
+            self.last_error = f"{type(error).__name__}: {(str(error).splitlines() or [''])[0]}"
+        rejected_dir = os.path.join(self.directory, "rejected")
+        os.makedirs(rejected_dir, exist_ok=True)
+        rejected_path = os.path.join(rejected_dir, os.path.basename(path))
+        with open(rejected_path, "a", encoding="utf-8") as f:
+            f.write(body)
+        self.rejected_blocks += len(_split_blocks(body))
+        logging.error(f"InfluxDB rejected data from spool segment {os.path.basename(path)}, moved to "
+                      f"{rejected_path}: {self.last_error}")
+
+    def _run_hook(self, metas: List[Dict[str, Any]]) -> None:
+        if self._on_replayed is not None and metas:
+            try:
+                self._on_replayed(metas)
+            except Exception as e:
+                logging.error(f"Error in spool replay hook: {e}")
+
+    def _acknowledge(self, path: str, metas: List[Dict[str, Any]]) -> None:
+        # The hook runs before the segment is removed: after a crash in between, the segment is replayed
+        # (InfluxDB writes are idempotent) and the hook runs again rather than not at all
+        self._run_hook(metas)
+        os.remove(path)
+        self.consecutive_failures = 0
+        self.replayed_segments += 1
+        self.last_replay_at = time.time()
+
+
+def _split_blocks(body: str) -> List[Tuple[Dict[str, Any], str]]:
+    """Split a segment into its appends: (meta, text including the #meta header) per append."""
+    blocks: List[Tuple[Dict[str, Any], List[str]]] = []
+    for line in body.splitlines(keepends=True):
+        if line.startswith(_META_PREFIX) or not blocks:
+            meta = json.loads(line[len(_META_PREFIX):]) if line.startswith(_META_PREFIX) else {}
+            blocks.append((meta, []))
+        blocks[-1][1].append(line)
+    return [(meta, "".join(lines)) for meta, lines in blocks]
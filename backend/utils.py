@@ -1,12 +1,12 @@
 #file: backend/utils.py
 
-from datetime import datetime
-import pytz
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Dict, Tuple
 
 def get_current_time() -> str:
     """Get current UTC time as a formatted string."""
-    return datetime.now(pytz.utc).isoformat()
+    return datetime.now(timezone.utc).isoformat()
 
 def adjust_time_range(start: datetime.date, end: datetime.date) -> Tuple[str, str]:
     """Adjust time range to ensure start_date <= end_date."""
@@ -22,4 +22,12 @@ def available_aggregation_options(start_date: datetime.date, end_date: datetime.
         options["Week"] = "7d"
     if days >= 30:
         options["Month"] = "30d"
-    return options
\ No newline at end of file
+    return options
+
+@lru_cache(maxsize=65536)
+def parse_timestamp(value: str) -> datetime:
+    """Parse an ISO or GIOŚ timestamp into an aware UTC datetime (naive values are treated as UTC)."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
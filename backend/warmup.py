@@ -0,0 +1,82 @@
+# file: backend/warmup.py
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import List, Dict, Any, Callable, Awaitable
+
+
+@dataclass
+class WarmUpStep:
+    """One warm-up stage; `progress` optionally reports how far along a running step is."""
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    progress: Callable[[], Dict[str, Any] | None] | None = None
+
+
+class WarmUp:
+    """Runs startup work in the background after the API starts serving, and reports how far it got."""
+
+    def __init__(self):
+        self.steps: List[WarmUpStep] = []
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self, steps: List[WarmUpStep]) -> None:
+        self.steps = steps
+        self.results = {step.name: {"status": "pending"} for step in steps}
+        self.started_at = time.time()
+        self.finished_at = None
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        for step in self.steps:
+            result = self.results[step.name]
+            result["status"] = "running"
+            started = time.time()
+            try:
+                await step.func()
+                result["status"] = "ok"
+            except Exception as e:
+                # A failed step does not stop the others; the API keeps serving whatever data it has
+                result["status"] = "failed"
+                result["error"] = str(e)
+                logging.error(f"Warm-up step {step.name} failed: {e}")
+            result["duration"] = round(time.time() - started, 3)
+        self.finished_at = time.time()
+        logging.info(f"Warm-up finished in {self.finished_at - self.started_at:.1f}s")
+
+    @property
+    def state(self) -> str:
+        if self.started_at is None:
+            return "pending"
+        if self.finished_at is None:
+            return "warming"
+        return "degraded" if any(r["status"] == "failed" for r in self.results.values()) else "ready"
+
+    def status(self) -> Dict[str, Any]:
+        steps = {}
+        for step in self.steps:
+            steps[step.name] = dict(self.results[step.name])
+            if steps[step.name]["status"] == "running" and step.progress is not None:
+                steps[step.name]["progress"] = step.progress()
+        end = self.finished_at or time.time()
+        return {
+            "state": self.state,
+            "elapsed": round(end - self.started_at, 3) if self.started_at else None,
+            "steps": steps,
+        }
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+warmup = WarmUp()
@@ -0,0 +1,75 @@
+# file: backend/watermarks.py
+
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Tuple, Callable
+
+from backend.models import POLLUTANT_FIELDS
+from backend.utils import parse_timestamp
+
+WATERMARK_FILE = os.getenv("GIOS_WATERMARK_FILE", "gios_watermarks.json")
+_NO_MARK = datetime.min.replace(tzinfo=timezone.utc)
+
+
+class WatermarkStore:
+    """High-water marks (latest stored timestamp) per (station_id, pollutant), persisted as JSON."""
+
+    def __init__(self, path: str = WATERMARK_FILE):
+        self.path = path
+        self.loaded = False
+        self._marks: Dict[Tuple[str, str], datetime] = {}
+
+    def load(self, seed: Callable[[], Dict[Tuple[str, str], datetime]] | None = None) -> None:
+        """Load marks from disk, or seed them (e.g. from InfluxDB) when no file exists yet."""
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    raw = json.load(f)
+                self._marks = {
+                    tuple(key.split("|", 1)): parse_timestamp(value)
+                    for key, value in raw.items()
+                }
+                logging.info(f"Loaded {len(self._marks)} watermarks from {self.path}")
+            except (OSError, ValueError) as e:
+                logging.error(f"Error loading watermarks from {self.path}: {e}")
+                self._marks = {}
+        if not self._marks and seed is not None:
+            self._marks = dict(seed())
+            logging.info(f"Seeded {len(self._marks)} watermarks from InfluxDB")
+        self.loaded = True
+
+    def save(self) -> None:
+        """Persist marks atomically so a crash never leaves a truncated file."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({f"{station}|{field}": ts.isoformat() for (station, field), ts in self._marks.items()}, f)
+        os.replace(tmp_path, self.path)
+
+    def filter_new(self, data: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """Split entries into those newer than the stored mark and a count of already stored values."""
+        new_data = []
+        skipped = 0
+        for entry in data:
+            timestamp = parse_timestamp(entry["timestamp"])
+            fields = [field for field in POLLUTANT_FIELDS if entry.get(field) is not None]
+            if all(timestamp <= self._marks.get((entry["station_id"], field), _NO_MARK) for field in fields):
+                skipped += 1
+            else:
+                new_data.append(entry)
+        return new_data, skipped
+
+    def advance(self, data: List[Dict[str, Any]]) -> None:
+        """Move the marks forward to the newest timestamps in data that has been written."""
+        for entry in data:
+            timestamp = parse_timestamp(entry["timestamp"])
+            for field in POLLUTANT_FIELDS:
+                if entry.get(field) is None:
+                    continue
+                key = (entry["station_id"], field)
+                if key not in self._marks or timestamp > self._marks[key]:
+                    self._marks[key] = timestamp
+
+    def __len__(self) -> int:
+        return len(self._marks)
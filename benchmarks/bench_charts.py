@@ -0,0 +1,46 @@
+# file: benchmarks/bench_charts.py
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from frontend.ui_elements import POLLUTANT_LABELS, build_svg_figures, build_webgl_figure
+
+
+def make_frame(points: int, stations: int) -> pd.DataFrame:
+    """Hourly rows for `stations` stations with every pollutant set, `points` values in total."""
+    pollutants = list(POLLUTANT_LABELS)
+    hours = max(1, points // (stations * len(pollutants)))
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        "station_name": np.repeat([f"Stacja {i}" for i in range(stations)], hours),
+        "timestamp": np.tile(pd.date_range("2024-01-01", periods=hours, freq="h", tz="UTC"), stations),
+    })
+    for pollutant in pollutants:
+        frame[pollutant] = rng.gamma(2.0, 10.0, len(frame))
+    return frame.sample(frac=1, random_state=0)  # Unordered, like rows merged from several stations
+
+
+def measure(frame: pd.DataFrame, mode: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    figures = build_svg_figures(frame) if mode == "svg" else [build_webgl_figure(frame)]
+    build = time.perf_counter() - start
+    payload = sum(len(fig.to_json()) for fig in figures)
+    return build, payload
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare chart build time and payload size of SVG and WebGL modes.")
+    parser.add_argument("--points", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--stations", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", default=["svg", "webgl"])
+    args = parser.parse_args()
+
+    print(f"{'points':>10} {'mode':>6} {'build ms':>10} {'payload MB':>11}")
+    for points in args.points:
+        frame = make_frame(points, args.stations)
+        for mode in args.modes:
+            build, payload = measure(frame, mode)
+            print(f"{points:>10} {mode:>6} {build * 1000:>10.1f} {payload / 1e6:>11.2f}")
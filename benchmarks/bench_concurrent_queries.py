@@ -0,0 +1,43 @@
+# file: benchmarks/bench_concurrent_queries.py
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+
+async def timed_get(session: aiohttp.ClientSession, url: str) -> float:
+    start = time.perf_counter()
+    async with session.get(url) as response:
+        await response.read()
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run(base_url: str, path: str, concurrency: int) -> None:
+    """Fire `concurrency` identical requests at once and compare wall time with per-request latency.
+
+    If the API serializes requests (a blocking call on the event loop), wall time approaches the sum of
+    latencies; if it handles them concurrently, wall time stays close to a single request's latency.
+    """
+    async with aiohttp.ClientSession() as session:
+        single = await timed_get(session, f"{base_url}{path}")
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(timed_get(session, f"{base_url}{path}") for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+
+    print(f"single request:      {single * 1000:8.1f} ms")
+    print(f"{concurrency} concurrent wall:  {wall * 1000:8.1f} ms")
+    print(f"median latency:      {statistics.median(latencies) * 1000:8.1f} ms")
+    print(f"serialization ratio: {wall / single:8.2f} (1.0 = fully concurrent, {concurrency} = serialized)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that concurrent slow queries do not serialize.")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/air_quality?start_date=2025-01-01&aggregation=1d")
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.path, args.concurrency))
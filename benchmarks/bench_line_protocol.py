@@ -0,0 +1,72 @@
+# file: benchmarks/bench_line_protocol.py
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, Any
+
+from influxdb_client import Point
+
+from backend.line_protocol import LineProtocolSerializer
+from backend.models import POLLUTANT_FIELDS
+
+
+def make_gios_entries(stations: int, hours: int) -> List[Dict[str, Any]]:
+    """Synthetic crawler output: one entry per (station, pollutant, hour), as fetch_sensor_data produces it."""
+    base = datetime(2025, 3, 1)
+    timestamps = [(base + timedelta(hours=h)).strftime("%Y-%m-%d %H:%M:%S") for h in range(hours)]
+    return [
+        {"station_id": str(10000 + station), "timestamp": timestamp, field: round(random.uniform(0, 100), 1)}
+        for station in range(stations)
+        for field in POLLUTANT_FIELDS
+        for timestamp in timestamps
+    ]
+
+
+def point_path(data: List[Dict[str, Any]]) -> str:
+    """The former save_to_influxdb path: one Point per field, built via the builder API."""
+    points = [
+        Point("air_quality")
+        .tag("station_id", entry["station_id"])
+        .tag("source", entry.get("source", "gios"))
+        .time(entry["timestamp"])
+        .field(field, float(entry[field]))
+        for entry in data
+        for field in POLLUTANT_FIELDS
+        if field in entry and entry[field] is not None
+    ]
+    return "\n".join(point.to_line_protocol() for point in points)
+
+
+def serializer_path(data: List[Dict[str, Any]], serializer: LineProtocolSerializer) -> str:
+    serializer.clear()
+    serializer.add_entries(data)
+    return serializer.getvalue()
+
+
+def bench(name: str, fn, values: int, repeat: int) -> float:
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"{name:<12} {best * 1000:9.1f} ms  {best / values * 1e6:7.3f} µs/value")
+    return best
+
+
+def _timed(fn) -> float:
+    start = time.process_time()
+    fn()
+    return time.process_time() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Point-based and direct line-protocol serialization.")
+    parser.add_argument("--stations", type=int, default=250)
+    parser.add_argument("--hours", type=int, default=72)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = make_gios_entries(args.stations, args.hours)
+    serializer = LineProtocolSerializer()
+    print(f"{len(data)} values, {len(serializer_path(data, serializer).splitlines())} merged lines")
+    point_time = bench("Point", lambda: point_path(data), len(data), args.repeat)
+    serializer_time = bench("serializer", lambda: serializer_path(data, serializer), len(data), args.repeat)
+    print(f"speedup: {point_time / serializer_time:.1f}x")
@@ -0,0 +1,63 @@
+# file: benchmarks/bench_spatial.py
+
+import argparse
+import random
+import statistics
+import time
+from typing import List, Dict, Any
+
+from backend.spatial import GridIndex, haversine_km
+
+# Rough bounding box of Poland, where GIOŚ and user stations are
+LAT_RANGE = (49.0, 54.8)
+LON_RANGE = (14.1, 24.1)
+
+
+def make_stations(count: int) -> List[Dict[str, Any]]:
+    rng = random.Random(0)
+    return [{"station_id": str(i), "source": "user", "name": str(i),
+             "lat": rng.uniform(*LAT_RANGE), "lon": rng.uniform(*LON_RANGE)} for i in range(count)]
+
+
+def linear_nearby(stations: List[Dict[str, Any]], lat: float, lon: float, radius_km: float, k: int):
+    """The scan the frontend does today, for comparison."""
+    found = sorted((haversine_km(lat, lon, s["lat"], s["lon"]), s["station_id"]) for s in stations)
+    return [station for station in found if station[0] <= radius_km][:k]
+
+
+def timings(func, points) -> List[float]:
+    result = []
+    for lat, lon in points:
+        started = time.perf_counter()
+        func(lat, lon)
+        result.append((time.perf_counter() - started) * 1000)
+    return result
+
+
+def report(label: str, values: List[float]) -> None:
+    values = sorted(values)
+    print(f"{label:<34} p50 {statistics.median(values):8.3f} ms   p99 {values[int(0.99 * (len(values) - 1))]:8.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure nearby/bbox lookups of the station grid index.")
+    parser.add_argument("--stations", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--radius-km", type=float, default=25)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--cell-deg", type=float, default=0.1)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(args.queries)]
+    for count in args.stations:
+        stations = make_stations(count)
+        index = GridIndex(args.cell_deg)
+        started = time.perf_counter()
+        for station in stations:
+            index.insert(station)
+        print(f"\n{count} stations, index built in {(time.perf_counter() - started) * 1000:.1f} ms")
+        report("grid nearby", timings(lambda lat, lon: index.nearby(lat, lon, args.radius_km, args.k), points))
+        report("grid bbox (0.5° x 0.5°)", timings(lambda lat, lon: index.within(lat, lon, lat + 0.5, lon + 0.5), points))
+        report("linear scan nearby", timings(lambda lat, lon: linear_nearby(stations, lat, lon, args.radius_km, args.k),
+                                             points[:max(1, args.queries // 20)]))
@@ -0,0 +1,70 @@
+# file: benchmarks/bench_spool.py
+
+import argparse
+import tempfile
+import time
+
+from influxdb_client import InfluxDBClient, WritePrecision
+from influxdb_client.client.write_api import SYNCHRONOUS
+
+from backend.spool import Spool
+from benchmarks.fake_influx import FakeInflux, serve_in_thread
+
+
+def make_block(block: int, lines: int) -> str:
+    base = 1_700_000_000_000_000_000 + block * lines * 1_000_000_000
+    return "".join(
+        f"air_quality,source=bench,station_id={i % 100} pm25={i % 50}.5,pm10={i % 80}.25 {base + i * 1_000_000_000}\n"
+        for i in range(lines)
+    )
+
+
+def run(blocks: int, lines: int, rate: float, outage: float, fail_rate: float, port: int) -> None:
+    """Append blocks at a steady rate through a simulated outage and report spool depth and replay throughput."""
+    fake = FakeInflux(fail_rate=fail_rate)
+    serve_in_thread(fake, port)
+    client = InfluxDBClient(url=f"http://127.0.0.1:{port}", token="bench", org="bench")
+    write_api = client.write_api(write_options=SYNCHRONOUS)
+
+    def writer(body: str) -> None:
+        write_api.write(bucket="bench", record=body, write_precision=WritePrecision.NS)
+
+    with tempfile.TemporaryDirectory() as directory:
+        spool = Spool(directory, writer=writer)
+        fake.go_down(outage)
+        start = time.perf_counter()
+        max_depth = 0
+        append_times = []
+        for block in range(blocks):
+            body = make_block(block, lines)
+            t0 = time.perf_counter()
+            spool.append(body, {"block": block})
+            append_times.append(time.perf_counter() - t0)
+            max_depth = max(max_depth, spool.stats()["depth_bytes"])
+            time.sleep(max(0.0, (block + 1) / rate - (time.perf_counter() - start)))
+        appended = time.perf_counter() - start
+        drained = spool.wait_drained(timeout=outage + 120)
+        total = time.perf_counter() - start
+        stats = spool.stats()
+
+    append_times.sort()
+    print(f"appended {blocks * lines} lines in {appended:.1f}s (outage {outage:.0f}s, fail rate {fail_rate:.0%})")
+    print(f"append p50 / p99:      {append_times[len(append_times) // 2] * 1000:.2f} / "
+          f"{append_times[int(len(append_times) * 0.99)] * 1000:.2f} ms")
+    print(f"max spool depth:       {max_depth / 1024:.0f} KiB")
+    print(f"drained:               {drained} after {total:.1f}s ({total - appended:.1f}s after last append)")
+    print(f"lines received:        {fake.lines} of {blocks * lines}")
+    print(f"replay failures:       {stats['failures']}")
+    print(f"replayed segments:     {stats['replayed_segments']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure write-ahead spool behaviour through an InfluxDB outage.")
+    parser.add_argument("--blocks", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=500, help="Lines per appended block")
+    parser.add_argument("--rate", type=float, default=20, help="Blocks appended per second")
+    parser.add_argument("--outage", type=float, default=5, help="Seconds the fake InfluxDB is down at the start")
+    parser.add_argument("--fail-rate", type=float, default=0.05, help="Fraction of writes failing after the outage")
+    parser.add_argument("--port", type=int, default=18086)
+    args = parser.parse_args()
+    run(args.blocks, args.lines, args.rate, args.outage, args.fail_rate, args.port)
@@ -0,0 +1,77 @@
+# file: benchmarks/bench_startup.py
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.fake_influx import FakeInflux, serve_in_thread
+
+
+def wait_for(url: str, deadline: float) -> dict | None:
+    """Poll `url` until it answers 200; None if the deadline passes first."""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                return json.load(response)
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.02)
+    return None
+
+
+def measure(port: int, influx_port: int, gios_url: str, timeout: float) -> tuple[float, float | None]:
+    """Start uvicorn once; return seconds until /ready answers and until the warm-up has finished."""
+    env = {
+        **os.environ,
+        "INFLUXDB_URL": f"http://127.0.0.1:{influx_port}",
+        "INFLUXDB_TOKEN": "bench",
+        "INFLUXDB_ORG": "bench",
+        "INFLUXDB_BUCKET": "bench",
+        "GIOS_URL": gios_url,
+        "GIOS_MAX_RETRIES": "0",
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        env["SPOOL_DIR"] = os.path.join(workdir, "spool")
+        env["PYTHONPATH"] = os.getcwd()
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+            env=env, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            deadline = start + timeout
+            if wait_for(f"http://127.0.0.1:{port}/ready", deadline) is None:
+                raise RuntimeError("API did not start in time")
+            serving = time.perf_counter() - start
+            warm = wait_for(f"http://127.0.0.1:{port}/ready?warm=true", deadline)
+            warmed = time.perf_counter() - start if warm is not None else None
+        finally:
+            server.terminate()
+            server.wait()
+    return serving, warmed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure how quickly the API starts serving requests.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--influx-port", type=int, default=18087)
+    parser.add_argument("--gios-url", default="http://127.0.0.1:9/pjp-api/v1/rest",
+                        help="GIOŚ base URL used by the warm-up crawl (default: unreachable, so it fails fast)")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    serve_in_thread(FakeInflux(), args.influx_port)
+    results = [measure(args.port, args.influx_port, args.gios_url, args.timeout) for _ in range(args.runs)]
+    serving = [s for s, _ in results]
+    warmed = [w for _, w in results if w is not None]
+    print(f"time to first /ready (median of {args.runs}): {statistics.median(serving) * 1000:8.0f} ms")
+    print(f"time to first /ready (max):            {max(serving) * 1000:8.0f} ms")
+    if warmed:
+        print(f"time to warm-up finished (median):     {statistics.median(warmed) * 1000:8.0f} ms")
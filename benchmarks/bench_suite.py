@@ -0,0 +1,301 @@
+# file: benchmarks/bench_suite.py
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Tuple
+
+import aiohttp
+
+from benchmarks import fake_gios, fake_influx
+from benchmarks.bench_startup import wait_for
+
+# Metrics compared by --compare, with the direction that counts as an improvement
+HIGHER_IS_BETTER = {"ingest.points_per_second", "ingest.records_per_second", "crawl.points_per_second"}
+
+
+def get_json(url: str) -> Dict[str, Any]:
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.load(response)
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def git_version() -> str | None:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_api(args: argparse.Namespace, workdir: str) -> subprocess.Popen:
+    """Start uvicorn against both fakes, with all state files in a throw-away working directory."""
+    env = {
+        **os.environ,
+        "INFLUXDB_URL": f"http://127.0.0.1:{args.influx_port}",
+        "INFLUXDB_TOKEN": "bench",
+        "INFLUXDB_ORG": "bench",
+        "INFLUXDB_BUCKET": "bench",
+        "GIOS_URL": f"http://127.0.0.1:{args.gios_port}",
+        "GIOS_RATE_LIMIT": str(args.gios_rate_limit),
+        "GIOS_RATE_BURST": str(int(args.gios_rate_limit)),
+        "GIOS_BACKOFF_BASE": "0.05",
+        "SPOOL_DIR": os.path.join(workdir, "spool"),
+        "PYTHONPATH": os.getcwd(),
+    }
+    if not args.query_cache:
+        env["QUERY_CACHE_MAX_BYTES"] = "0"
+    log = open(os.path.join(workdir, "api.log"), "wb")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env, cwd=workdir, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+def measure_crawl(api: str, gios: fake_gios.FakeGios, timeout: float) -> Dict[str, Any]:
+    """Wait for the warm-up crawl and report its wall time; the job finishes once the spool has drained."""
+    if wait_for(f"{api}/ready?warm=true", time.perf_counter() + timeout) is None:
+        raise RuntimeError("warm-up crawl did not finish in time")
+    run = get_json(f"{api}/scheduler/stats")["gios"]["history"][-1]
+    if run["status"] != "ok":
+        raise RuntimeError(f"warm-up crawl {run['status']}: {run.get('error', '')}")
+    return {
+        "wall_seconds": run["duration"],
+        "points": run["points"],
+        "points_per_second": round(run["points"] / run["duration"]) if run["duration"] else None,
+        "sensors": gios.sensors,
+        "gios_requests": gios.requests,
+        "gios_errors": gios.errors,
+        "failures": run["failures"],
+    }
+
+
+def user_records(count: int, stations: int) -> List[Dict[str, Any]]:
+    """Hourly user readings with three pollutants each, one timestamp per record so no lines merge."""
+    rng = random.Random(1)
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(seconds=count)
+    return [
+        {"station_id": f"bench_user_{i % stations}", "timestamp": (start + timedelta(seconds=i)).isoformat(),
+         "pm25": round(rng.uniform(5, 50), 2), "pm10": round(rng.uniform(10, 100), 2),
+         "no2": round(rng.uniform(1, 40), 2), "lat": 52.0 + (i % stations) * 0.01, "lon": 21.0}
+        for i in range(count)
+    ]
+
+
+async def post_batches(api: str, records: List[Dict[str, Any]], batch_size: int, concurrency: int) -> int:
+    """POST records to /addUserData/batch as NDJSON, honouring 429 Retry-After; returns the throttled count."""
+    throttled = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(session: aiohttp.ClientSession, batch: List[Dict[str, Any]]) -> None:
+        nonlocal throttled
+        body = "\n".join(json.dumps(record) for record in batch)
+        async with semaphore:
+            while True:
+                async with session.post(f"{api}/addUserData/batch", data=body,
+                                        headers={"Content-Type": "application/x-ndjson"}) as response:
+                    if response.status != 429:
+                        response.raise_for_status()
+                        return
+                    throttled += 1
+                    await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(post(session, records[i:i + batch_size]) for i in range(0, len(records), batch_size)))
+    return throttled
+
+
+def measure_ingest(api: str, influx: fake_influx.FakeInflux, args: argparse.Namespace) -> Dict[str, Any]:
+    """Time user records from the first POST until every line has reached the fake InfluxDB."""
+    records = user_records(args.ingest_records, args.user_stations)
+    points = sum(1 for record in records for field in ("pm25", "pm10", "no2") if record.get(field) is not None)
+    lines_before = influx.lines
+    started = time.perf_counter()
+    throttled = asyncio.run(post_batches(api, records, args.ingest_batch, args.concurrency))
+    accepted = time.perf_counter() - started
+    deadline = started + args.timeout
+    # User station locations are written as extra lines, so wait for at least one line per record
+    while influx.lines - lines_before < len(records):
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"only {influx.lines - lines_before} of {len(records)} lines reached InfluxDB")
+        time.sleep(0.01)
+    duration = time.perf_counter() - started
+    return {
+        "records": len(records),
+        "points": points,
+        "accept_seconds": round(accepted, 3),
+        "wall_seconds": round(duration, 3),
+        "records_per_second": round(len(records) / duration),
+        "points_per_second": round(points / duration),
+        "throttled_requests": throttled,
+    }
+
+
+def endpoint_requests(args: argparse.Namespace, stations: List[str]) -> Dict[str, List[Tuple[str, List]]]:
+    """Request mix per endpoint; /air_quality asks for random 1-3 station subsets over the crawled period."""
+    rng = random.Random(2)
+    end = datetime.now().date()
+    start = end - timedelta(days=max(1, args.hours // 24))
+    air_quality = []
+    for _ in range(args.requests):
+        params = [("station_id", station) for station in rng.sample(stations, min(len(stations), rng.randint(1, 3)))]
+        params += [("start_date", start.isoformat()), ("end_date", end.isoformat()), ("aggregation", args.aggregation)]
+        air_quality.append(("/air_quality", params))
+    return {
+        "/air_quality": air_quality,
+        "/stations": [("/stations", [])] * args.requests,
+        "/time_range": [("/time_range", [])] * args.requests,
+        "/user_stations": [("/user_stations", [])] * args.requests,
+    }
+
+
+async def load_endpoint(api: str, requests: List[Tuple[str, List]], concurrency: int) -> Dict[str, Any]:
+    """Replay requests from `concurrency` workers over one pooled session; report latency percentiles."""
+    latencies: List[float] = []
+    errors = 0
+    received = 0
+    pending = iter(requests)
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        nonlocal errors, received
+        for path, params in pending:
+            started = time.perf_counter()
+            try:
+                async with session.get(f"{api}{path}", params=params) as response:
+                    received += len(await response.read())
+                    if response.status != 200:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "mean_response_bytes": round(received / len(latencies)),
+    }
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print current vs baseline for timing and throughput metrics; return the ones that regressed."""
+    current, previous = flatten(results["metrics"]), flatten(baseline["metrics"])
+    regressions = []
+    print(f"\n{'metric':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, value in current.items():
+        higher_is_better = name in HIGHER_IS_BETTER
+        if not (higher_is_better or name.endswith(("_ms", "wall_seconds"))) or not previous.get(name):
+            continue
+        change = value / previous[name] - 1
+        regressed = change < -threshold if higher_is_better else change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<40} {previous[name]:>12} {value:>12} {change:>+7.0%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    gios = fake_gios.FakeGios(args.stations, args.sensors_per_station, args.hours,
+                              args.gios_latency, args.gios_error_rate)
+    influx = fake_influx.FakeInflux(latency=args.influx_latency)
+    fake_gios.serve_in_thread(gios, args.gios_port)
+    fake_influx.serve_in_thread(influx, args.influx_port)
+    api = f"http://127.0.0.1:{args.port}"
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server = start_api(args, workdir)
+        try:
+            metrics = {"crawl": measure_crawl(api, gios, args.timeout)}
+            metrics["ingest"] = measure_ingest(api, influx, args)
+            stations = get_json(f"{api}/stations?source=gios")
+            requests = endpoint_requests(args, stations)
+            metrics["endpoints"] = {
+                path: asyncio.run(load_endpoint(api, mix, args.concurrency)) for path, mix in requests.items()
+            }
+        except (RuntimeError, urllib.error.URLError) as e:
+            with open(os.path.join(workdir, "api.log"), "r", errors="replace") as f:
+                sys.stderr.write(f.read()[-4000:])
+            raise SystemExit(f"Benchmark failed: {e}")
+        finally:
+            server.terminate()
+            server.wait()
+
+    return {
+        "version": git_version(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "metrics": metrics,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Offline end-to-end benchmark: crawl a fake GIOŚ into a fake InfluxDB, then load the API.")
+    parser.add_argument("--stations", type=int, default=100)
+    parser.add_argument("--sensors-per-station", type=int, default=4)
+    parser.add_argument("--hours", type=int, default=72, help="Hourly values per sensor served by the fake GIOŚ")
+    parser.add_argument("--gios-latency", type=float, default=0.005, help="Seconds added to every GIOŚ request")
+    parser.add_argument("--gios-error-rate", type=float, default=0.0, help="Fraction of GIOŚ requests failing with 503")
+    parser.add_argument("--gios-rate-limit", type=float, default=1000,
+                        help="Crawler requests per second (production default is 20)")
+    parser.add_argument("--influx-latency", type=float, default=0.0, help="Seconds added to every InfluxDB call")
+    parser.add_argument("--ingest-records", type=int, default=50_000)
+    parser.add_argument("--ingest-batch", type=int, default=1000, help="Records per /addUserData/batch request")
+    parser.add_argument("--user-stations", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--aggregation", default="1h")
+    parser.add_argument("--query-cache", action=argparse.BooleanOptionalAction, default=False,
+                        help="Keep the /air_quality result cache on (off by default, so queries reach InfluxDB)")
+    parser.add_argument("--port", type=int, default=18100)
+    parser.add_argument("--gios-port", type=int, default=18190)
+    parser.add_argument("--influx-port", type=int, default=18186)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="Earlier results file; exit 1 if a metric regressed")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative change counted as a regression")
+    args = parser.parse_args()
+
+    results = run(args)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results["metrics"], indent=2))
+    print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, "r") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
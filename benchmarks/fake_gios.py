@@ -0,0 +1,127 @@
+# file: benchmarks/fake_gios.py
+
+import argparse
+import asyncio
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import List, Dict, Any
+
+from aiohttp import web
+
+# GIOŚ parameter codes in the order sensors are assigned to a station
+PARAM_CODES = ["PM10", "PM2.5", "NO2", "SO2", "O3", "CO", "C6H6"]
+
+
+class FakeGios:
+    """Offline stand-in for the GIOŚ REST API with a configurable network size, latency and error rate.
+
+    Serves /station/findAll, /station/sensors/{id} and /data/getData/{id} with the payload shapes the
+    crawler parses; every sensor returns `hours` hourly values ending at the current hour.
+    """
+
+    def __init__(self, stations: int = 50, sensors_per_station: int = 4, hours: int = 72,
+                 latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.stations = stations
+        self.sensors_per_station = min(sensors_per_station, len(PARAM_CODES))
+        self.hours = hours
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+
+    @property
+    def sensors(self) -> int:
+        return self.stations * self.sensors_per_station
+
+    def station_ids(self) -> List[int]:
+        return [10000 + i for i in range(self.stations)]
+
+    def _station(self, station_id: int) -> Dict[str, Any]:
+        i = station_id - 10000
+        return {
+            "id": station_id,
+            "stationName": f"Stacja testowa {i}",
+            "gegrLat": f"{49.0 + (i * 0.137) % 5.8:.6f}",
+            "gegrLon": f"{14.2 + (i * 0.291) % 9.8:.6f}",
+            "city": {"id": i, "name": f"Miasto {i % 97}", "commune": {"provinceName": "TESTOWE"}},
+            "addressStreet": None,
+        }
+
+    def _sensors(self, station_id: int) -> List[Dict[str, Any]]:
+        return [
+            {"id": station_id * 10 + n, "stationId": station_id,
+             "param": {"paramName": code, "paramFormula": code, "paramCode": code, "idParam": n}}
+            for n, code in enumerate(PARAM_CODES[:self.sensors_per_station])
+        ]
+
+    def _values(self, sensor_id: int) -> Dict[str, Any]:
+        now = datetime.now().replace(minute=0, second=0, microsecond=0)
+        code = PARAM_CODES[sensor_id % 10]
+        rng = random.Random(sensor_id)
+        return {
+            "key": code,
+            "values": [
+                {"date": (now - timedelta(hours=h)).strftime("%Y-%m-%d %H:%M:%S"),
+                 "value": None if rng.random() < 0.02 else round(rng.gammavariate(2.0, 10.0), 1)}
+                for h in range(self.hours)
+            ],
+        }
+
+    async def _respond(self, payload_factory) -> web.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._random.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({"error": "fake failure"}, status=503)
+        return web.json_response(payload_factory())
+
+    async def find_all(self, request: web.Request) -> web.Response:
+        return await self._respond(lambda: [self._station(station_id) for station_id in self.station_ids()])
+
+    async def station_sensors(self, request: web.Request) -> web.Response:
+        station_id = int(request.match_info["station_id"])
+        if not 10000 <= station_id < 10000 + self.stations:
+            return web.json_response([], status=404)
+        return await self._respond(lambda: self._sensors(station_id))
+
+    async def sensor_data(self, request: web.Request) -> web.Response:
+        return await self._respond(lambda: self._values(int(request.match_info["sensor_id"])))
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/station/findAll", self.find_all)
+        app.router.add_get("/station/sensors/{station_id}", self.station_sensors)
+        app.router.add_get("/data/getData/{sensor_id}", self.sensor_data)
+        return app
+
+
+def serve_in_thread(fake: FakeGios, port: int) -> None:
+    """Run the fake server on its own event loop in a daemon thread."""
+    ready = threading.Event()
+
+    def run() -> None:
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(fake.app())
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="fake-gios", daemon=True).start()
+    ready.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake GIOŚ API for offline crawls.")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--stations", type=int, default=50)
+    parser.add_argument("--sensors-per-station", type=int, default=4)
+    parser.add_argument("--hours", type=int, default=72, help="Hourly values returned per sensor")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+    fake = FakeGios(args.stations, args.sensors_per_station, args.hours, args.latency, args.error_rate)
+    web.run_app(fake.app(), host="127.0.0.1", port=args.port)
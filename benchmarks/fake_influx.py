@@ -0,0 +1,215 @@
+# file: benchmarks/fake_influx.py
+
+import argparse
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Tuple
+
+from aiohttp import web
+
+from backend.rollups import parse_duration
+
+_UNESCAPED_SPACE = re.compile(r"(?<!\\) ")
+_UNESCAPED_COMMA = re.compile(r"(?<!\\),")
+_RANGE = re.compile(r"range\(start: time\(v: (\d+)\), stop: time\(v: (\d+)\)\)")
+_MEASUREMENT = re.compile(r'r\._measurement == "([^"]+)"')
+_STATION = re.compile(r'r\["station_id"\] == "([^"]*)"')
+_SOURCE = re.compile(r'r\["source"\] == "([^"]*)"')
+_EVERY = re.compile(r"aggregateWindow\(every: (\w+)")
+_EMPTY_RESULT = "\r\n"
+
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", r"\1", value)
+
+
+def _field_value(value: str) -> Any:
+    if value.startswith('"'):
+        return _unescape(value[1:-1])
+    if value in ("t", "T", "true", "True"):
+        return True
+    if value in ("f", "F", "false", "False"):
+        return False
+    return int(value[:-1]) if value.endswith("i") else float(value)
+
+
+def parse_line(line: str) -> Tuple[SeriesKey, int, Dict[str, Any]]:
+    """Split one line-protocol line into (measurement, tags), timestamp and fields.
+
+    Good enough for what this backend writes; string field values containing spaces are not supported.
+    """
+    series, field_set, timestamp = _UNESCAPED_SPACE.split(line, 2)
+    measurement, *tags = _UNESCAPED_COMMA.split(series)
+    tag_set = tuple(sorted(tuple(_unescape(part) for part in tag.split("=", 1)) for tag in tags))
+    fields = {}
+    for field in _UNESCAPED_COMMA.split(field_set):
+        key, value = field.split("=", 1)
+        fields[_unescape(key)] = _field_value(value)
+    return (_unescape(measurement), tag_set), int(timestamp), fields
+
+
+def _rfc3339(ns: int) -> str:
+    return datetime.fromtimestamp(ns // 1_000_000_000, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FakeInflux:
+    """Stand-in for InfluxDB that can be taken down or made flaky on purpose.
+
+    Written points are kept in memory. Queries support the shape of the raw /air_quality query (range with
+    `time(v: ns)` bounds, measurement, station_id and source filters, optional aggregateWindow mean, pivot);
+    any other query gets an empty result, so rollup queries only make sense against a real InfluxDB.
+    """
+
+    def __init__(self, fail_rate: float = 0.0, latency: float = 0.0, store: bool = True):
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.store = store
+        self.down_until = 0.0
+        self.writes = 0
+        self.failed_writes = 0
+        self.rejected_writes = 0
+        self.lines = 0
+        self.queries = 0
+        self.series: Dict[SeriesKey, Dict[int, Dict[str, Any]]] = defaultdict(dict)
+
+    def go_down(self, seconds: float) -> None:
+        self.down_until = time.monotonic() + seconds
+
+    @property
+    def down(self) -> bool:
+        return time.monotonic() < self.down_until
+
+    async def write(self, request: web.Request) -> web.Response:
+        body = await request.text()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.down or random.random() < self.fail_rate:
+            self.failed_writes += 1
+            return web.json_response({"code": "unavailable", "message": "fake outage"}, status=503)
+        lines = [line for line in body.splitlines() if line and not line.startswith("#")]
+        try:
+            points = [parse_line(line) for line in lines]
+        except ValueError as e:
+            # Like InfluxDB, reject a body with unparsable lines; retrying it can never succeed
+            self.rejected_writes += 1
+            return web.json_response({"code": "invalid", "message": f"unable to parse: {e}"}, status=400)
+        self.writes += 1
+        self.lines += len(lines)
+        if self.store:
+            for key, timestamp, fields in points:
+                self.series[key].setdefault(timestamp, {}).update(fields)
+        return web.Response(status=204)
+
+    def select(self, query: str) -> List[Tuple[Dict[str, str], List[Tuple[int, Dict[str, Any]]]]] | None:
+        """Evaluate a supported query: one (tags, rows) table per series; None when the query is not supported."""
+        bounds = _RANGE.search(query)
+        measurement = _MEASUREMENT.search(query)
+        if bounds is None or measurement is None or "pivot(" not in query or "to(" in query:
+            return None
+        start, stop = int(bounds.group(1)), int(bounds.group(2))
+        stations = set(_STATION.findall(query))
+        sources = set(_SOURCE.findall(query))
+        every = _EVERY.search(query)
+        every = parse_duration(every.group(1)) if every else None
+
+        tables = []
+        for (name, tag_set), points in list(self.series.items()):
+            tags = dict(tag_set)
+            if name != measurement.group(1) or (stations and tags.get("station_id") not in stations) \
+                    or (sources and tags.get("source") not in sources):
+                continue
+            selected = sorted((ts, fields) for ts, fields in list(points.items()) if start <= ts < stop)
+            if every:
+                windows: Dict[int, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+                for ts, fields in selected:
+                    window = windows[min((ts // every + 1) * every, stop)]
+                    for field, value in fields.items():
+                        window[field].append(value)
+                selected = [(ts, {field: sum(values) / len(values) for field, values in window.items()})
+                            for ts, window in sorted(windows.items())]
+            if selected:
+                tables.append(({"_measurement": name, **tags}, selected))
+        return tables
+
+    def to_csv(self, tables, start: int, stop: int) -> str:
+        """Render tables as annotated CSV, the format influxdb_client parses."""
+        tag_columns = sorted({key for tags, _ in tables for key in tags} - {"_measurement"})
+        fields = sorted({field for _, rows in tables for _, values in rows for field in values})
+        columns = ["result", "table", "_start", "_stop", "_time", "_measurement", *tag_columns, *fields]
+        out = [
+            ",".join(["#group", "false", "false", "true", "true", "false", "true", *["true"] * len(tag_columns),
+                      *["false"] * len(fields)]),
+            ",".join(["#datatype", "string", "long", "dateTime:RFC3339", "dateTime:RFC3339", "dateTime:RFC3339",
+                      "string", *["string"] * len(tag_columns), *["double"] * len(fields)]),
+            ",".join(["#default", "_result", *[""] * (len(columns) - 1)]),
+            ",".join(["", *columns]),
+        ]
+        range_start, range_stop = _rfc3339(start), _rfc3339(stop)
+        for table, (tags, rows) in enumerate(tables):
+            prefix = ",".join(["", "", str(table), range_start, range_stop])
+            tag_values = ",".join([tags["_measurement"], *[tags.get(key, "") for key in tag_columns]])
+            for ts, values in rows:
+                field_values = ",".join("" if values.get(field) is None else repr(float(values[field]))
+                                        for field in fields)
+                out.append(f"{prefix},{_rfc3339(ts)},{tag_values},{field_values}")
+        return "\r\n".join(out) + "\r\n\r\n"
+
+    async def query(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.down:
+            return web.json_response({"code": "unavailable", "message": "fake outage"}, status=503)
+        self.queries += 1
+        query = body.get("query", "")
+        tables = self.select(query)
+        if not tables:
+            return web.Response(text=_EMPTY_RESULT, content_type="text/csv")
+        start, stop = map(int, _RANGE.search(query).groups())
+        return web.Response(text=self.to_csv(tables, start, stop), content_type="text/csv")
+
+    async def ping(self, request: web.Request) -> web.Response:
+        return web.Response(status=503 if self.down else 204)
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/api/v2/write", self.write)
+        app.router.add_post("/api/v2/query", self.query)
+        app.router.add_get("/ping", self.ping)
+        app.router.add_get("/health", self.ping)
+        return app
+
+
+def serve_in_thread(fake: FakeInflux, port: int) -> None:
+    """Run the fake server on its own event loop so synchronous clients can use it from the caller's thread."""
+    ready = threading.Event()
+
+    def run() -> None:
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(fake.app())
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="fake-influx", daemon=True).start()
+    ready.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake InfluxDB write/query endpoint with injected failures.")
+    parser.add_argument("--port", type=int, default=8086)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of writes answered with 503")
+    parser.add_argument("--down-for", type=float, default=0.0, help="Seconds of full outage after startup")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every write")
+    args = parser.parse_args()
+    fake = FakeInflux(args.fail_rate, args.latency)
+    fake.go_down(args.down_for)
+    web.run_app(fake.app(), host="127.0.0.1", port=args.port)
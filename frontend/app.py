@@ -5,26 +5,24 @@ import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-import asyncio
 import pandas as pd
 import streamlit as st
 
 st.set_page_config(page_title="Monitor jakości powietrza", page_icon="🌍", layout="wide")
 pd.options.display.float_format = "{:.2f}".format
 
-from frontend.gios_api import fetch_gios_stations
-from frontend.data_fetch import fetch_air_quality, fetch_influx_stations, fetch_time_range, fetch_user_stations
+# Charts span the wide layout; one point per horizontal pixel is all a line chart can show
+CHART_WIDTH_PX = int(os.getenv("CHART_WIDTH_PX", "1400"))
+CHART_RENDERER = os.getenv("CHART_RENDERER", "webgl")  # "webgl" (one subplot grid) or "svg" (chart per pollutant)
+
+from frontend.data_fetch import fetch_air_quality, load_station_data
 from frontend.utils import format_station_data, get_station_names_and_dict, process_air_quality_data
 from frontend.ui_elements import display_map, display_charts
 
 # Streamlit UI
 st.title("Monitor jakości powietrza")
-# Fetch station data
-gios_stations = fetch_gios_stations()
-influx_station_ids = asyncio.run(fetch_influx_stations())
-user_stations = asyncio.run(fetch_user_stations())
-
-timestamp_range = asyncio.run(fetch_time_range())
+# Fetch station data (cached across reruns, missing pieces fetched concurrently)
+gios_stations, influx_station_ids, user_stations, timestamp_range = load_station_data()
 
 # Format station data
 available_stations = format_station_data(gios_stations, influx_station_ids, user_stations)
@@ -90,19 +88,19 @@ else:
 
 # Fetch data
 if selected_ids :
-    air_quality_data = asyncio.run(fetch_air_quality(selected_ids, start_date, end_date, aggregation_options[selected_aggregation]))
-    if not air_quality_data :
+    df = fetch_air_quality(selected_ids, start_date, end_date, aggregation_options[selected_aggregation],
+                           max_points=CHART_WIDTH_PX)
+    if df.empty :
         st.warning("Brak danych dla wybranej stacji.")
 else :
-    air_quality_data = []
+    df = pd.DataFrame()
 
 # Data visualization
-if air_quality_data :
-    df = pd.DataFrame(air_quality_data)
+if not df.empty :
     df["timestamp"] = pd.to_datetime(df["timestamp"])
     df["station_name"] = df["station_id"].map(lambda x : available_stations[x]["name"])
 
-    display_charts(df)
+    display_charts(df, mode = CHART_RENDERER)
 
 # About the author
 # st.markdown("---")
@@ -1,43 +1,179 @@
 #file: frontend/data_fetch.py
 
 import aiohttp
+import asyncio
+import atexit
+import json
 import logging
+import os
+import threading
+import time
+import pandas as pd
 
-FASTAPI_URL = "http://localhost:8000"
+from frontend.gios_api import fetch_gios_stations
 
-async def fetch_any(url_suffix, error_msg = "Error fetching data", return_none_on_error=False):
-    """Fetch data from FastAPI asynchronously."""
-    url = f"{FASTAPI_URL}/{url_suffix}"
+try:
+    import pyarrow as pa
+except ImportError:  # Without pyarrow the backend is asked for columnar JSON instead
+    pa = None
+
+FASTAPI_URL = os.getenv("FASTAPI_URL", "http://localhost:8000")
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+COLUMNAR_JSON_MEDIA_TYPE = "application/vnd.airquality.columnar+json"
+AIR_QUALITY_ACCEPT = ", ".join(filter(None, [
+    ARROW_MEDIA_TYPE if pa is not None else None,
+    f"{COLUMNAR_JSON_MEDIA_TYPE};q=0.9",
+    "application/json;q=0.5"
+]))
+HTTP_POOL_SIZE = int(os.getenv("FRONTEND_HTTP_POOL_SIZE", "20"))
+
+# Seconds each resource stays cached; Streamlit reruns within that window make no network calls
+CACHE_TTLS = {
+    "catalog": int(os.getenv("FRONTEND_TTL_CATALOG", str(24 * 3600))),
+    "stations": int(os.getenv("FRONTEND_TTL_STATIONS", "300")),
+    "user_stations": int(os.getenv("FRONTEND_TTL_STATIONS", "300")),
+    "time_range": int(os.getenv("FRONTEND_TTL_TIME_RANGE", "300")),
+    "air_quality": int(os.getenv("FRONTEND_TTL_SERIES", "300")),
+}
+
+
+class FetchError(Exception):
+    """Raised when the backend cannot be reached or answers with an error."""
+
+
+class TTLCache:
+    """Process-wide cache shared by all Streamlit sessions, with one expiry time per entry."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                return None
+            return entry[1]
+
+    def put(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cache = TTLCache()
+
+
+class BackgroundLoop:
+    """One event loop on a daemon thread, owning a pooled HTTP session reused by every rerun."""
+
+    def __init__(self):
+        self._loop = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    def run(self, coro):
+        """Run a coroutine on the background loop and wait for its result."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="frontend-http", daemon=True).start()
+                atexit.register(self.close)
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def close(self):
+        if self._session is not None and not self._session.closed:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result(timeout=5)
+
+    async def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=HTTP_POOL_SIZE))
+        return self._session
+
+
+background = BackgroundLoop()
+
+
+async def fetch_json(url_suffix):
+    """GET a JSON resource from FastAPI over the shared session."""
+    session = await background.session()
+    try:
+        async with session.get(f"{FASTAPI_URL}/{url_suffix}") as response:
+            response.raise_for_status()
+            return await response.json()
+    except aiohttp.ClientError as e:
+        raise FetchError(f"{url_suffix}: {e}") from e
+
+def air_quality_frame(content_type, body):
+    """Build a DataFrame from an /air_quality response without going through per-row dicts."""
+    if content_type == ARROW_MEDIA_TYPE:
+        return pa.ipc.open_stream(body).read_pandas()
+    if content_type == COLUMNAR_JSON_MEDIA_TYPE:
+        return pd.DataFrame(json.loads(body)["columns"])
+    return pd.DataFrame(json.loads(body))
+
+async def fetch_air_quality_frame(station_ids=None, start_date=None, end_date=None, aggregation="1h", max_points=None):
+    """Fetch air quality data from FastAPI with aggregation, as a DataFrame, downsampled to max_points per series."""
+    params = [("station_id", station) for station in station_ids or []] + [
+        (name, str(value)) for name, value in
+        (("start_date", start_date), ("end_date", end_date), ("aggregation", aggregation),
+         ("max_points", max_points)) if value
+    ]
+    session = await background.session()
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                response.raise_for_status()
-                return await response.json()
+        async with session.get(f"{FASTAPI_URL}/air_quality", params=params,
+                               headers={"Accept": AIR_QUALITY_ACCEPT}) as response:
+            response.raise_for_status()
+            return air_quality_frame(response.content_type, await response.read())
     except aiohttp.ClientError as e:
-        logging.error(f"{error_msg}: {e}")
-        return None if return_none_on_error else []
+        raise FetchError(f"air_quality: {e}") from e
+
+async def _fetch_catalog():
+    return await fetch_gios_stations(await background.session())
 
-async def fetch_influx_stations():
-    """Fetch unique station IDs from FastAPI asynchronously."""
-    return await fetch_any("stations")
+# Resources the page needs on every rerun: cache key, fetch coroutine, value used when the fetch fails
+STATION_RESOURCES = {
+    "catalog": (_fetch_catalog, {}),
+    "stations": (lambda: fetch_json("stations"), []),
+    "user_stations": (lambda: fetch_json("user_stations"), []),
+    "time_range": (lambda: fetch_json("time_range"), None),
+}
 
-async def fetch_user_stations():
-    """Fetch metadata for user stations from FastAPI asynchronously."""
-    return await fetch_any("user_stations", "Error fetching user stations")
+def load_station_data():
+    """Return (gios_stations, influx_station_ids, user_stations, time_range), fetching only expired entries.
 
-async def fetch_time_range():
-    """Fetch the earliest and latest available timestamp from FastAPI asynchronously."""
-    return await fetch_any("time_range", "Error fetching time range", return_none_on_error=True)
+    Everything missing from the cache is fetched concurrently in one round trip to the background loop.
+    """
+    values = {name: cache.get(name) for name in STATION_RESOURCES}
+    missing = [name for name, value in values.items() if value is None]
 
-async def fetch_air_quality(station_ids=None, start_date=None, end_date=None, aggregation="1h"):
-    """Fetch air quality data asynchronously from FastAPI with aggregation."""
+    async def fetch_missing():
+        return await asyncio.gather(*(STATION_RESOURCES[name][0]() for name in missing), return_exceptions=True)
 
-    station_params = "&".join([f"station_id={station}" for station in station_ids]) if station_ids else ""
-    params = filter(None, [
-        station_params,
-        f"start_date={start_date}" if start_date else None,
-        f"end_date={end_date}" if end_date else None,
-        f"aggregation={aggregation}" if aggregation else None
-    ])
+    if missing:
+        for name, result in zip(missing, background.run(fetch_missing())):
+            if isinstance(result, Exception):
+                logging.error(f"Error fetching {name}: {result}")
+                values[name] = STATION_RESOURCES[name][1]
+            else:
+                values[name] = result
+                if result:  # Empty answers are retried on the next rerun instead of being cached
+                    cache.put(name, result, CACHE_TTLS[name])
+    return values["catalog"], values["stations"], values["user_stations"], values["time_range"]
 
-    return await fetch_any(f"air_quality?{'&'.join(params)}", "Error fetching air quality data")
\ No newline at end of file
+def fetch_air_quality(station_ids=None, start_date=None, end_date=None, aggregation="1h", max_points=None):
+    """Fetch (or reuse a cached copy of) air quality data as a DataFrame."""
+    key = ("air_quality", tuple(sorted(station_ids or [])), str(start_date), str(end_date), aggregation, max_points)
+    df = cache.get(key)
+    if df is None:
+        try:
+            df = background.run(fetch_air_quality_frame(station_ids, start_date, end_date, aggregation, max_points))
+        except FetchError as e:
+            logging.error(f"Error fetching air quality data: {e}")
+            return pd.DataFrame()
+        cache.put(key, df, CACHE_TTLS["air_quality"])
+    return df.copy()  # Callers add columns; the cached frame must stay untouched
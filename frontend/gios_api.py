@@ -1,23 +1,32 @@
 #file: frontend/gios_api.py
 
 import logging
-import requests
+import aiohttp
+from backend.gios_common import read_catalog, create_ssl_context
+
 GIOS_API_URL = "https://api.gios.gov.pl/pjp-api/rest/station/findAll"
 
-def fetch_gios_stations() :
-    """Fetch station list from GIOŚ API."""
-    try:
-        response = requests.get(GIOS_API_URL)
-        response.raise_for_status()
-        stations = response.json()
-        return {
-            str(station["id"]): {
-                "name": station.get("stationName", f"Station {station['id']}"),
-                "lat": float(station.get("gegrLat", 0)),
-                "lon": float(station.get("gegrLon", 0))
-            }
-            for station in stations
+def format_gios_stations(stations) :
+    """Map GIOŚ station records to {station_id: {name, lat, lon}}."""
+    return {
+        str(station["id"]): {
+            "name": station.get("stationName", f"Station {station['id']}"),
+            "lat": float(station.get("gegrLat", 0)),
+            "lon": float(station.get("gegrLon", 0))
         }
-    except requests.RequestException as e:
+        for station in stations
+    }
+
+async def fetch_gios_stations(session) :
+    """Fetch station list from the shared GIOŚ catalog, falling back to the GIOŚ API."""
+    catalog = read_catalog()
+    if catalog and catalog.get("stations") :
+        return format_gios_stations(catalog["stations"])
+    try:
+        async with session.get(GIOS_API_URL, ssl=create_ssl_context()) as response:
+            response.raise_for_status()
+            return format_gios_stations(await response.json())
+    except aiohttp.ClientError as e:
         logging.error(f"Error fetching stations from GIOŚ: {e}")
-        return {}
+        stale = read_catalog(ttl = None)
+        return format_gios_stations(stale["stations"]) if stale else {}
@@ -1,7 +1,11 @@
 #file: frontend/ui_elements.py
 
+import numpy as np
+import pandas as pd
 import streamlit as st
 import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 
 
 def display_map(station_df) :
@@ -33,23 +37,23 @@ def display_map(station_df) :
 
     st.plotly_chart(fig_map)
 
-def display_charts(data_frame) :
-    """Display line charts for air quality data."""
+POLLUTANT_LABELS = {"co" : "Tlenek węgla (CO)", "pm10" : "Pył zawieszony PM10", "o3" : "Ozon (O₃)",
+    "pm25" : "Pył zawieszony PM2.5", "so2" : "Dwutlenek siarki (SO₂)", "no2" : "Dwutlenek azotu (NO₂)",
+    "c6h6" : "Benzen (C₆H₆)"}
 
-    data_frame = data_frame.sort_values(by = "timestamp")
-
-    pollutants = {"co" : "Tlenek węgla (CO)", "pm10" : "Pył zawieszony PM10", "o3" : "Ozon (O₃)",
-        "pm25" : "Pył zawieszony PM2.5", "so2" : "Dwutlenek siarki (SO₂)", "no2" : "Dwutlenek azotu (NO₂)",
-        "c6h6" : "Benzen (C₆H₆)"}
 
-    for pollutant in pollutants :
+def build_svg_figures(data_frame) :
+    """One SVG line chart per pollutant (the original rendering)."""
+    data_frame = data_frame.sort_values(by = "timestamp")
+    figures = []
+    for pollutant in POLLUTANT_LABELS :
         if pollutant in data_frame.columns and data_frame[pollutant].notna().any() :
             fig = px.line(
                 data_frame,
                 x = "timestamp",
                 y = pollutant,
                 color = "station_name",
-                title = pollutants.get(pollutant, pollutant),
+                title = POLLUTANT_LABELS.get(pollutant, pollutant),
                 labels = {
                     "station_name" : "Station",
                     "timestamp" : "Time",
@@ -65,7 +69,57 @@ def display_charts(data_frame) :
                     x=0.5
                 )
             )
+            figures.append(fig)
+    return figures
+
+
+def build_webgl_figure(data_frame, panel_height = 260) :
+    """All pollutants in one figure: a subplot per pollutant with a shared x-axis and WebGL traces.
+
+    The frame is sorted once by station and time; every trace is then a slice of the same column arrays,
+    so no per-pollutant filtering or copying of the frame happens.
+    """
+    pollutants = [p for p in POLLUTANT_LABELS if p in data_frame.columns and data_frame[p].notna().any()]
+    if not pollutants :
+        return None
+    data_frame = data_frame.sort_values(by = ["station_name", "timestamp"], kind = "stable")
+    stations = data_frame["station_name"].to_numpy()
+    # Epoch milliseconds on a date axis: numeric arrays are sent as compact binary instead of ISO strings
+    timestamps = pd.DatetimeIndex(data_frame["timestamp"]).as_unit("ms").asi8.astype(float)
+    # Single precision is plenty for concentrations and halves the y payload
+    values = data_frame[pollutants].to_numpy(dtype = np.float32)
+    bounds = np.flatnonzero(np.r_[True, stations[1:] != stations[:-1], True])
+
+    fig = make_subplots(rows = len(pollutants), cols = 1, shared_xaxes = True, vertical_spacing = 0.03,
+                        subplot_titles = [POLLUTANT_LABELS[p] for p in pollutants])
+    colors = px.colors.qualitative.Plotly
+    traces, rows = [], []
+    in_legend = set()
+    for s, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])) :
+        station = stations[start]
+        for row, pollutant in enumerate(pollutants) :
+            y = values[start:stop, row]
+            if np.isnan(y).all() :
+                continue
+            # Missing values stay gaps, as in the SVG charts; the legend entry goes on the station's first trace
+            traces.append(go.Scattergl(x = timestamps[start:stop], y = y, mode = "lines", name = station,
+                                       legendgroup = station, showlegend = station not in in_legend,
+                                       line = dict(color = colors[s % len(colors)])))
+            in_legend.add(station)
+            rows.append(row + 1)
+    fig.add_traces(traces, rows = rows, cols = [1] * len(rows))
+    fig.update_xaxes(type = "date")
+    fig.update_layout(height = panel_height * len(pollutants), margin = dict(t = 40, b = 40),
+                      legend = dict(orientation = "h", yanchor = "bottom", y = 1.02, xanchor = "center", x = 0.5))
+    return fig
+
+
+def display_charts(data_frame, mode = "webgl") :
+    """Display line charts for air quality data, as one WebGL subplot grid or as separate SVG charts."""
+    if mode == "svg" :
+        for fig in build_svg_figures(data_frame) :
             st.plotly_chart(fig)
-        else :
-            continue
-            st.info(f"Brak danych dla: {pollutants.get(pollutant, pollutant)}.")
+        return
+    fig = build_webgl_figure(data_frame)
+    if fig is not None :
+        st.plotly_chart(fig, use_container_width = True)
@@ -0,0 +1,20 @@
+# file: tests/conftest.py
+
+import os
+import tempfile
+
+# Point InfluxDB at nothing and every state file at a scratch directory before backend modules are imported
+_STATE_DIR = tempfile.mkdtemp(prefix="air_quality_tests_")
+os.environ.update({
+    "INFLUXDB_URL": "http://127.0.0.1:9",
+    "INFLUXDB_TOKEN": "test",
+    "INFLUXDB_ORG": "test",
+    "INFLUXDB_BUCKET": "test",
+    "SPOOL_DIR": os.path.join(_STATE_DIR, "spool"),
+    "ROLLUP_STATE_FILE": os.path.join(_STATE_DIR, "rollup_state.json"),
+    "METADATA_FILE": os.path.join(_STATE_DIR, "metadata_index.json"),
+    "GIOS_WATERMARK_FILE": os.path.join(_STATE_DIR, "gios_watermarks.json"),
+    "GIOS_CATALOG_FILE": os.path.join(_STATE_DIR, "gios_catalog.json"),
+    "EXPORT_DIR": os.path.join(_STATE_DIR, "export"),
+    "PARQUET_DIR": os.path.join(_STATE_DIR, "parquet"),
+})
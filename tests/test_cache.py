@@ -0,0 +1,119 @@
+# file: tests/test_cache.py
+
+import time
+
+import pytest
+
+from backend import cache
+from backend.cache import QueryCache, estimate_size
+
+_NS = 1_000_000_000
+DAY_NS = 86400 * _NS
+
+
+class FakeClock:
+    """Stands in for the `time` module inside backend.cache."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.wall_ns = time.time_ns()
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time_ns(self) -> int:
+        return self.wall_ns
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache, "time", fake)
+    return fake
+
+
+def rows(n: int, station_id: str = "1"):
+    return [{"timestamp": f"2024-01-01T{i % 24:02d}:00:00+00:00", "station_id": station_id, "pm25": float(i)}
+            for i in range(n)]
+
+
+def test_a_write_drops_only_overlapping_entries(clock):
+    query_cache = QueryCache()
+    generation = query_cache.generation
+    query_cache.put("a", rows(3), ["1"], 0, 10 * DAY_NS, generation)
+    query_cache.put("b", rows(3), ["2"], 0, 10 * DAY_NS, generation)
+    query_cache.put("c", rows(3), ["1"], 20 * DAY_NS, 30 * DAY_NS, generation)
+    query_cache.put("all", rows(3), None, 0, 10 * DAY_NS, generation)
+
+    assert query_cache.invalidate(["1"], 5 * DAY_NS, 6 * DAY_NS) == 2
+    assert query_cache.get("a") is None and query_cache.get("all") is None
+    # Other station, and same station outside the written window, stay cached
+    assert query_cache.get("b") is not None and query_cache.get("c") is not None
+    assert query_cache.stats()["invalidations"] == 2
+
+
+def test_window_edges_count_as_overlap(clock):
+    query_cache = QueryCache()
+    query_cache.put("a", rows(3), ["1"], 0, 10 * DAY_NS, query_cache.generation)
+    assert query_cache.invalidate(["1"], 10 * DAY_NS, 11 * DAY_NS) == 1
+
+
+def test_a_result_read_before_a_write_is_not_stored(clock):
+    query_cache = QueryCache()
+    generation = query_cache.generation
+    # The query ran, then data was written before its result reached the cache
+    query_cache.invalidate(["9"], 0, DAY_NS)
+    query_cache.put("a", rows(3), ["1"], 0, 10 * DAY_NS, generation)
+    assert query_cache.get("a") is None
+
+    query_cache.put("a", rows(3), ["1"], 0, 10 * DAY_NS, query_cache.generation)
+    assert query_cache.get("a") is not None
+    query_cache.clear()
+    assert query_cache.get("a") is None
+    assert query_cache.stats()["bytes"] == 0
+
+
+def test_recent_and_historical_ttl(clock):
+    query_cache = QueryCache()
+    recent_stop = clock.wall_ns - DAY_NS
+    historical_stop = clock.wall_ns - cache.QUERY_CACHE_SETTLE_NS - DAY_NS
+    query_cache.put("recent", rows(3), ["1"], recent_stop - DAY_NS, recent_stop, query_cache.generation)
+    query_cache.put("old", rows(3), ["1"], historical_stop - DAY_NS, historical_stop, query_cache.generation)
+
+    clock.now += cache.QUERY_CACHE_RECENT_TTL + 1
+    assert query_cache.get("recent") is None
+    assert query_cache.get("old") is not None
+
+    clock.now += cache.QUERY_CACHE_HISTORICAL_TTL
+    assert query_cache.get("old") is None
+    assert query_cache.stats()["entries"] == 0
+
+
+def test_byte_limit_evicts_least_recently_used(clock):
+    size = estimate_size(rows(50))
+    query_cache = QueryCache(max_bytes=3 * size)
+    for key in ["a", "b", "c"]:
+        query_cache.put(key, rows(50), ["1"], 0, DAY_NS, query_cache.generation)
+    assert query_cache.get("a") is not None  # "b" is now the least recently used
+
+    query_cache.put("d", rows(50), ["1"], 0, DAY_NS, query_cache.generation)
+    assert query_cache.get("b") is None
+    assert all(query_cache.get(key) is not None for key in ["a", "c", "d"])
+    stats = query_cache.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] == 3 * size <= stats["max_bytes"]
+
+
+def test_results_larger_than_the_cache_are_not_stored(clock):
+    query_cache = QueryCache(max_bytes=estimate_size(rows(10)))
+    query_cache.put("small", rows(5), ["1"], 0, DAY_NS, query_cache.generation)
+    query_cache.put("huge", rows(500), ["1"], 0, DAY_NS, query_cache.generation)
+    assert query_cache.get("huge") is None
+    assert query_cache.get("small") is not None
+
+
+def test_replacing_a_key_keeps_the_byte_count(clock):
+    query_cache = QueryCache()
+    query_cache.put("a", rows(10), ["1"], 0, DAY_NS, query_cache.generation)
+    query_cache.put("a", rows(20), ["1"], 0, DAY_NS, query_cache.generation)
+    assert query_cache.stats()["bytes"] == estimate_size(rows(20))
+    assert len(query_cache.get("a")) == 20
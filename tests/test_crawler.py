@@ -0,0 +1,48 @@
+# file: tests/test_crawler.py
+
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from backend import crawler as crawler_module
+from backend.crawler import Crawler, CrawlError
+
+
+async def fetch(bodies, path="/data/getData/1", max_retries=2):
+    """Serve `bodies` one per request with status 200 and fetch path through a Crawler."""
+    served = list(bodies)
+
+    async def handler(request):
+        return web.Response(text=served.pop(0) if len(served) > 1 else served[0], content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        async with aiohttp.ClientSession() as session:
+            crawler = Crawler(session, rate=1000, burst=1000, max_retries=max_retries, base_url=f"http://127.0.0.1:{port}")
+            return await crawler.get_json(path), crawler.report
+    finally:
+        await runner.cleanup()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(crawler_module, "GIOS_BACKOFF_BASE", 0.001)
+
+
+def test_truncated_body_is_retried():
+    data, report = asyncio.run(fetch(['{"key": "PM10", "values": [{"da', '{"key": "PM10", "values": []}']))
+    assert data == {"key": "PM10", "values": []}
+    assert report.retries == 1
+
+
+def test_persistently_malformed_body_raises_crawl_error():
+    with pytest.raises(CrawlError):
+        asyncio.run(fetch(['{"key": "PM10", "values": [']))
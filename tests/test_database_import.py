@@ -0,0 +1,14 @@
+# file: tests/test_database_import.py
+
+import os
+import subprocess
+import sys
+
+
+def test_importing_the_api_touches_no_files(tmp_path):
+    """Clients, spool, rollup state and metadata index are all created on first use, not at import."""
+    env = {key: value for key, value in os.environ.items()
+           if key not in ("SPOOL_DIR", "ROLLUP_STATE_FILE", "METADATA_FILE")}
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", "import backend.database, backend.main"], cwd=tmp_path, env=env, check=True)
+    assert os.listdir(tmp_path) == []
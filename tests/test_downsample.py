@@ -0,0 +1,142 @@
+# file: tests/test_downsample.py
+
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from backend.downsample import DOWNSAMPLE_METHODS, downsample_rows, lttb_indices, minmax_indices
+from backend.models import POLLUTANT_FIELDS
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_rows(seed: int, stations, count: int, fields=POLLUTANT_FIELDS, missing: float = 0.0):
+    """Rows of several series interleaved by time, as a query returns them; `missing` of the values are None."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        for station_id, source in stations:
+            row = {"timestamp": (START + timedelta(minutes=10 * i)).isoformat(), "station_id": station_id, "source": source}
+            for field in fields:
+                row[field] = None if rng.random() < missing else round(50 + 30 * math.sin(i / 40) + rng.gauss(0, 5), 2)
+            rows.append(row)
+    return rows
+
+
+def series_of(rows):
+    series = {}
+    for row in rows:
+        series.setdefault((row["station_id"], row["source"]), []).append(row)
+    return series
+
+
+@pytest.mark.parametrize("select", [lttb_indices, minmax_indices])
+def test_selectors_keep_end_points_and_the_budget(select):
+    rng = np.random.default_rng(1)
+    x = np.arange(1000, dtype=np.float64)
+    y = rng.normal(size=1000).cumsum()
+    picked = select(x, y, 100)
+    assert picked[0] == 0 and picked[-1] == 999
+    assert len(picked) <= 100
+    assert np.all(np.diff(picked) > 0)
+
+
+def test_lttb_uses_the_whole_budget_and_keeps_spikes():
+    x = np.arange(500, dtype=np.float64)
+    y = np.zeros(500)
+    y[123], y[321] = 100.0, -100.0
+    picked = lttb_indices(x, y, 50)
+    assert len(picked) == 50
+    assert {123, 321} <= set(picked.tolist())
+
+
+def test_minmax_keeps_the_extremes_of_every_bucket():
+    rng = np.random.default_rng(2)
+    x = np.arange(1000, dtype=np.float64)
+    y = rng.normal(size=1000)
+    picked = set(minmax_indices(x, y, 20).tolist())
+    assert int(np.argmax(y)) in picked and int(np.argmin(y)) in picked
+
+
+@pytest.mark.parametrize("select", [lttb_indices, minmax_indices])
+def test_selectors_return_everything_when_under_budget(select):
+    x = np.arange(10, dtype=np.float64)
+    assert select(x, x, 10).tolist() == list(range(10))
+    assert select(x, x, 50).tolist() == list(range(10))
+
+
+@pytest.mark.parametrize("method", DOWNSAMPLE_METHODS)
+def test_short_results_pass_through(method):
+    rows = make_rows(0, [("1", "gios"), ("2", "gios")], 50)
+    assert downsample_rows(rows, 100, method) is rows
+    assert downsample_rows([], 4, method) == []
+
+
+@pytest.mark.parametrize("method", DOWNSAMPLE_METHODS)
+def test_short_series_are_kept_whole_next_to_long_ones(method):
+    rows = make_rows(3, [("1", "gios")], 1000) + make_rows(4, [("u1", "user")], 30)
+    result = series_of(downsample_rows(rows, 100, method))
+    assert len(result[("u1", "user")]) == 30
+    assert len(result[("1", "gios")]) < 1000
+
+
+@pytest.mark.parametrize("method", DOWNSAMPLE_METHODS)
+def test_each_series_keeps_its_end_points_in_time_order(method):
+    stations = [("1", "gios"), ("2", "gios"), ("u1", "user")]
+    rows = make_rows(5, stations, 2000, missing=0.2)
+    result = downsample_rows(rows, 80, method)
+
+    # Output is a subsequence of the input, so rows stay sorted by time
+    positions = {id(row): i for i, row in enumerate(rows)}
+    assert all(positions[id(a)] < positions[id(b)] for a, b in zip(result, result[1:]))
+    timestamps = [row["timestamp"] for row in result]
+    assert timestamps == sorted(timestamps)
+
+    kept = series_of(result)
+    for key, series in series_of(rows).items():
+        kept_ids = {id(row) for row in kept[key]}
+        for field in POLLUTANT_FIELDS:
+            present = [row for row in series if row[field] is not None]
+            assert id(present[0]) in kept_ids and id(present[-1]) in kept_ids
+
+
+@pytest.mark.parametrize("method", DOWNSAMPLE_METHODS)
+def test_budget_holds_per_station_and_pollutant(method):
+    # One pollutant per row: every series/pollutant gets its own budget of max_points rows
+    stations = [("1", "gios"), ("2", "gios")]
+    rows = []
+    for offset, field in enumerate(["pm25", "no2"]):
+        for row in make_rows(6 + offset, stations, 1500, fields=[field]):
+            rows.append(row)
+    rows.sort(key=lambda row: row["timestamp"])
+    result = downsample_rows(rows, 60, method)
+
+    for key, series in series_of(result).items():
+        for field in ["pm25", "no2"]:
+            picked = [row for row in series if row.get(field) is not None]
+            assert 2 <= len(picked) <= 60, (key, field)
+
+
+@pytest.mark.parametrize("method", DOWNSAMPLE_METHODS)
+def test_missing_values_are_never_picked(method):
+    rows = make_rows(8, [("1", "gios")], 1000, fields=["pm25", "pm10"])
+    for i, row in enumerate(rows):
+        if i % 3:
+            row["pm25"] = None
+        if i % 5 == 0:
+            row["pm10"] = float("nan")
+        if i % 7 == 0:
+            row["pm25"] = row["pm10"] = None
+    result = downsample_rows(rows, 50, method)
+
+    def present(row, field):
+        return row[field] is not None and not math.isnan(row[field])
+
+    # Every kept row was picked for a pollutant it has a value for
+    assert result and all(present(row, "pm25") or present(row, "pm10") for row in result)
+    assert len(result) <= 100
+    pm25 = [row for row in rows if present(row, "pm25")]
+    assert pm25[0] in result and pm25[-1] in result
@@ -0,0 +1,44 @@
+# file: tests/test_import.py
+
+import pytest
+
+from backend import database, export, importer
+
+
+@pytest.fixture
+def calls(monkeypatch, tmp_path):
+    """Record deletes and imports instead of sending them to InfluxDB."""
+    recorded = []
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(export, "EXPORT_DIR", str(tmp_path / "export"))
+    monkeypatch.setattr(database, "clear_database", lambda measurement="air_quality": recorded.append(("clear", measurement)))
+    monkeypatch.setattr(database, "rebuild_metadata_index", lambda: None)
+    monkeypatch.setattr(importer, "import_line_protocol",
+                        lambda path, **kwargs: recorded.append(("import", path)) or {"points": 0, "points_per_second": 0})
+    return recorded
+
+
+def test_missing_input_does_not_clear_the_database(calls, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        database.import_from_file(True)
+    with pytest.raises(FileNotFoundError):
+        database.import_from_file(True, path=str(tmp_path / "nothing.lp"))
+    (tmp_path / "export").mkdir()
+    with pytest.raises(FileNotFoundError):
+        database.import_from_file(True)
+    assert calls == []
+
+
+def test_legacy_single_file_is_imported(calls, tmp_path):
+    (tmp_path / export.LEGACY_EXPORT_FILE).write_text("air_quality,station_id=1 pm25=1 1700000000000000000\n")
+    database.import_from_file(True)
+    assert calls[-1] == ("import", export.LEGACY_EXPORT_FILE)
+    assert ("clear", "air_quality") in calls
+
+
+def test_export_directory_is_preferred(calls, tmp_path):
+    (tmp_path / export.LEGACY_EXPORT_FILE).write_text("air_quality,station_id=1 pm25=1 1700000000000000000\n")
+    (tmp_path / "export").mkdir()
+    (tmp_path / "export" / "air_quality-0.lp").write_text("air_quality,station_id=1 pm25=1 1700000000000000000\n")
+    database.import_from_file(False)
+    assert calls == [("import", str(tmp_path / "export"))]
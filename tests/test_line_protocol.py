@@ -0,0 +1,155 @@
+# file: tests/test_line_protocol.py
+
+import math
+from collections import defaultdict
+
+import pytest
+from influxdb_client import Point, WritePrecision
+
+from backend.line_protocol import LineProtocolSerializer, escape_tag, format_field_value, timestamp_ns
+from backend.models import POLLUTANT_FIELDS
+
+
+def split_unescaped(text: str, separator: str):
+    """Split on `separator` outside backslash escapes and double-quoted strings."""
+    parts, current, quoted, i = [], [], False, 0
+    while i < len(text):
+        char = text[i]
+        if char == "\\" and i + 1 < len(text):
+            current.append(text[i:i + 2])
+            i += 2
+            continue
+        if char == '"':
+            quoted = not quoted
+        if char == separator and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    parts.append("".join(current))
+    return parts
+
+
+def unescape(text: str) -> str:
+    out, i = [], 0
+    while i < len(text):
+        if text[i] == "\\" and i + 1 < len(text):
+            i += 1
+        out.append(text[i])
+        i += 1
+    return "".join(out)
+
+
+def parse_value(raw: str):
+    if raw.endswith("i"):
+        return int(raw[:-1])
+    if raw in ("true", "false"):
+        return raw == "true"
+    if raw.startswith('"'):
+        return unescape(raw[1:-1])
+    return float(raw)
+
+
+def parse(line: str):
+    """Decode a line into (measurement, tags, fields, timestamp) so the two serializers can be compared
+    regardless of tag/field order or how an integral float is spelled (1.0 vs 1)."""
+    series, field_set, timestamp = split_unescaped(line, " ")
+    measurement, *tags = split_unescaped(series, ",")
+    tags = dict(tuple(unescape(part) for part in split_unescaped(tag, "=")) for tag in tags)
+    fields = {}
+    for field in split_unescaped(field_set, ","):
+        key, raw = split_unescaped(field, "=")
+        fields[unescape(key)] = parse_value(raw)
+    return unescape(measurement), tags, fields, int(timestamp)
+
+
+def reference_line(measurement, tags, fields, timestamp):
+    point = Point(measurement)
+    for key, value in tags.items():
+        point.tag(key, value)
+    for key, value in fields.items():
+        point.field(key, value)
+    return point.time(timestamp, WritePrecision.NS).to_line_protocol()
+
+
+def serialize_point(tags, fields, timestamp, measurement="air_quality"):
+    serializer = LineProtocolSerializer()
+    serializer.add_point(tags, fields, timestamp, measurement=measurement)
+    return serializer.getvalue()
+
+
+@pytest.mark.parametrize("measurement,tags,fields", [
+    ("air_quality", {"station_id": "114", "source": "gios"}, {"pm25": 12.5, "pm10": 30.25}),
+    ("user stations", {"station_id": "dom, ogród=1"}, {"lat": 52.2297, "lon": 21.0122}),
+    ("m,1", {"a b": "c,d=e", "z": "Łódź"}, {"count": 3, "ok": True, "bad": False, "x": 0.1 + 0.2}),
+    ("notes", {"station_id": "1"}, {"text": 'he said "hi" \\ bye', "space key": 1.0}),
+])
+def test_points_match_the_client_library(measurement, tags, fields):
+    ours = serialize_point(tags, fields, 1_700_000_000_123_456_789, measurement)
+    reference = reference_line(measurement, tags, fields, 1_700_000_000_123_456_789)
+    assert ours.endswith("\n") and ours.count("\n") == 1
+    assert parse(ours.rstrip("\n")) == parse(reference)
+
+
+def test_empty_tags_and_unstorable_fields_are_left_out():
+    tags = {"station_id": "1", "source": "", "note": None}
+    fields = {"pm25": 5.5, "missing": None, "nan": float("nan"), "inf": float("inf"), "obj": object()}
+    ours = serialize_point(tags, fields, 10)
+    assert parse(ours.rstrip("\n")) == ("air_quality", {"station_id": "1"}, {"pm25": 5.5}, 10)
+    reference = reference_line("air_quality", {"station_id": "1", "source": "", "note": None},
+                               {"pm25": 5.5, "missing": None}, 10)
+    assert parse(ours.rstrip("\n")) == parse(reference)
+    # Nothing storable, no line at all
+    assert serialize_point({"station_id": "1"}, {"pm25": None, "nan": float("nan")}, 10) == ""
+
+
+def test_entries_merge_fields_per_station_source_and_timestamp():
+    data = [
+        {"station_id": "1", "timestamp": "2024-01-01 10:00:00", "pm25": 10.5},
+        {"station_id": "1", "timestamp": "2024-01-01 10:00:00", "no2": 20, "pm10": None},
+        {"station_id": "1", "timestamp": "2024-01-01 11:00:00", "pm25": 11.0},
+        {"station_id": "1", "source": "user", "timestamp": "2024-01-01 10:00:00", "pm25": 99.0},
+        {"station_id": "user, 2", "source": "user", "timestamp": "2024-01-01 10:00:00", "o3": 1.25},
+        {"station_id": "3", "timestamp": "2024-01-01 10:00:00", "pm25": None, "co": float("nan")},
+    ]
+    serializer = LineProtocolSerializer()
+    serializer.add_entries(data)
+    ours = [parse(line) for line in serializer.getvalue().splitlines()]
+
+    merged = defaultdict(dict)
+    for entry in data:
+        key = (entry["station_id"], entry.get("source") or "gios", timestamp_ns(entry["timestamp"]))
+        for field in POLLUTANT_FIELDS:
+            value = entry.get(field)
+            if value is not None and math.isfinite(value):
+                merged[key][field] = float(value)
+    reference = [parse(reference_line("air_quality", {"station_id": station_id, "source": source}, fields, ts))
+                 for (station_id, source, ts), fields in merged.items() if fields]
+
+    assert ours == reference
+    assert len(serializer) == 4
+    # One line per (station, source, timestamp), holding every field written for it
+    assert ours[0][2] == {"pm25": 10.5, "no2": 20.0}
+
+
+def test_serializer_is_reused_after_clear():
+    serializer = LineProtocolSerializer()
+    serializer.add_point({"station_id": "1"}, {"pm25": 1.5}, 1)
+    serializer.clear()
+    assert serializer.getvalue() == "" and len(serializer) == 0
+    serializer.add_point({"station_id": "2"}, {"pm25": 2.5}, 2)
+    assert serializer.getvalue() == "air_quality,station_id=2 pm25=2.5 2\n"
+
+
+def test_tag_values_cannot_carry_newlines():
+    with pytest.raises(ValueError):
+        escape_tag("a\nb")
+
+
+def test_field_values_keep_their_type():
+    assert format_field_value(True) == "true"
+    assert format_field_value(3) == "3i"
+    assert format_field_value(2.0) == "2.0"
+    assert format_field_value('a"b') == '"a\\"b"'
+    assert format_field_value(float("-inf")) is None
@@ -0,0 +1,154 @@
+# file: tests/test_metadata.py
+
+import json
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from backend import database
+from backend.line_protocol import datetime_to_ns
+from backend.metadata import MetadataIndex, ns_to_datetime
+
+_NS = 1_000_000_000
+DAY_NS = 86400 * _NS
+BASE_NS = datetime_to_ns(datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+
+class FakeRecord:
+    def __init__(self, time_ns: int, **values):
+        self.values = values
+        self._time = ns_to_datetime(time_ns)
+
+    def get_time(self) -> datetime:
+        return self._time
+
+
+class FakeTable:
+    def __init__(self, records):
+        self.records = records
+
+
+def test_observe_widens_ranges_and_keeps_the_latest_timestamps(tmp_path):
+    index = MetadataIndex(str(tmp_path / "metadata.json"))
+    index.observe("gios", BASE_NS + 5 * DAY_NS, BASE_NS + 6 * DAY_NS, {"1": BASE_NS + 6 * DAY_NS})
+    index.observe("gios", BASE_NS, BASE_NS + DAY_NS, {"1": BASE_NS + DAY_NS, "2": BASE_NS + DAY_NS})
+    index.observe("user", BASE_NS + 2 * DAY_NS, BASE_NS + 9 * DAY_NS, {"u1": BASE_NS + 9 * DAY_NS})
+
+    assert index.time_ranges["gios"] == [BASE_NS, BASE_NS + 6 * DAY_NS]
+    # A late, older write does not move a station's last-seen time back
+    assert index.last_seen["gios"] == {"1": BASE_NS + 6 * DAY_NS, "2": BASE_NS + DAY_NS}
+    assert index.time_range("gios") == (str(ns_to_datetime(BASE_NS)), str(ns_to_datetime(BASE_NS + 6 * DAY_NS)))
+    assert index.time_range() == (str(ns_to_datetime(BASE_NS)), str(ns_to_datetime(BASE_NS + 9 * DAY_NS)))
+    assert index.time_range("unknown") is None
+    assert MetadataIndex(str(tmp_path / "empty.json")).time_range() is None
+
+
+def test_active_stations_and_locations(tmp_path):
+    index = MetadataIndex(str(tmp_path / "metadata.json"))
+    now = time.time_ns()
+    index.observe("gios", now - 100 * 3600 * _NS, now, {"1": now, "2": now - 100 * 3600 * _NS})
+    index.observe("user", now, now, {"u1": now})
+    assert index.active_stations() == ["1", "u1"]
+    assert index.active_stations("gios", hours=200) == ["1", "2"]
+
+    assert index.observe_location("u1", 52.2, 21.0, now)
+    assert not index.observe_location("u1", 52.2, 21.0, now + 1)
+    assert index.observe_location("u1", 52.3, 21.0, now + 2)
+    assert index.user_location("u1") == (52.3, 21.0)
+    assert index.user_location("u2") is None
+    assert index.user_stations() == [{"station_id": "u1", "lat": 52.3, "lon": 21.0}]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "metadata.json")
+    index = MetadataIndex(path)
+    assert not index.loaded
+    index.observe("gios", BASE_NS, BASE_NS + DAY_NS, {"1": BASE_NS + DAY_NS})
+    index.observe_location("u1", 50.06, 19.94, BASE_NS)
+    index.save()
+
+    reloaded = MetadataIndex(path)
+    assert reloaded.loaded
+    assert reloaded.time_ranges == index.time_ranges
+    assert reloaded.last_seen == index.last_seen
+    assert reloaded.user_locations == index.user_locations
+    assert reloaded.stats() == {"loaded": True, "sources": ["gios"], "stations": 1, "user_stations": 1}
+
+
+def test_save_without_force_waits_for_changes(tmp_path):
+    path = tmp_path / "metadata.json"
+    index = MetadataIndex(str(path))
+    index.save(force=False)
+    assert not path.exists()
+    index.observe("gios", BASE_NS, BASE_NS, {"1": BASE_NS})
+    index.save(force=False)
+    assert json.loads(path.read_text())["last_seen"] == {"gios": {"1": BASE_NS}}
+    # Saved just now, so the next change waits for the save interval
+    index.observe("gios", BASE_NS, BASE_NS + 1, {"2": BASE_NS + 1})
+    index.save(force=False)
+    assert "2" not in json.loads(path.read_text())["last_seen"]["gios"]
+
+
+def test_corrupt_file_starts_empty(tmp_path):
+    path = tmp_path / "metadata.json"
+    path.write_text("{not json")
+    index = MetadataIndex(str(path))
+    assert not index.loaded and index.time_ranges == {}
+
+
+def test_replace_drops_what_the_database_no_longer_has(tmp_path):
+    index = MetadataIndex(str(tmp_path / "metadata.json"))
+    index.observe("gios", BASE_NS, BASE_NS + 9 * DAY_NS, {"1": BASE_NS + 9 * DAY_NS, "2": BASE_NS})
+    index.observe_location("u1", 52.2, 21.0, BASE_NS)
+
+    index.replace({"gios": [BASE_NS, BASE_NS + DAY_NS]}, {"gios": {"1": BASE_NS + DAY_NS}}, {})
+    assert index.time_ranges == {"gios": [BASE_NS, BASE_NS + DAY_NS]}
+    assert index.last_seen == {"gios": {"1": BASE_NS + DAY_NS}}
+    assert index.user_locations == {}
+    assert MetadataIndex(index.path).last_seen == index.last_seen
+
+
+def test_rebuild_keeps_ingest_that_arrives_while_scanning(tmp_path, monkeypatch):
+    index = MetadataIndex(str(tmp_path / "metadata.json"))
+    located = []
+    monkeypatch.setattr(database, "get_metadata_index", lambda: index)
+    monkeypatch.setattr(database.station_locator, "update_user_stations", located.append)
+
+    def query_sync(query, name):
+        if name == "metadata_last_seen":
+            # Ingest writes after InfluxDB has been scanned for last-seen times
+            index.observe("gios", BASE_NS + 10 * DAY_NS, BASE_NS + 11 * DAY_NS, {"1": BASE_NS + 11 * DAY_NS})
+            index.observe_location("u2", 54.35, 18.65, BASE_NS + 11 * DAY_NS)
+            return [FakeTable([FakeRecord(BASE_NS + 5 * DAY_NS, source="gios", station_id="1"),
+                               FakeRecord(BASE_NS + 3 * DAY_NS, source="gios", station_id="2")])]
+        if name == "metadata_first_seen":
+            return [FakeTable([FakeRecord(BASE_NS, source="gios")])]
+        return [FakeTable([FakeRecord(BASE_NS, station_id="u1", lat=52.2, lon=21.0)])]
+
+    monkeypatch.setattr(database, "query_sync", query_sync)
+    database.rebuild_metadata_index()
+
+    assert index.time_ranges == {"gios": [BASE_NS, BASE_NS + 11 * DAY_NS]}
+    assert index.last_seen == {"gios": {"1": BASE_NS + 11 * DAY_NS, "2": BASE_NS + 3 * DAY_NS}}
+    assert set(index.user_locations) == {"u1", "u2"}
+    assert set(located[0]) == {"u1", "u2"}
+
+    # Once the rebuild is over, ingest is no longer recorded
+    index.observe("gios", BASE_NS, BASE_NS, {"3": BASE_NS})
+    assert index._journal is None
+
+
+def test_failed_rebuild_leaves_the_index_alone(tmp_path, monkeypatch):
+    index = MetadataIndex(str(tmp_path / "metadata.json"))
+    index.observe("gios", BASE_NS, BASE_NS + DAY_NS, {"1": BASE_NS + DAY_NS})
+    monkeypatch.setattr(database, "get_metadata_index", lambda: index)
+
+    def query_sync(query, name):
+        raise ConnectionError("InfluxDB is down")
+
+    monkeypatch.setattr(database, "query_sync", query_sync)
+    with pytest.raises(ConnectionError):
+        database.rebuild_metadata_index()
+    assert index.last_seen == {"gios": {"1": BASE_NS + DAY_NS}}
+    assert index._journal is None
@@ -0,0 +1,86 @@
+# file: tests/test_parquet.py
+
+import os
+import re
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from backend import db_export
+from backend.line_protocol import datetime_to_ns
+
+_RANGE = re.compile(r"range\(start: time\(v: (\d+)\), stop: time\(v: (\d+)\)\)")
+
+
+class Record:
+    def __init__(self, values):
+        self.values = values
+
+
+class FakeQueryApi:
+    """Streams pivoted rows inside the query's range, optionally failing after `fail_after` rows."""
+
+    def __init__(self, rows, fail_after=None):
+        self.rows = rows
+        self.fail_after = fail_after
+
+    def query_stream(self, query):
+        start, stop = map(int, _RANGE.search(query).groups())
+        for i, row in enumerate(row for row in self.rows if start <= datetime_to_ns(row["_time"]) < stop):
+            if self.fail_after is not None and i >= self.fail_after:
+                raise TimeoutError("lost connection to InfluxDB")
+            yield Record(row)
+
+
+def make_rows():
+    first = datetime(2025, 1, 20, tzinfo=timezone.utc)
+    return [{"_time": first + timedelta(hours=6 * i), "station_id": str(i % 3), "source": ["gios", "user"][i % 2],
+             "pm25": float(i), "pm10": None if i % 5 == 0 else i / 2} for i in range(4 * 60)]
+
+
+@pytest.fixture
+def rows(monkeypatch):
+    rows = make_rows()
+    monkeypatch.setattr(db_export, "measurement_bounds",
+                        lambda measurement: (datetime_to_ns(rows[0]["_time"]), datetime_to_ns(rows[-1]["_time"])))
+    monkeypatch.setattr(db_export, "get_query_api", lambda: FakeQueryApi(rows))
+    return rows
+
+
+def published(directory):
+    return sorted(os.path.relpath(os.path.join(root, name), directory)
+                  for root, _, names in os.walk(directory) for name in names)
+
+
+def test_round_trip_with_month_and_source_filters(rows, tmp_path):
+    report = db_export.export_to_parquet(str(tmp_path), concurrency=2)
+    assert report["rows"] == len(rows)
+    assert not [name for name in published(tmp_path) if name.endswith(".tmp")]
+
+    table = db_export.read_parquet(str(tmp_path), start="2025-02-01", stop="2025-03-01", sources=["user"])
+    expected = [row for row in rows if row["source"] == "user"
+                and datetime(2025, 2, 1, tzinfo=timezone.utc) <= row["_time"] < datetime(2025, 3, 1, tzinfo=timezone.utc)]
+    result = sorted(table.to_pylist(), key=lambda row: row["timestamp"])
+    assert [(row["timestamp"], row["station_id"], row["pm25"], row["pm10"]) for row in result] == \
+        [(row["_time"], row["station_id"], row["pm25"], row["pm10"]) for row in expected]
+    assert {row["month"] for row in result} == {"2025-02"}
+
+
+def test_export_is_cut_to_the_requested_range(rows, tmp_path):
+    report = db_export.export_to_parquet(str(tmp_path), start="2025-02-10T00:00:00Z", stop="2025-02-20T00:00:00Z")
+    table = db_export.read_parquet(str(tmp_path))
+    times = table.column("timestamp").to_pylist()
+    assert report["rows"] == len(times) == 40
+    assert min(times) == datetime(2025, 2, 10, tzinfo=timezone.utc)
+    assert max(times) < datetime(2025, 2, 20, tzinfo=timezone.utc)
+    assert published(tmp_path) == ["month=2025-02/source=gios/part-0.parquet", "month=2025-02/source=user/part-0.parquet"]
+
+
+def test_failing_stream_publishes_no_partition(rows, monkeypatch, tmp_path):
+    monkeypatch.setattr(db_export, "get_query_api", lambda: FakeQueryApi(rows, fail_after=10))
+    with pytest.raises(TimeoutError):
+        db_export.export_month(datetime(2025, 2, 1, tzinfo=timezone.utc), datetime(2025, 3, 1, tzinfo=timezone.utc),
+                               str(tmp_path))
+    assert published(tmp_path) == []
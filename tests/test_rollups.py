@@ -0,0 +1,198 @@
+# file: tests/test_rollups.py
+
+import asyncio
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+
+import pytest
+
+from backend import database
+from backend.rollups import ROLLUP_PERIODS, RollupTracker, align_down, align_up, ns_to_iso, parse_duration
+
+_NS = 1_000_000_000
+DAY_NS = 86400 * _NS
+FIELDS = ["pm25", "pm10", "no2"]
+
+
+def make_points(seed: int, start_ns: int, days: int):
+    """Raw air_quality points (station_id, source, field, time_ns, value) at irregular times, with gaps."""
+    rng = random.Random(seed)
+    points = []
+    for station_id, source in [("1", "gios"), ("2", "gios"), ("u1", "user")]:
+        t = start_ns
+        while t < start_ns + days * DAY_NS:
+            for field in FIELDS:
+                if rng.random() < 0.8:
+                    points.append((station_id, source, field, t, round(rng.uniform(0, 100), 2)))
+            t += rng.randint(20, 180) * 60 * _NS
+    return points
+
+
+def aggregate_window(points, start_ns: int, stop_ns: int, every: int):
+    """What `range(start, stop) |> aggregateWindow(every, fn: mean) |> pivot()` returns: windows aligned to the
+    epoch, cut at the range bounds and stamped with their (cut) stop."""
+    sums = defaultdict(lambda: defaultdict(lambda: [0.0, 0]))
+    for station_id, source, field, t, value in points:
+        if start_ns <= t < stop_ns:
+            stamp = min(align_down(t, every) + every, stop_ns)
+            bucket = sums[(station_id, source, stamp)][field]
+            bucket[0] += value
+            bucket[1] += 1
+    return [{"station_id": station_id, "source": source, "timestamp": ns_to_iso(stamp),
+             **{field: total / count for field, (total, count) in fields.items()}}
+            for (station_id, source, stamp), fields in sums.items()]
+
+
+def rollup_records(points, period: str, start_ns: int, stop_ns: int):
+    """Rollup records as _write_rollups stores them: mean and count per field and window of the period."""
+    every = ROLLUP_PERIODS[period]
+    sums = defaultdict(lambda: [0.0, 0])
+    for station_id, source, field, t, value in points:
+        if start_ns <= t < stop_ns:
+            bucket = sums[(station_id, source, field, align_down(t, every) + every)]
+            bucket[0] += value
+            bucket[1] += 1
+    records = []
+    for (station_id, source, field, stamp), (total, count) in sums.items():
+        records.append((station_id, source, field, stamp, "mean", total / count))
+        records.append((station_id, source, field, stamp, "count", float(count)))
+    return records
+
+
+@pytest.fixture
+def influx(monkeypatch, tmp_path):
+    """Serve raw and rollup queries of backend.database from in-memory points, recording what was asked."""
+    state = {"points": [], "rollups": {}, "calls": []}
+    tracker = RollupTracker(str(tmp_path / "rollup_state.json"))
+
+    def select(station_ids, source):
+        return [p for p in state["points"] if (not station_ids or p[0] in station_ids) and (not source or p[1] == source)]
+
+    async def raw(station_ids, source, aggregation, start_ns, stop_ns):
+        state["calls"].append(("raw", start_ns, stop_ns))
+        return aggregate_window(select(station_ids, source), start_ns, stop_ns, parse_duration(aggregation))
+
+    async def rollup(station_ids, source, period, start_ns, stop_ns):
+        state["calls"].append(("rollup", start_ns, stop_ns))
+        return [r for r in state["rollups"][period] if start_ns < r[3] <= stop_ns
+                and (not station_ids or r[0] in station_ids) and (not source or r[1] == source)]
+
+    def backfill(start_ns, stop_ns):
+        for period, every in ROLLUP_PERIODS.items():
+            window_start, window_stop = align_down(start_ns, every), align_up(stop_ns, every)
+            state["rollups"][period] = rollup_records(state["points"], period, window_start, window_stop)
+            tracker.extend_coverage(period, window_start, window_stop)
+
+    monkeypatch.setattr(database, "_query_raw_air_quality", raw)
+    monkeypatch.setattr(database, "_query_rollup_records", rollup)
+    monkeypatch.setattr(database, "get_rollup_tracker", lambda: tracker)
+    state["tracker"] = tracker
+    state["backfill"] = backfill
+    return state
+
+
+def normalized(rows):
+    return sorted(({**row, **{f: round(row[f], 9) for f in FIELDS if f in row}} for row in rows),
+                  key=lambda row: (row["station_id"], row["source"], row["timestamp"]))
+
+
+def fetch(station_ids, source, aggregation, start: date, end: date):
+    start_ns, stop_ns = database._range_ns(start, end)
+    return asyncio.run(database._fetch_air_quality(station_ids, source, aggregation, start_ns, stop_ns))
+
+
+@pytest.mark.parametrize("aggregation", ["1d", "2d", "7d", "14d", "30d", "60d"])
+def test_rollup_path_matches_raw_aggregate_window(influx, aggregation):
+    origin = database._range_ns(date(2025, 1, 1), date(2025, 1, 1))[0]
+    days = parse_duration(aggregation) // DAY_NS
+    influx["points"] = make_points(days, origin, 400)
+    influx["backfill"](origin, origin + 400 * DAY_NS)
+    rng = random.Random(aggregation)
+    used_rollups = False
+    for _ in range(20):
+        start = date(2025, 1, 1) + timedelta(days=rng.randint(0, 200))
+        end = start + timedelta(days=rng.randint(0, max(75, 3 * days)))
+        station_ids = rng.choice([None, ["1"], ["2", "u1"]])
+        source = rng.choice([None, "gios", "user"])
+        influx["calls"].clear()
+        result = fetch(station_ids, source, aggregation, start, end)
+        start_ns, stop_ns = database._range_ns(start, end)
+        expected = aggregate_window(
+            [p for p in influx["points"] if (not station_ids or p[0] in station_ids) and (not source or p[1] == source)],
+            start_ns, stop_ns, parse_duration(aggregation))
+        assert normalized(result) == normalized(expected)
+        used_rollups |= any(call[0] == "rollup" for call in influx["calls"])
+    assert used_rollups
+
+
+def test_partial_edge_windows_come_from_raw_data(influx):
+    origin = database._range_ns(date(2025, 1, 1), date(2025, 1, 1))[0]
+    influx["points"] = make_points(1, origin, 120)
+    influx["backfill"](origin, origin + 120 * DAY_NS)
+    # 7d windows are aligned to the epoch (a Thursday), so this range starts and ends inside a window
+    start, end = date(2025, 1, 6), date(2025, 2, 24)
+    start_ns, stop_ns = database._range_ns(start, end)
+    every = parse_duration("7d")
+    result = fetch(None, None, "7d", start, end)
+    kinds = [call[0] for call in influx["calls"]]
+    assert kinds == ["raw", "rollup", "raw"]
+    assert influx["calls"][0][1:] == (start_ns, align_up(start_ns, every))
+    assert influx["calls"][2][1:] == (align_down(stop_ns, every), stop_ns)
+    assert normalized(result) == normalized(aggregate_window(influx["points"], start_ns, stop_ns, every))
+    assert any(row["timestamp"] == ns_to_iso(stop_ns) for row in result)
+
+
+def test_dirty_or_uncovered_ranges_fall_back_to_raw(influx):
+    origin = database._range_ns(date(2025, 1, 1), date(2025, 1, 1))[0]
+    influx["points"] = make_points(2, origin, 60)
+    influx["backfill"](origin, origin + 30 * DAY_NS)
+    # Past the covered range
+    fetch(None, None, "1d", date(2025, 1, 20), date(2025, 2, 20))
+    assert [call[0] for call in influx["calls"]] == ["raw"]
+    # Covered, but a write for station 1 has not been refreshed yet
+    influx["calls"].clear()
+    influx["tracker"].mark_dirty(["1"], origin + 5 * DAY_NS, origin + 5 * DAY_NS + 1)
+    fetch(["1"], None, "1d", date(2025, 1, 2), date(2025, 1, 10))
+    assert [call[0] for call in influx["calls"]] == ["raw"]
+    influx["calls"].clear()
+    fetch(["2"], None, "1d", date(2025, 1, 2), date(2025, 1, 10))
+    assert "rollup" in [call[0] for call in influx["calls"]]
+
+
+def test_dirty_ranges_survive_a_restart(tmp_path):
+    path = str(tmp_path / "rollup_state.json")
+    tracker = RollupTracker(path)
+    tracker.extend_coverage("1d", 0, 100 * DAY_NS)
+    tracker.mark_dirty(["1", "2"], 10 * DAY_NS, 11 * DAY_NS)
+    tracker.save()
+
+    restarted = RollupTracker(path)
+    assert restarted.covered("1d") == [0, 100 * DAY_NS]
+    assert restarted.pending()[0] == [(frozenset({"1", "2"}), 10 * DAY_NS, 11 * DAY_NS)]
+    assert not restarted.is_clean("1d", None, 0, 20 * DAY_NS)
+    restarted.clear_refreshed(*restarted.pending())
+    restarted.save()
+    assert RollupTracker(path).is_clean("1d", None, 0, 20 * DAY_NS)
+
+
+def test_replay_hook_persists_dirty_ranges(monkeypatch, tmp_path):
+    path = str(tmp_path / "rollup_state.json")
+    tracker = RollupTracker(path)
+    tracker.extend_coverage("1d", 0, 100 * DAY_NS)
+    tracker.save()
+    monkeypatch.setattr(database, "get_rollup_tracker", lambda: tracker)
+    database._after_replay([{"stations": ["1"], "start": 3 * DAY_NS, "stop": 4 * DAY_NS, "sources": {}}])
+    assert not RollupTracker(path).is_clean("1d", ["1"], 0, 10 * DAY_NS)
+
+
+def test_ranges_marked_during_a_refresh_stay_dirty(tmp_path):
+    tracker = RollupTracker(str(tmp_path / "rollup_state.json"))
+    tracker.extend_coverage("1d", 0, 100 * DAY_NS)
+    tracker.mark_dirty(["1"], 10 * DAY_NS, 20 * DAY_NS)
+    pending, upto = tracker.pending()
+    # Replayed while the refresh is running, inside the range it is recomputing
+    tracker.mark_dirty(["1"], 12 * DAY_NS, 13 * DAY_NS)
+    tracker.clear_refreshed(pending, upto)
+    assert tracker.pending()[0] == [(frozenset({"1"}), 12 * DAY_NS, 13 * DAY_NS)]
+    assert not tracker.is_clean("1d", ["1"], 0, 30 * DAY_NS)
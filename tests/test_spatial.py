@@ -0,0 +1,82 @@
+# file: tests/test_spatial.py
+
+import random
+
+import pytest
+
+from backend.spatial import GridIndex, haversine_km
+
+
+def make_stations(rng: random.Random, count: int, lat_range=(49.0, 54.8), lon_range=(14.1, 24.1)):
+    return [{"station_id": str(i), "source": rng.choice(["gios", "user"]), "name": str(i),
+             "lat": rng.uniform(*lat_range), "lon": rng.uniform(*lon_range)} for i in range(count)]
+
+
+def brute_nearby(stations, lat, lon, radius_km, k, source=None):
+    found = sorted((haversine_km(lat, lon, s["lat"], s["lon"]), s["station_id"]) for s in stations
+                   if source is None or s["source"] == source)
+    return [station_id for distance, station_id in found if distance <= radius_km][:k]
+
+
+def brute_within(stations, min_lat, min_lon, max_lat, max_lon, source=None):
+    return sorted(s["station_id"] for s in stations
+                  if min_lat <= s["lat"] <= max_lat and min_lon <= s["lon"] <= max_lon
+                  and (source is None or s["source"] == source))
+
+
+def build(stations, cell_deg=0.1) -> GridIndex:
+    index = GridIndex(cell_deg)
+    for station in stations:
+        index.insert(station)
+    return index
+
+
+@pytest.mark.parametrize("radius_km", [5, 25, 100, 300, 600, 1000])
+def test_nearby_matches_brute_force(radius_km):
+    rng = random.Random(radius_km)
+    stations = make_stations(rng, 3000)
+    index = build(stations)
+    for _ in range(100):
+        lat, lon = rng.uniform(47, 57), rng.uniform(12, 26)
+        k = rng.choice([1, 10, 100, 5000])
+        source = rng.choice([None, "gios", "user"])
+        result = index.nearby(lat, lon, radius_km, k, source)
+        assert [entry["station_id"] for entry in result] == brute_nearby(stations, lat, lon, radius_km, k, source)
+        assert all(entry["distance_km"] <= radius_km + 0.001 for entry in result)
+
+
+def test_nearby_near_poles_and_antimeridian():
+    rng = random.Random(7)
+    stations = (make_stations(rng, 1000, (80, 90), (-180, 180))
+                + make_stations(rng, 1000, (-60, 60), (170, 180))
+                + make_stations(rng, 1000, (-60, 60), (-180, -170)))
+    for i, station in enumerate(stations):
+        station["station_id"] = str(i)
+    index = build(stations, cell_deg=1.0)
+    for lat, lon in [(89.5, 0), (85, 120), (0, 179.9), (10, -179.5), (-30, 180)]:
+        for radius_km in (50, 300, 1000):
+            result = [entry["station_id"] for entry in index.nearby(lat, lon, radius_km, 10_000)]
+            assert result == brute_nearby(stations, lat, lon, radius_km, 10_000)
+
+
+def test_within_matches_brute_force():
+    rng = random.Random(3)
+    stations = make_stations(rng, 3000)
+    index = build(stations)
+    for _ in range(200):
+        lat, lon = rng.uniform(48, 55), rng.uniform(13, 25)
+        box = (lat, lon, lat + rng.uniform(0, 3), lon + rng.uniform(0, 5))
+        source = rng.choice([None, "gios", "user"])
+        result = sorted(entry["station_id"] for entry in index.within(*box, source=source))
+        assert result == brute_within(stations, *box, source=source)
+
+
+def test_moved_and_removed_stations():
+    index = GridIndex(0.1)
+    index.insert({"station_id": "a", "source": "user", "name": "a", "lat": 52.0, "lon": 21.0})
+    index.insert({"station_id": "a", "source": "user", "name": "a", "lat": 50.0, "lon": 19.0})
+    assert len(index) == 1
+    assert index.nearby(52.0, 21.0, 10, 5) == []
+    assert [entry["station_id"] for entry in index.nearby(50.0, 19.0, 10, 5)] == ["a"]
+    index.remove_source("user")
+    assert len(index) == 0 and index.cell_count == 0
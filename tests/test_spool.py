@@ -0,0 +1,146 @@
+# file: tests/test_spool.py
+
+import os
+import socket
+
+import pytest
+from influxdb_client import InfluxDBClient, WritePrecision
+from influxdb_client.client.write_api import SYNCHRONOUS
+
+from backend import spool as spool_module
+from backend.spool import Spool
+from benchmarks.fake_influx import FakeInflux, serve_in_thread
+
+
+def make_block(block: int, lines: int) -> str:
+    base = 1_700_000_000_000_000_000 + block * lines * 1_000_000_000
+    return "".join(f"air_quality,source=test,station_id={i % 7} pm25={i}.5 {base + i * 1_000_000_000}\n"
+                   for i in range(lines))
+
+
+def stored_points(fake: FakeInflux) -> int:
+    return sum(len(points) for points in fake.series.values())
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(spool_module, "SPOOL_RETRY_MIN", 0.01)
+    monkeypatch.setattr(spool_module, "SPOOL_RETRY_MAX", 0.1)
+    monkeypatch.setattr(spool_module, "SPOOL_SEAL_INTERVAL", 0.05)
+
+
+@pytest.fixture
+def influx():
+    """A fake InfluxDB on a free port and a writer using the real client, as backend.database does."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    fake = FakeInflux()
+    serve_in_thread(fake, port)
+    client = InfluxDBClient(url=f"http://127.0.0.1:{port}", token="test", org="test")
+    write_api = client.write_api(write_options=SYNCHRONOUS)
+
+    def writer(body: str) -> None:
+        write_api.write(bucket="test", record=body, write_precision=WritePrecision.NS)
+
+    yield fake, writer
+    client.close()
+
+
+def test_every_line_arrives_after_an_outage(influx, tmp_path):
+    fake, writer = influx
+    replayed = []
+    spool = Spool(str(tmp_path), writer=writer, on_replayed=replayed.extend, segment_bytes=4096)
+    fake.go_down(1.0)
+    for block in range(40):
+        spool.append(make_block(block, 25), {"block": block})
+    assert fake.lines == 0
+    assert spool.wait_drained(timeout=30)
+    assert fake.failed_writes > 0
+    assert fake.lines == 40 * 25 and stored_points(fake) == 40 * 25
+    assert sorted(meta["block"] for meta in replayed) == list(range(40))
+    assert spool.stats()["depth_segments"] == 0 and spool.stats()["consecutive_failures"] == 0
+
+
+def test_rejected_segment_is_moved_aside(influx, tmp_path):
+    fake, writer = influx
+    spool = Spool(str(tmp_path), writer=writer)
+    spool.append(make_block(0, 10))
+    assert spool.wait_drained(timeout=10)
+    spool.append("air_quality,source=test,station_id=1 pm25= 1700000000000000000\n")
+    assert spool.wait_drained(timeout=10)
+    spool.append(make_block(1, 10))
+    assert spool.wait_drained(timeout=10)
+
+    rejected = os.listdir(tmp_path / "rejected")
+    assert len(rejected) == 1
+    assert "pm25= " in (tmp_path / "rejected" / rejected[0]).read_text()
+    assert fake.rejected_writes == 1
+    assert fake.lines == 20
+    assert spool.stats()["consecutive_failures"] == 0
+
+
+def test_only_rejected_blocks_of_a_segment_are_moved_aside(influx, tmp_path):
+    fake, writer = influx
+    replayed = []
+    spool = Spool(str(tmp_path), writer=writer, on_replayed=replayed.extend)
+    start = spool.start
+    spool.start = lambda: None  # keep all appends in one segment
+    spool.append(make_block(0, 10), {"block": 0})
+    spool.append("air_quality,source=test,station_id=1 pm25= 1700000000000000000\n", {"block": "bad"})
+    spool.append(make_block(1, 10), {"block": 1})
+    assert len(os.listdir(tmp_path)) == 1
+    start()
+    assert spool.wait_drained(timeout=10)
+
+    assert fake.lines == 20 and stored_points(fake) == 20
+    assert sorted(meta["block"] for meta in replayed) == [0, 1]
+    rejected = (tmp_path / "rejected" / os.listdir(tmp_path / "rejected")[0]).read_text()
+    assert "pm25= " in rejected and "station_id=0" not in rejected
+    assert spool.stats()["rejected_blocks"] == 1
+
+
+def test_outage_while_splitting_a_rejected_segment_keeps_the_rest(tmp_path):
+    class Rejected(Exception):
+        status = 400
+
+    written, failed = [], []
+
+    def writer(body: str) -> None:
+        if "pm25= " in body:
+            raise Rejected("unable to parse")
+        if "block-1" in body and not failed:
+            failed.append(body)
+            raise ConnectionError("InfluxDB went away")
+        written.append(body)
+
+    replayed = []
+    spool = Spool(str(tmp_path), writer=writer, on_replayed=replayed.extend)
+    start = spool.start
+    spool.start = lambda: None
+    spool.append("air_quality,station_id=block-0 pm25=1 1\n", {"block": 0})
+    spool.append("air_quality,station_id=bad pm25= 2\n", {"block": "bad"})
+    spool.append("air_quality,station_id=block-1 pm25=3 3\n", {"block": 1})
+    start()
+    assert spool.wait_drained(timeout=10)
+
+    assert sum("block-0" in body for body in written) == 1
+    assert sum("block-1" in body for body in written) == 1
+    assert [meta["block"] for meta in replayed] == [0, 1]
+    assert "station_id=bad" in (tmp_path / "rejected" / os.listdir(tmp_path / "rejected")[0]).read_text()
+
+
+def test_restart_replays_unacknowledged_segments(influx, tmp_path):
+    fake, writer = influx
+    crashed = Spool(str(tmp_path), writer=writer, segment_bytes=2048)
+    crashed.start = lambda: None  # the process dies before its replay thread gets to anything
+    for block in range(11):
+        crashed.append(make_block(block, 20))
+    segments = os.listdir(tmp_path)
+    assert any(name.endswith(".lp") for name in segments) and any(name.endswith(".lp.open") for name in segments)
+
+    restarted = Spool(str(tmp_path), writer=writer, segment_bytes=2048)
+    restarted.start()
+    assert restarted.wait_drained(timeout=10)
+    assert fake.lines == 11 * 20 and stored_points(fake) == 11 * 20
+    assert not [name for name in os.listdir(tmp_path) if name.startswith("0")]
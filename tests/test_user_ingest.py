@@ -0,0 +1,41 @@
+# file: tests/test_user_ingest.py
+
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from backend import ingest_queue as ingest_module
+from backend.ingest_queue import IngestQueue
+from backend.line_protocol import escape_tag
+from backend.models import UserAirQualityData
+
+RECORD = {"station_id": "iot_1", "timestamp": "2025-03-01T12:00:00", "pm25": 12.5}
+
+
+@pytest.mark.parametrize("field, value", [("station_id", "bad\nstation"), ("station_id", ""), ("station_id", "a\r"),
+                                          ("station_id", "trailing\\"), ("source", "user\nx")])
+def test_invalid_tag_values_are_rejected(field, value):
+    with pytest.raises(ValidationError):
+        UserAirQualityData(**{**RECORD, field: value})
+
+
+def test_valid_tag_values_serialize():
+    record = UserAirQualityData(**{**RECORD, "station_id": "my station,1=a"})
+    assert escape_tag(record.station_id) == r"my\ station\,1\=a"
+
+
+def test_bad_record_does_not_drop_its_batch(monkeypatch):
+    written = []
+
+    def write(records):
+        if any(record["station_id"] == "bad" for record in records):
+            raise ValueError("Newline in tag value")
+        written.extend(records)
+
+    monkeypatch.setattr(ingest_module, "write_user_records", write)
+    queue = IngestQueue(maxsize=100, batch_size=10)
+    batch = [{**RECORD, "station_id": f"s{i}"} for i in range(5)] + [{**RECORD, "station_id": "bad"}]
+    asyncio.run(queue._write(batch))
+    assert [record["station_id"] for record in written] == [f"s{i}" for i in range(5)]
+    assert queue.stats()["written"] == 5 and queue.stats()["failed"] == 1
@@ -0,0 +1,99 @@
+# file: tests/test_watermarks.py
+
+import asyncio
+from datetime import datetime, timezone
+
+from backend import gios_api
+from backend.watermarks import WatermarkStore
+
+
+def at(hour: int) -> datetime:
+    return datetime(2025, 3, 1, hour, tzinfo=timezone.utc)
+
+
+def reading(station: str, hour: int, **fields):
+    return {"station_id": station, "timestamp": at(hour).isoformat(), "source": "gios", **fields}
+
+
+def test_seeded_when_no_file_exists(tmp_path):
+    store = WatermarkStore(str(tmp_path / "marks.json"))
+    store.load(seed=lambda: {("1", "pm10"): at(5)})
+    assert store.loaded and len(store) == 1
+    new, skipped = store.filter_new([reading("1", 5, pm10=1.0), reading("1", 6, pm10=2.0)])
+    assert [entry["timestamp"] for entry in new] == [at(6).isoformat()] and skipped == 1
+
+
+def test_file_takes_precedence_over_seed_and_round_trips(tmp_path):
+    path = str(tmp_path / "marks.json")
+    store = WatermarkStore(path)
+    store.load()
+    store.advance([reading("1", 3, pm10=1.0, pm25=2.0), reading("2", 4, no2=1.0)])
+    store.save()
+
+    reloaded = WatermarkStore(path)
+    reloaded.load(seed=lambda: (_ for _ in ()).throw(AssertionError("seed must not run when the file exists")))
+    assert len(reloaded) == 3
+    new, skipped = reloaded.filter_new([reading("1", 3, pm10=5.0), reading("2", 4, no2=5.0), reading("2", 5, no2=5.0)])
+    assert skipped == 2 and [entry["timestamp"] for entry in new] == [at(5).isoformat()]
+
+
+def test_corrupt_file_falls_back_to_seed(tmp_path):
+    path = tmp_path / "marks.json"
+    path.write_text("{not json")
+    store = WatermarkStore(str(path))
+    store.load(seed=lambda: {("1", "pm10"): at(1)})
+    assert len(store) == 1
+
+
+def test_entry_is_new_if_any_of_its_fields_is_new(tmp_path):
+    store = WatermarkStore(str(tmp_path / "marks.json"))
+    store.load()
+    store.advance([reading("1", 5, pm10=1.0)])
+    new, skipped = store.filter_new([reading("1", 5, pm10=1.0, pm25=3.0), reading("1", 4, pm10=1.0)])
+    assert len(new) == 1 and new[0]["pm25"] == 3.0 and skipped == 1
+
+
+def test_advance_never_moves_marks_back(tmp_path):
+    store = WatermarkStore(str(tmp_path / "marks.json"))
+    store.load()
+    store.advance([reading("1", 8, pm10=1.0)])
+    store.advance([reading("1", 2, pm10=1.0), reading("1", 9, pm10=None)])
+    new, skipped = store.filter_new([reading("1", 8, pm10=1.0), reading("1", 9, pm10=1.0)])
+    assert skipped == 1 and [entry["timestamp"] for entry in new] == [at(9).isoformat()]
+
+
+def run_writer(monkeypatch, tmp_path, readings, save):
+    store = WatermarkStore(str(tmp_path / "marks.json"))
+    store.load()
+    store.advance([reading("1", 5, pm10=1.0)])
+    monkeypatch.setattr(gios_api, "watermarks", store)
+    monkeypatch.setattr(gios_api, "save_to_influxdb", save)
+    report = {"new": 0, "skipped": 0, "write_errors": 0}
+
+    async def run():
+        queue = asyncio.Queue()
+        await queue.put(readings)
+        await queue.put(gios_api._END_OF_CRAWL)
+        await gios_api.write_gios_data(queue, report)
+
+    asyncio.run(run())
+    return store, report
+
+
+def test_written_values_advance_the_marks(monkeypatch, tmp_path):
+    saved = []
+    readings = [reading("1", 4, pm10=1.0), reading("1", 6, pm10=2.0), reading("1", 7, pm10=3.0)]
+    store, report = run_writer(monkeypatch, tmp_path, readings, saved.extend)
+    assert report == {"new": 2, "skipped": 1, "write_errors": 0}
+    assert [entry["timestamp"] for entry in saved] == [at(6).isoformat(), at(7).isoformat()]
+    assert store.filter_new(readings) == ([], 3)
+
+
+def test_failed_write_counts_only_new_values_and_keeps_the_marks(monkeypatch, tmp_path):
+    def fail(data):
+        raise ConnectionError("spool disk full")
+
+    readings = [reading("1", 4, pm10=1.0), reading("1", 6, pm10=2.0), reading("1", 7, pm10=3.0)]
+    store, report = run_writer(monkeypatch, tmp_path, readings, fail)
+    assert report == {"new": 0, "skipped": 1, "write_errors": 2}
+    assert len(store.filter_new(readings)[0]) == 2